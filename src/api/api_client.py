@@ -1,14 +1,25 @@
 import argparse
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+import numpy as np
 import requests_cache
 from pandas import DataFrame
 from retry_requests import retry
 import pandas as pd
 import openmeteo_requests
 
+from api.grid import ARCHIVE_PARAMS, snap_to_grid
+from api.history_store import HistoryStore
 from utils.analyses_utils import plot_features_evolution, prepare_data, DataFrameType
 from utils.analyses_utils import print_statistics
 from weather_prediction.prophet.prophet_model import ProphetWeatherPredictionModel
-from weather_prediction.features import all_hourly_features, hourly_discrete_features, hourly_regressors
+from weather_prediction.features import all_daily_features, all_hourly_features, hourly_discrete_features, \
+    hourly_regressors
+
+DEFAULT_HISTORY_STORE = HistoryStore()
 
 
 class ApiClient:
@@ -16,11 +27,41 @@ class ApiClient:
     Api Client for OpenMeteo API.
     """
 
-    def __init__(self):
+    url = "https://archive-api.open-meteo.com/v1/archive"
+    max_locations_per_request = 100  # keep the query string within sane URL length limits
+    # long ranges are fetched concurrently in chunks of this many calendar years
+    chunk_years = {"daily": 5, "hourly": 1}
+
+    # The variables requested and decoded for every resolution, see weather_prediction/features.py
+    variables = {
+        "daily": all_daily_features,
+        "hourly": all_hourly_features
+    }
+
+    def __init__(self, history_store: HistoryStore | None = DEFAULT_HISTORY_STORE, max_workers: int = 8,
+                 url: str | None = None):
+        """
+        Initialize Api Client.
+
+        :param history_store: (HistoryStore | None) Local store the history is served from, in the part of
+        the store kept for url. Only the date ranges missing in the store are requested from the API.
+        If None, every call goes to the API.
+        :param max_workers: (int) Maximum number of chunk requests in flight at once.
+        :param url: (str | None) Archive API url, e.g. a local api.replay_server. Defaults to the
+        OPEN_METEO_ARCHIVE_URL environment variable, then to the public archive API.
+        """
+        self.url = url or os.environ.get("OPEN_METEO_ARCHIVE_URL", self.url)
         # Set up the Open-Meteo API client with cache and retry on error
         self._cache_session = requests_cache.CachedSession('.cache', expire_after=-1)
         self._retry_session = retry(self._cache_session, retries=5, backoff_factor=0.2)
         self._openmeteo = openmeteo_requests.Client(session=self._retry_session)
+        self._history_store = history_store.for_source(self.source) if history_store is not None else None
+        self._max_workers = max_workers
+
+    @property
+    def source(self) -> str:
+        """Url of the archive API with the parameters every request carries, which together identify its data."""
+        return f"{self.url}?{urlencode(ARCHIVE_PARAMS)}"
 
     def get_daily_weather_history(self, lat: float, lon: float, start: str, end: str) -> DataFrame:
         """
@@ -32,60 +73,7 @@ class ApiClient:
         :param end: (str) End date ISO 8601, e.g. end=2024-01-26.
         :return: (dict) Weather history.
         """
-        # Make sure all required weather variables are listed here
-        # The order of variables in hourly or daily is important to assign them correctly below
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "start_date": start,
-            "end_date": end,
-            "daily": ["weather_code", "temperature_2m_max", "temperature_2m_min", "temperature_2m_mean",
-                      "sunshine_duration", "precipitation_sum", "precipitation_hours", "wind_speed_10m_max",
-                      "wind_gusts_10m_max", "wind_direction_10m_dominant"]
-        }
-        responses = self._openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
-        print(f"Coordinates {response.Latitude()}°E {response.Longitude()}°N")
-        print(f"Elevation {response.Elevation()} m asl")
-        print(f"Timezone {response.Timezone()} {response.TimezoneAbbreviation()}")
-        print(f"Timezone difference to GMT+0 {response.UtcOffsetSeconds()} s")
-
-        # Process daily data. The order of variables needs to be the same as requested.
-        daily = response.Daily()
-        daily_weather_code = daily.Variables(0).ValuesAsNumpy()
-        daily_temperature_2m_max = daily.Variables(1).ValuesAsNumpy()
-        daily_temperature_2m_min = daily.Variables(2).ValuesAsNumpy()
-        daily_temperature_2m_mean = daily.Variables(3).ValuesAsNumpy()
-        daily_sunshine_duration = daily.Variables(4).ValuesAsNumpy()
-        daily_precipitation_sum = daily.Variables(5).ValuesAsNumpy()
-        daily_precipitation_hours = daily.Variables(6).ValuesAsNumpy()
-        daily_wind_speed_10m_max = daily.Variables(7).ValuesAsNumpy()
-        daily_wind_gusts_10m_max = daily.Variables(8).ValuesAsNumpy()
-        daily_wind_direction_10m_dominant = daily.Variables(9).ValuesAsNumpy()
-
-        daily_data = {"date": pd.date_range(
-            start=pd.to_datetime(daily.Time(), unit="s"),
-            end=pd.to_datetime(daily.TimeEnd(), unit="s"),
-            freq=pd.Timedelta(seconds=daily.Interval()),
-            inclusive="left"
-        )}
-
-        daily_data["weather_code"] = daily_weather_code
-        daily_data["temperature_2m_max"] = daily_temperature_2m_max
-        daily_data["temperature_2m_min"] = daily_temperature_2m_min
-        daily_data["temperature_2m_mean"] = daily_temperature_2m_mean
-        daily_data["sunshine_duration"] = daily_sunshine_duration
-        daily_data["precipitation_sum"] = daily_precipitation_sum
-        daily_data["precipitation_hours"] = daily_precipitation_hours
-        daily_data["wind_speed_10m_max"] = daily_wind_speed_10m_max
-        daily_data["wind_gusts_10m_max"] = daily_wind_gusts_10m_max
-        daily_data["wind_direction_10m_dominant"] = daily_wind_direction_10m_dominant
-
-        daily_dataframe = pd.DataFrame(data=daily_data)
-        return daily_dataframe
+        return self.get_daily_weather_history_batch([(lat, lon)], start, end)[0]
 
     def get_hourly_weather_history(self, lat: float, lon: float, start: str, end: str) -> DataFrame:
         """
@@ -97,57 +85,215 @@ class ApiClient:
         :param end: (str) End date ISO 8601, e.g. end=2024-01-26.
         :return: (dict) Weather history.
         """
-        # Make sure all required weather variables are listed here
-        # The order of variables in hourly or daily is important to assign them correctly below
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
-            "latitude": lat,
-            "longitude": lon,
-            "start_date": start,
-            "end_date": end,
-            "hourly": ["temperature_2m", "relative_humidity_2m", "precipitation", "weather_code", "surface_pressure",
-                       "cloud_cover", "wind_speed_10m", "wind_direction_10m", "wind_gusts_10m"]
-        }
-        responses = self._openmeteo.weather_api(url, params=params)
-
-        # Process first location. Add a for-loop for multiple locations or weather models
-        response = responses[0]
+        return self.get_hourly_weather_history_batch([(lat, lon)], start, end)[0]
+
+    def get_daily_weather_history_batch(self, locations: list[tuple[float, float]], start: str, end: str,
+                                        long_format: bool = False) -> list[DataFrame] | DataFrame:
+        """
+        Get daily weather history for several locations sharing the same date range.
+
+        All locations are requested in one round trip (or a few, see max_locations_per_request).
+
+        :param locations: (list[tuple[float, float]]) List of (latitude, longitude) pairs.
+        :param start: (str) Start date ISO 8601, e.g. start=2024-01-12.
+        :param end: (str) End date ISO 8601, e.g. end=2024-01-26.
+        :param long_format: (bool) Return one frame with a "location" key column instead of a list of frames.
+        :return: (list[DataFrame] | DataFrame) Weather history per location, in the order of locations.
+        """
+        frames = self._get_history("daily", locations, start, end)
+        return self._to_long_frame(frames, locations) if long_format else frames
+
+    def get_hourly_weather_history_batch(self, locations: list[tuple[float, float]], start: str, end: str,
+                                         long_format: bool = False) -> list[DataFrame] | DataFrame:
+        """
+        Get hourly weather history for several locations sharing the same date range.
+
+        All locations are requested in one round trip (or a few, see max_locations_per_request).
+
+        :param locations: (list[tuple[float, float]]) List of (latitude, longitude) pairs.
+        :param start: (str) Start date ISO 8601, e.g. start=2024-01-12.
+        :param end: (str) End date ISO 8601, e.g. end=2024-01-26.
+        :param long_format: (bool) Return one frame with a "location" key column instead of a list of frames.
+        :return: (list[DataFrame] | DataFrame) Weather history per location, in the order of locations.
+        """
+        frames = self._get_history("hourly", locations, start, end)
+        return self._to_long_frame(frames, locations) if long_format else frames
+
+    def _get_history(self, resolution: str, locations: list[tuple[float, float]],
+                     start: str, end: str) -> list[DataFrame]:
+        """
+        Get history for several locations, going to the API only for what the history store misses.
+
+        Locations are snapped to the provider's grid first, so nearby locations share requests and
+        history store entries. Locations missing the same date range are fetched together in one batch request.
+
+        :param resolution: (str) "daily" or "hourly".
+        :param locations: (list[tuple[float, float]]) List of (latitude, longitude) pairs.
+        :param start: (str) Start date ISO 8601.
+        :param end: (str) End date ISO 8601.
+        :return: (list[DataFrame]) Weather history per location, in the order of locations.
+        """
+        locations = [snap_to_grid(lat, lon) for lat, lon in locations]
+        if self._history_store is None:
+            return self._fetch(resolution, locations, start, end)
+
+        variables = self.variables[resolution]
+        gaps: dict[tuple, list[tuple[float, float]]] = {}
+        for location in dict.fromkeys(locations):
+            for gap in self._history_store.missing_ranges(resolution, *location, start, end, variables):
+                gaps.setdefault(gap, []).append(location)
+
+        for (gap_start, gap_end), gap_locations in gaps.items():
+            frames = self._fetch(resolution, gap_locations, gap_start.isoformat(), gap_end.isoformat())
+            for (lat, lon), frame in zip(gap_locations, frames):
+                self._history_store.write(resolution, lat, lon, gap_start, gap_end, frame)
+
+        return [self._history_store.read(resolution, lat, lon, start, end, variables) for lat, lon in locations]
+
+    def _fetch(self, resolution: str, locations: list[tuple[float, float]],
+               start: str, end: str) -> list[DataFrame]:
+        """
+        Fetch history for several locations from the API.
+
+        Ranges longer than chunk_years are split at calendar year boundaries and the chunks are
+        fetched concurrently. Aligned chunks also keep request URLs stable, so a shifted range
+        still hits the HTTP cache for every chunk but the first and the last.
+
+        :param resolution: (str) "daily" or "hourly".
+        :param locations: (list[tuple[float, float]]) List of (latitude, longitude) pairs.
+        :param start: (str) Start date ISO 8601.
+        :param end: (str) End date ISO 8601.
+        :return: (list[DataFrame]) Weather history per location, in the order of locations.
+        """
+        chunks = self._split_range(start, end, self.chunk_years[resolution])
+        if len(chunks) == 1:
+            return self._fetch_chunk(resolution, locations, start, end)
+
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(chunks))) as executor:
+            chunk_frames = list(executor.map(
+                lambda chunk: self._fetch_chunk(resolution, locations, *chunk), chunks))
+
+        # chunk_frames[chunk][location] -> one frame per location, chunks kept in date order
+        return [pd.concat(location_frames, ignore_index=True) for location_frames in zip(*chunk_frames)]
+
+    def _fetch_chunk(self, resolution: str, locations: list[tuple[float, float]],
+                     start: str, end: str) -> list[DataFrame]:
+        variables = self.variables[resolution]
+        responses = self._request_locations(locations, start, end, {resolution: variables})
+        if resolution == "daily":
+            return [self._decode(response.Daily(), variables) for response in responses]
+        return [self._decode(response.Hourly(), variables) for response in responses]
+
+    @staticmethod
+    def _split_range(start: str, end: str, years: int) -> list[tuple[str, str]]:
+        """
+        Split the inclusive range [start, end] at January 1st of every years-th calendar year.
+
+        :param start: (str) Start date ISO 8601.
+        :param end: (str) End date ISO 8601.
+        :param years: (int) Number of calendar years per chunk.
+        :return: (list[tuple[str, str]]) Inclusive (start, end) ISO 8601 chunks in date order.
+        """
+        start_date = pd.Timestamp(start).date()
+        end_date = pd.Timestamp(end).date()
+        chunks = []
+        while start_date <= end_date:
+            next_start = datetime.date((start_date.year // years + 1) * years, 1, 1)
+            chunk_end = min(end_date, next_start - datetime.timedelta(days=1))
+            chunks.append((start_date.isoformat(), chunk_end.isoformat()))
+            start_date = next_start
+        return chunks
+
+    def _request_locations(self, locations: list[tuple[float, float]], start: str, end: str,
+                           variables: dict[str, list[str]]) -> list:
+        """
+        Request the archive for several locations, max_locations_per_request at a time.
+
+        :param locations: (list[tuple[float, float]]) List of (latitude, longitude) pairs.
+        :param start: (str) Start date ISO 8601.
+        :param end: (str) End date ISO 8601.
+        :param variables: (dict[str, list[str]]) Either {"daily": [...]} or {"hourly": [...]}.
+        :return: (list) One response per location, in the order of locations.
+        :raises ValueError: If no locations are given or the API answered with a different number of locations.
+        """
+        if not locations:
+            raise ValueError("At least one location must be given")
+
+        responses = []
+        for i in range(0, len(locations), self.max_locations_per_request):
+            batch = locations[i:i + self.max_locations_per_request]
+            params = {
+                "latitude": [lat for lat, _ in batch],
+                "longitude": [lon for _, lon in batch],
+                "start_date": start,
+                "end_date": end,
+                **ARCHIVE_PARAMS,
+                **variables
+            }
+            batch_responses = self._openmeteo.weather_api(self.url, params=params)
+            if len(batch_responses) != len(batch):
+                raise ValueError(f"Expected {len(batch)} locations in the response, got {len(batch_responses)}")
+            responses.extend(batch_responses)
+
+        for response in responses:
+            self._print_response_info(response)
+        return responses
+
+    @staticmethod
+    def _print_response_info(response):
         print(f"Coordinates {response.Latitude()}°E {response.Longitude()}°N")
         print(f"Elevation {response.Elevation()} m asl")
         print(f"Timezone {response.Timezone()} {response.TimezoneAbbreviation()}")
         print(f"Timezone difference to GMT+0 {response.UtcOffsetSeconds()} s")
 
-        # Process hourly data. The order of variables needs to be the same as requested.
-        hourly = response.Hourly()
-        hourly_temperature_2m = hourly.Variables(0).ValuesAsNumpy()
-        hourly_relative_humidity_2m = hourly.Variables(1).ValuesAsNumpy()
-        hourly_precipitation = hourly.Variables(2).ValuesAsNumpy()
-        hourly_weather_code = hourly.Variables(3).ValuesAsNumpy()
-        hourly_surface_pressure = hourly.Variables(4).ValuesAsNumpy()
-        hourly_cloud_cover = hourly.Variables(5).ValuesAsNumpy()
-        hourly_wind_speed_10m = hourly.Variables(6).ValuesAsNumpy()
-        hourly_wind_direction_10m = hourly.Variables(7).ValuesAsNumpy()
-        hourly_wind_gusts_10m = hourly.Variables(8).ValuesAsNumpy()
-
-        hourly_data = {"date": pd.date_range(
-            start=pd.to_datetime(hourly.Time(), unit="s"),
-            end=pd.to_datetime(hourly.TimeEnd(), unit="s"),
-            freq=pd.Timedelta(seconds=hourly.Interval()),
+    @staticmethod
+    def _decode(section, variables: list[str]) -> DataFrame:
+        """
+        Decode a daily or hourly response section into a frame.
+
+        The values of every variable are read straight from the flatbuffer and copied once, into one
+        column-major float32 block that the frame then uses as is.
+
+        :param section: (VariablesWithTime) response.Daily() or response.Hourly().
+        :param variables: (list[str]) Variables in the order they were requested.
+        :return: (DataFrame) Frame with a "date" column followed by the variables, as float32.
+        :raises ValueError: If the section holds a different number of variables than requested.
+        """
+        if section.VariablesLength() != len(variables):
+            raise ValueError(f"Expected {len(variables)} variables in the response, got {section.VariablesLength()}")
+
+        dates = pd.date_range(
+            start=pd.to_datetime(section.Time(), unit="s"),
+            end=pd.to_datetime(section.TimeEnd(), unit="s"),
+            freq=pd.Timedelta(seconds=section.Interval()),
             inclusive="left"
-        )}
-
-        hourly_data["temperature_2m"] = hourly_temperature_2m
-        hourly_data["relative_humidity_2m"] = hourly_relative_humidity_2m
-        hourly_data["precipitation"] = hourly_precipitation
-        hourly_data["weather_code"] = hourly_weather_code
-        hourly_data["surface_pressure"] = hourly_surface_pressure
-        hourly_data["cloud_cover"] = hourly_cloud_cover
-        hourly_data["wind_speed_10m"] = hourly_wind_speed_10m
-        hourly_data["wind_direction_10m"] = hourly_wind_direction_10m
-        hourly_data["wind_gusts_10m"] = hourly_wind_gusts_10m
-
-        hourly_dataframe = pd.DataFrame(data=hourly_data)
-        return hourly_dataframe
+        )
+        # Fortran order: the transposed block pandas keeps internally is then C-contiguous and not copied again
+        values = np.empty((len(dates), len(variables)), dtype=np.float32, order="F")
+        for i in range(len(variables)):
+            values[:, i] = section.Variables(i).ValuesAsNumpy()
+
+        frame = pd.DataFrame(values, columns=variables, copy=False)
+        frame.insert(0, "date", dates)
+        return frame
+
+    @staticmethod
+    def _to_long_frame(frames: list[DataFrame], locations: list[tuple[float, float]]) -> DataFrame:
+        """
+        Stack per-location frames into one long frame keyed by location.
+
+        :param frames: (list[DataFrame]) Weather history per location.
+        :param locations: (list[tuple[float, float]]) Requested (latitude, longitude) pairs, same order as frames.
+        :return: (DataFrame) Frame with "location", "latitude" and "longitude" columns in front.
+        """
+        keyed = []
+        for index, (frame, (lat, lon)) in enumerate(zip(frames, locations)):
+            frame = frame.copy()
+            frame.insert(0, "longitude", lon)
+            frame.insert(0, "latitude", lat)
+            frame.insert(0, "location", index)
+            keyed.append(frame)
+        return pd.concat(keyed, ignore_index=True)
 
 
 def main():
@@ -0,0 +1,158 @@
+import datetime
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from pandas import DataFrame
+from tornado import web
+from tornado.ioloop import IOLoop
+
+from forecast.jobs import DEFAULT_FORECAST_JOBS, ForecastJobs
+from json_reader.autocomplete_helper import AutocompleteHelper
+
+
+class _JsonHandler(web.RequestHandler):
+    """Base of the API handlers: runs the work off the server's event loop and answers with JSON."""
+
+    def initialize(self, executor: ThreadPoolExecutor, forecast_jobs: ForecastJobs,
+                   autocomplete_helper: AutocompleteHelper):
+        self._executor = executor
+        self._forecast_jobs = forecast_jobs
+        self._autocomplete_helper = autocomplete_helper
+
+    async def run(self, fn, *args):
+        """Run fn on the API's thread pool, so requests are served concurrently."""
+        return await IOLoop.current().run_in_executor(self._executor, fn, *args)
+
+    def write_json(self, body: str):
+        self.set_header("Content-Type", "application/json")
+        self.finish(body)
+
+    def write_error(self, status_code: int, **kwargs):
+        error = kwargs.get("exc_info", (None, None, None))[1]
+        if isinstance(error, web.HTTPError) and error.log_message:
+            reason = error.log_message % error.args
+        else:
+            reason = self._reason
+        self.write_json(json.dumps({"error": True, "reason": reason}))
+
+    def float_argument(self, name: str) -> float:
+        value = self.get_argument(name)
+        try:
+            return float(value)
+        except ValueError:
+            raise _bad_request(f"Argument {name} is not a number: {value!r}")
+
+    def date_argument(self, name: str) -> str:
+        value = self.get_argument(name)
+        try:
+            date = datetime.datetime.strptime(value, "%Y-%m-%d").date()
+        except ValueError:
+            raise _bad_request(f"Argument {name} is not a date (YYYY-MM-DD): {value!r}")
+        # the forecast is compared to the actual weather, like in the app
+        if date >= datetime.date.today():
+            raise _bad_request(f"Argument {name} has to be before today: {value!r}")
+        return value
+
+
+class ForecastHandler(_JsonHandler):
+    """
+    GET ?lat=&lon=&from=&to=&type= runs WeatherForecast.predict.
+
+    Answers {"prediction": {column: [values]}, "actual": {column: [values]}}.
+    """
+
+    async def get(self):
+        user_input = {"lat": self.float_argument("lat"), "lon": self.float_argument("lon"),
+                      "from": self.date_argument("from"), "to": self.date_argument("to"),
+                      "type": self.get_argument("type", "Daily")}
+        if user_input["type"] not in ["Daily", "Hourly"]:
+            raise _bad_request(f"Argument type is neither Daily nor Hourly: {user_input['type']!r}")
+        if user_input["from"] == user_input["to"]:
+            raise _bad_request("Arguments from and to are the same date, the range to forecast is empty")
+        self.write_json(await self.run(_forecast_json, self._forecast_jobs, user_input))
+
+
+class CitiesHandler(_JsonHandler):
+    """
+    GET ?q=&n= runs AutocompleteHelper.find_first_n, most populous cities first.
+
+    Answers {"name": [names], "lat": [latitudes], "lon": [longitudes]}.
+    """
+
+    async def get(self):
+        query = self.get_argument("q")
+        try:
+            n = int(self.get_argument("n", "10"))
+        except ValueError:
+            raise _bad_request(f"Argument n is not an integer: {self.get_argument('n')!r}")
+        names = await self.run(self._autocomplete_helper.find_first_n, query, n)
+        self.write_json(_cities_json(self._autocomplete_helper, names))
+
+
+class ClosestCityHandler(_JsonHandler):
+    """
+    GET ?lat=&lon= runs AutocompleteHelper.find_closest.
+
+    Answers {"name": [name], "lat": [latitude], "lon": [longitude]}, empty lists if no city is loaded.
+    """
+
+    async def get(self):
+        lat, lon = self.float_argument("lat"), self.float_argument("lon")
+        name = await self.run(self._autocomplete_helper.find_closest, lat, lon)
+        self.write_json(_cities_json(self._autocomplete_helper, [name] if name is not None else []))
+
+
+def routes(autocomplete_helper: AutocompleteHelper, forecast_jobs: ForecastJobs = DEFAULT_FORECAST_JOBS,
+           prefix: str = "/api", max_workers: int = 8) -> list[tuple]:
+    """
+    Get the routes of the JSON API, to serve them next to the app (see serve.py).
+
+    Every response is columnar: one list of values per column.
+
+    :param autocomplete_helper: (AutocompleteHelper) Cities the city endpoints search.
+    :param forecast_jobs: (ForecastJobs) Runs the forecasts, shared with the app so identical requests
+    of API and app share one computation.
+    :param prefix: (str) Path the endpoints are served under.
+    :param max_workers: (int) Maximum number of requests worked on at once.
+    :return: (list[tuple]) Tornado routes: prefix/forecast, prefix/cities and prefix/closest.
+    """
+    kwargs = {"executor": ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api"),
+              "forecast_jobs": forecast_jobs, "autocomplete_helper": autocomplete_helper}
+    return [(f"{prefix}/forecast", ForecastHandler, kwargs),
+            (f"{prefix}/cities", CitiesHandler, kwargs),
+            (f"{prefix}/closest", ClosestCityHandler, kwargs)]
+
+
+def columnar_json(frame: DataFrame) -> str:
+    """
+    Serialize a frame as a JSON object with one list of values per column.
+
+    Columns are serialized by pandas' JSON writer, dates as ISO 8601 and missing values as null,
+    so no row is turned into Python objects.
+
+    :param frame: (DataFrame) Frame to serialize.
+    :return: (str) JSON object.
+    """
+    columns = [f"{json.dumps(str(column))}:{frame[column].to_json(orient='values', date_format='iso', date_unit='s')}"
+               for column in frame.columns]
+    return "{" + ",".join(columns) + "}"
+
+
+def _bad_request(reason: str) -> web.HTTPError:
+    # passed as argument, so a % in the reason is not taken as a format
+    return web.HTTPError(400, "%s", reason)
+
+
+def _forecast_json(forecast_jobs: ForecastJobs, user_input: dict) -> str:
+    try:
+        prediction, actual = forecast_jobs.predict(user_input)
+    except ValueError as e:
+        raise _bad_request(str(e))
+    return f'{{"prediction":{columnar_json(prediction)},"actual":{columnar_json(actual)}}}'
+
+
+def _cities_json(autocomplete_helper: AutocompleteHelper, names: list[str]) -> str:
+    cities = [autocomplete_helper.find_by_key(name) for name in names]
+    return columnar_json(pd.DataFrame({"name": names, "lat": [city.lat for city in cities],
+                                       "lon": [city.lon for city in cities]}))
@@ -0,0 +1,25 @@
+# Open-Meteo answers archive requests with its default "best_match" by mixing ERA5, ERA5-Land and IFS,
+# and corrects temperatures for the elevation of the requested coordinate. Requests therefore ask for ERA5
+# and disable the elevation correction, so every coordinate within one cell of its grid gets the same data.
+ARCHIVE_MODEL = "era5"
+ARCHIVE_PARAMS = {"models": ARCHIVE_MODEL, "elevation": "nan"}
+GRID_RESOLUTION = 0.25  # ERA5 grid
+
+
+def snap_to_grid(lat: float, lon: float, resolution: float = GRID_RESOLUTION) -> tuple[float, float]:
+    """
+    Snap coordinates to the centre of the provider's grid cell.
+
+    Nearby coordinates snapped to the same cell share request URLs, history store entries and fitted models.
+    With ARCHIVE_PARAMS the archive answers every coordinate of a cell with the data of the cell, so snapping
+    does not change the data.
+
+    :param lat: (float) Latitude.
+    :param lon: (float) Longitude.
+    :param resolution: (float) Grid resolution in degrees.
+    :return: (tuple[float, float]) Snapped (latitude, longitude).
+    """
+    lat = min(max(float(lat), -90.0), 90.0)
+    lon = (float(lon) + 180.0) % 360.0 - 180.0
+    # round twice: the second round removes float noise like 50.400000000000006
+    return round(round(lat / resolution) * resolution, 6), round(round(lon / resolution) * resolution, 6)
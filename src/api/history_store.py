@@ -0,0 +1,192 @@
+import datetime
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from utils.file_utils import atomic_write, file_lock
+from utils.path_utils import data_dir
+
+DateRange = tuple[datetime.date, datetime.date]
+
+
+class HistoryStore:
+    """
+    Local on-disk store of weather history.
+
+    History is kept as one Parquet file per resolution and location, with one column per variable,
+    so a read only touches the variables it asks for. Next to every file the store keeps the date
+    ranges it already holds for each variable, which lets the caller fetch only the missing gaps.
+    History of different archive APIs is kept apart, see for_source.
+    """
+
+    # the archive keeps filling in the last few days, so they are never marked as held
+    recent_days = 7
+
+    def __init__(self, root: str | None = None, source: str | None = None):
+        """
+        Initialize history store.
+
+        :param root: (str | None) Directory the store keeps its files in. Created on first write.
+        If None, .history in the data directory, see utils.path_utils.data_dir.
+        :param source: (str | None) Url of the archive API the history comes from, see for_source.
+        """
+        self._root_dir = root
+        self._source = source
+        self._lock = threading.Lock()
+        self._sources: dict[str, HistoryStore] = {}
+
+    def for_source(self, source: str) -> 'HistoryStore':
+        """
+        Get the store of the history one archive API serves, e.g. the public API or a local api.replay_server.
+
+        The history of a source is kept in its own directory, so history of a stand-in is never served
+        as history of the real archive.
+
+        :param source: (str) Url of the archive API.
+        :return: (HistoryStore) Store of the source, the same one on every call.
+        """
+        with self._lock:
+            if source not in self._sources:
+                self._sources[source] = HistoryStore(self._root_dir, source)
+            return self._sources[source]
+
+    def missing_ranges(self, resolution: str, lat: float, lon: float, start: str, end: str,
+                       variables: list[str]) -> list[DateRange]:
+        """
+        Get the date ranges within [start, end] that are not held for at least one of the variables.
+
+        :param resolution: (str) "daily" or "hourly".
+        :param lat: (float) Latitude.
+        :param lon: (float) Longitude.
+        :param start: (str) Start date ISO 8601, e.g. start=2024-01-12.
+        :param end: (str) End date ISO 8601, e.g. end=2024-01-26 (inclusive).
+        :param variables: (list[str]) Variables that have to be present.
+        :return: (list[DateRange]) Sorted, non-overlapping inclusive date ranges to fetch.
+        """
+        start, end = _to_date(start), _to_date(end)
+        coverage = self._read_coverage(resolution, lat, lon)
+        missing = []
+        for variable in variables:
+            missing.extend(_subtract(start, end, coverage.get(variable, [])))
+        return _merge(missing)
+
+    def read(self, resolution: str, lat: float, lon: float, start: str, end: str,
+             variables: list[str]) -> DataFrame:
+        """
+        Read the held history of one location.
+
+        :param resolution: (str) "daily" or "hourly".
+        :param lat: (float) Latitude.
+        :param lon: (float) Longitude.
+        :param start: (str) Start date ISO 8601 (inclusive).
+        :param end: (str) End date ISO 8601 (inclusive).
+        :param variables: (list[str]) Variables to read, in the order of the returned columns.
+        :return: (DataFrame) Frame with a "date" column followed by the variables.
+        """
+        path = self._data_path(resolution, lat, lon)
+        if not path.exists():
+            return DataFrame(columns=["date"] + variables)
+        start = pd.Timestamp(_to_date(start))
+        end = pd.Timestamp(_to_date(end)) + pd.Timedelta(days=1)
+        table = pq.read_table(path, columns=["date"] + variables,
+                              filters=[("date", ">=", start), ("date", "<", end)])
+        return table.to_pandas().sort_values("date", ignore_index=True)
+
+    def write(self, resolution: str, lat: float, lon: float, start: str, end: str, frame: DataFrame):
+        """
+        Merge freshly fetched history of one location into the store.
+
+        Rows of frame replace held rows with the same date. The range [start, end] is marked as held
+        for every variable of frame, except for the last recent_days days. Writes of the same location
+        are serialized across processes, so none of them loses the rows of another.
+
+        :param resolution: (str) "daily" or "hourly".
+        :param lat: (float) Latitude.
+        :param lon: (float) Longitude.
+        :param start: (str) Start date ISO 8601 the frame was fetched for (inclusive).
+        :param end: (str) End date ISO 8601 the frame was fetched for (inclusive).
+        :param frame: (DataFrame) Frame with a "date" column followed by variables.
+        """
+        start, end = _to_date(start), _to_date(end)
+        variables = [column for column in frame.columns if column != "date"]
+        path = self._data_path(resolution, lat, lon)
+        # the thread lock first: without fcntl the file lock does not serialize the threads of a process
+        with self._lock, file_lock(path.with_suffix(".lock")):
+            if path.exists():
+                held = pq.read_table(path).to_pandas()
+                frame = pd.concat([held[~held["date"].isin(frame["date"])], frame], ignore_index=True)
+                frame = frame.sort_values("date", ignore_index=True)
+            atomic_write(path, lambda tmp: pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp))
+
+            last_final = datetime.date.today() - datetime.timedelta(days=self.recent_days)
+            coverage = self._read_coverage(resolution, lat, lon)
+            if start <= min(end, last_final):
+                for variable in variables:
+                    coverage[variable] = _merge(coverage.get(variable, []) + [(start, min(end, last_final))])
+            serialized = {variable: [[first.isoformat(), last.isoformat()] for first, last in ranges]
+                          for variable, ranges in coverage.items()}
+            atomic_write(self._coverage_path(resolution, lat, lon),
+                         lambda tmp: Path(tmp).write_text(json.dumps(serialized), encoding="utf-8"))
+
+    def _read_coverage(self, resolution: str, lat: float, lon: float) -> dict[str, list[DateRange]]:
+        path = self._coverage_path(resolution, lat, lon)
+        if not path.exists():
+            return {}
+        serialized = json.loads(path.read_text(encoding="utf-8"))
+        return {variable: [(_to_date(first), _to_date(last)) for first, last in ranges]
+                for variable, ranges in serialized.items()}
+
+    @property
+    def _root(self) -> Path:
+        root = Path(self._root_dir) if self._root_dir is not None else data_dir('.history')
+        if self._source is None:
+            return root
+        return root / hashlib.sha1(self._source.encode()).hexdigest()[:16]
+
+    def _data_path(self, resolution: str, lat: float, lon: float) -> Path:
+        return self._root / resolution / f"{_location_key(lat, lon)}.parquet"
+
+    def _coverage_path(self, resolution: str, lat: float, lon: float) -> Path:
+        return self._root / resolution / f"{_location_key(lat, lon)}.json"
+
+
+def _location_key(lat: float, lon: float) -> str:
+    return f"{float(lat):.4f}_{float(lon):.4f}"
+
+
+def _to_date(value) -> datetime.date:
+    return pd.Timestamp(value).date()
+
+
+def _merge(ranges: list[DateRange]) -> list[DateRange]:
+    """Merge overlapping and adjacent inclusive date ranges."""
+    merged = []
+    for first, last in sorted(ranges):
+        if merged and first <= merged[-1][1] + datetime.timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+    return merged
+
+
+def _subtract(start: datetime.date, end: datetime.date, held: list[DateRange]) -> list[DateRange]:
+    """Get the parts of the inclusive range [start, end] not covered by held ranges."""
+    missing = []
+    cursor = start
+    for first, last in _merge(held):
+        if last < cursor:
+            continue
+        if first > end:
+            break
+        if first > cursor:
+            missing.append((cursor, first - datetime.timedelta(days=1)))
+        cursor = max(cursor, last + datetime.timedelta(days=1))
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
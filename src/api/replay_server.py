@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import flatbuffers
+import numpy as np
+import pandas as pd
+import requests
+
+from api.grid import ARCHIVE_PARAMS, snap_to_grid
+
+UPSTREAM_URL = "https://archive-api.open-meteo.com/v1/archive"
+
+
+class ReplayServer:
+    """
+    Local stand-in for the Open-Meteo archive API.
+
+    Answers archive requests with recorded flatbuffer payloads from a fixtures directory, so tests and
+    benchmarks run offline with deterministic latency. In record mode, requests without a fixture are
+    forwarded to the real API and the answer is saved as a new fixture. In synthetic mode, requests without
+    a fixture are answered with generated, deterministic weather instead.
+
+    Point ApiClient at it with ApiClient(url=server.url) or the OPEN_METEO_ARCHIVE_URL environment variable.
+    """
+
+    def __init__(self, fixtures_dir: str, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 record: bool = False, synthetic: bool = False, upstream: str = UPSTREAM_URL):
+        """
+        Initialize replay server.
+
+        :param fixtures_dir: (str) Directory with recorded fixtures.
+        :param host: (str) Host to listen on.
+        :param port: (int) Port to listen on, 0 picks a free port.
+        :param latency: (float) Seconds to wait before every answer.
+        :param record: (bool) Forward unknown requests to upstream and record the answers.
+        :param synthetic: (bool) Answer unknown requests with generated weather.
+        :param upstream: (str) Archive API url used in record mode.
+        """
+        self._fixtures_dir = Path(fixtures_dir)
+        self._latency = latency
+        self._record = record
+        self._synthetic = synthetic
+        self._upstream = upstream
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/archive"
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def answer(self, query: str) -> tuple[int, bytes]:
+        """
+        Answer one archive request.
+
+        :param query: (str) Query string of the request.
+        :return: (tuple[int, bytes]) HTTP status and body.
+        """
+        time.sleep(self._latency)
+        path = self._fixtures_dir / f"{fixture_key(query)}.fb"
+        if path.exists():
+            return 200, path.read_bytes()
+        if self._record:
+            response = requests.get(self._upstream, params=parse_qsl(query), timeout=60)
+            if response.status_code == 200:
+                self._fixtures_dir.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(response.content)
+                path.with_suffix(".query").write_text(query, encoding="utf-8")
+            return response.status_code, response.content
+        if self._synthetic:
+            try:
+                return 200, synthetic_payload(query)
+            except (KeyError, ValueError) as e:
+                return 400, json.dumps({"error": True, "reason": f"Cannot synthesize response: {e}"}).encode()
+        return 404, json.dumps({"error": True, "reason": f"No fixture for {query}"}).encode()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, body = server.answer(urlsplit(self.path).query)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream" if status == 200 else "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def fixture_key(query: str) -> str:
+    """
+    Get the fixture name of a request. Parameter order does not matter.
+
+    :param query: (str) Query string of the request.
+    :return: (str) Fixture name.
+    """
+    normalized = "&".join(f"{key}={value}" for key, value in sorted(parse_qsl(query)))
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+
+def synthetic_payload(query: str) -> bytes:
+    """
+    Generate a deterministic archive answer for a request.
+
+    Values depend only on location, variable and timestamp, so overlapping requests agree on shared rows.
+    Like the archive, requests with ARCHIVE_PARAMS are answered with the data of the grid cell of a location,
+    other requests with the data of the location itself.
+
+    :param query: (str) Query string of the request.
+    :return: (bytes) Size-prefixed flatbuffer messages, one per requested location.
+    """
+    params = parse_qsl(query)
+    latitudes = [float(value) for key, value in params if key == "latitude" for value in value.split(",")]
+    longitudes = [float(value) for key, value in params if key == "longitude" for value in value.split(",")]
+    start = pd.Timestamp(dict(params)["start_date"])
+    end = pd.Timestamp(dict(params)["end_date"]) + pd.Timedelta(days=1)
+    if len(latitudes) != len(longitudes):
+        raise ValueError("latitude and longitude lengths do not match")
+
+    resolution = "hourly" if any(key == "hourly" for key, _ in params) else "daily"
+    variables = [value for key, value in params if key == resolution for value in value.split(",")]
+    interval = 3600 if resolution == "hourly" else 86400
+    timestamps = np.arange(start.value // 10 ** 9, end.value // 10 ** 9, interval, dtype=np.int64)
+    if len(timestamps) == 0:
+        raise ValueError("start_date is after end_date")
+
+    gridded = all(dict(params).get(key) == value for key, value in ARCHIVE_PARAMS.items())
+    payload = b""
+    for lat, lon in zip(latitudes, longitudes):
+        if gridded:
+            lat, lon = snap_to_grid(lat, lon)
+        values = [_synthetic_values(variable, lat, lon, timestamps) for variable in variables]
+        payload += encode_response(lat, lon, resolution, int(timestamps[0]), interval, values)
+    return payload
+
+
+def encode_response(lat: float, lon: float, resolution: str, time_start: int, interval: int,
+                    values: list[np.ndarray]) -> bytes:
+    """
+    Encode one location as a size-prefixed WeatherApiResponse flatbuffer, like the archive API does.
+
+    :param lat: (float) Latitude.
+    :param lon: (float) Longitude.
+    :param resolution: (str) "daily" or "hourly".
+    :param time_start: (int) Unix time of the first value.
+    :param interval: (int) Seconds between values.
+    :param values: (list[np.ndarray]) Values of every variable, in the requested order.
+    :return: (bytes) Encoded message.
+    """
+    builder = flatbuffers.Builder(1024)
+    timezone = builder.CreateString("GMT")
+
+    variable_offsets = []
+    for column in values:
+        vector = builder.CreateNumpyVector(np.asarray(column, dtype=np.float32))
+        builder.StartObject(4)
+        builder.PrependUOffsetTRelativeSlot(3, vector, 0)
+        variable_offsets.append(builder.EndObject())
+    builder.StartVector(4, len(variable_offsets), 4)
+    for offset in reversed(variable_offsets):
+        builder.PrependUOffsetTRelative(offset)
+    variables = builder.EndVector()
+
+    length = len(values[0]) if values else 0
+    builder.StartObject(4)
+    builder.PrependInt64Slot(0, time_start, 0)
+    builder.PrependInt64Slot(1, time_start + length * interval, 0)
+    builder.PrependInt32Slot(2, interval, 0)
+    builder.PrependUOffsetTRelativeSlot(3, variables, 0)
+    section = builder.EndObject()
+
+    builder.StartObject(12)
+    builder.PrependFloat32Slot(0, lat, 0)
+    builder.PrependFloat32Slot(1, lon, 0)
+    builder.PrependUOffsetTRelativeSlot(7, timezone, 0)
+    builder.PrependUOffsetTRelativeSlot(8, timezone, 0)
+    builder.PrependUOffsetTRelativeSlot(10 if resolution == "daily" else 11, section, 0)
+    builder.Finish(builder.EndObject())
+
+    message = bytes(builder.Output())
+    return len(message).to_bytes(4, byteorder="little") + message
+
+
+def _noise(timestamps: np.ndarray, seed: float) -> np.ndarray:
+    """Deterministic pseudo random values in [0, 1) for every timestamp."""
+    return np.modf(np.abs(np.sin(timestamps / 3600.0 * 12.9898 + seed * 78.233)) * 43758.5453)[0]
+
+
+def _synthetic_values(variable: str, lat: float, lon: float, timestamps: np.ndarray) -> np.ndarray:
+    seed = lat * 7.0 + lon * 3.0
+    year = np.sin(2 * np.pi * timestamps / (365.25 * 86400) - np.pi / 2)
+    day = np.sin(2 * np.pi * (timestamps % 86400) / 86400 - np.pi / 2)
+    rain = np.maximum(_noise(timestamps, seed) * 10 - 7, 0)
+    if variable == "weather_code":
+        return np.where(rain > 0, 61, np.where(_noise(timestamps, seed + 1) > 0.5, 3, 0))
+    if variable.startswith("precipitation"):
+        return rain
+    if variable.startswith("temperature"):
+        return 8 - abs(lat) / 10 + 12 * year + 4 * day + 2 * _noise(timestamps, seed + 2)
+    if variable.startswith("wind_direction"):
+        return 360 * _noise(timestamps, seed + 3)
+    return 50 + 20 * year + 10 * _noise(timestamps, seed + zlib.crc32(variable.encode()) % 100)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded Open-Meteo archive responses")
+    parser.add_argument("--fixtures", help="Fixtures directory", required=False, dest="fixtures",
+                        default="resource/fixtures")
+    parser.add_argument("--host", help="Host", required=False, dest="host", default="127.0.0.1")
+    parser.add_argument("--port", help="Port", required=False, dest="port", type=int, default=8090)
+    parser.add_argument("--latency", help="Seconds to wait before every answer", required=False,
+                        dest="latency", type=float, default=0.0)
+    parser.add_argument("--record", help="Record unknown requests from the real API", action="store_true")
+    parser.add_argument("--synthetic", help="Answer unknown requests with generated weather", action="store_true")
+
+    args = parser.parse_args()
+
+    server = ReplayServer(args.fixtures, args.host, args.port, args.latency, args.record, args.synthetic)
+    print(f"Serving archive API at {server.url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
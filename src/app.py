@@ -1,4 +1,5 @@
-import traceback
+import asyncio
+import os
 
 import panel.widgets
 from ipyleaflet import Map, Marker
@@ -6,15 +7,20 @@ import panel as pn
 
 import datetime
 from json_reader.autocomplete_helper import AutocompleteHelper
-from json_reader.builder import CityCollectionBuilder
-from display_results import build_results_widget
+from json_reader.builder import init_autocomplete_helper
+from display_results import ProgressiveResults
 from dynamic import DynamicContentHolder
 
-from forecast.forecast import WeatherForecast
+from forecast.jobs import DEFAULT_FORECAST_JOBS
+from forecast.prewarm import DEFAULT_PREWARM_CITIES, default_window, start_prewarm, top_cities
+from weather_prediction.prophet.prophet_model import start_workers
 
 pn.extension("ipywidgets", sizing_mode="stretch_width")
+start_workers()  # no-op once the fitting workers run
 
 ACCENT_BASE_COLOR = "#DAA520"
+# number of most populous cities whose default forecasts are computed in the background, 0 to disable
+PREWARM_CITIES = int(os.environ.get("PREWARM_CITIES", DEFAULT_PREWARM_CITIES))
 
 
 class MapViewer:
@@ -89,15 +95,6 @@ class SearchBox:
         new_options = self.autocomplete_helper.find_first_n(current_input, n=self.limit)
         self.search_field.options = new_options
 
-    @staticmethod
-    def init_autocomplete_helper():
-        try:
-            return CityCollectionBuilder().build_map()
-        except Exception as e:
-            print("Error while creating AutoCompleteHelper:", e)
-            traceback.print_exc()
-            return AutocompleteHelper()
-
     def forced_change(self, option):
         self.forced = True
         self.search_field.value = option
@@ -106,11 +103,11 @@ class SearchBox:
 
 class OptionsBox:
     def __init__(self):
-        current_date = datetime.date.today() - datetime.timedelta(days=1)
+        # the prewarmed window, see forecast.prewarm
+        seven_days_ago, current_date = default_window()
         common_width = 150
         common_height = 50
         min_date = datetime.datetime.strptime("1985-01-01", "%Y-%m-%d").date()
-        seven_days_ago = current_date - datetime.timedelta(days=7)
         self.from_date_picker = pn.widgets.DatePicker(name='From', start=min_date, end=current_date,
                                                       value=seven_days_ago,
                                                       width=common_width, height=common_height)
@@ -176,7 +173,8 @@ class UserInputCollector:
 
 
 map_viewer = MapViewer()
-autocomplete_helper = SearchBox.init_autocomplete_helper()
+autocomplete_helper = init_autocomplete_helper()
+start_prewarm(top_cities(autocomplete_helper, PREWARM_CITIES))  # no-op once the prewarmer runs
 search_box = SearchBox(autocomplete_helper, map_viewer)
 map_viewer.set_search_box_ref(search_box)
 options_box = OptionsBox()
@@ -185,33 +183,37 @@ result_list = DynamicContentHolder()
 graphs_list = DynamicContentHolder()
 
 
-def build_weather_forecast(event):
+async def build_weather_forecast(event):
     if not event:
         return
     user_input = UserInputCollector.collect_user_input(map_viewer, options_box)
     print('\033[94m', user_input, '\033[0m')
-    prediction, actual = WeatherForecast().predict(user_input)
-    print('\033[92m', prediction, actual, '\033[0m')
     if user_input['type'] == 'Hourly':
-        list_widget, plots_widget = build_results_widget(actual, prediction,
-                                                         [
-                                                             'temperature_2m', 'relative_humidity_2m', 'precipitation',
-                                                             'cloud_cover', 'surface_pressure',
-                                                             'wind_speed_10m', 'weather_code'
-                                                         ],
-                                                         ['Temperature', 'Relative Humidity',
-                                                          'Precipitation', 'Cloud Colver', 'Surface Pressure',
-                                                          'Wind Speed', 'Weather type'],
-                                                         date_column='date')
+        results = ProgressiveResults(['temperature_2m', 'relative_humidity_2m', 'precipitation',
+                                      'cloud_cover', 'surface_pressure',
+                                      'wind_speed_10m', 'weather_code'],
+                                     ['Temperature', 'Relative Humidity',
+                                      'Precipitation', 'Cloud Colver', 'Surface Pressure',
+                                      'Wind Speed', 'Weather type'],
+                                     date_column='date')
     else:
-        list_widget, plots_widget = build_results_widget(actual, prediction,
-                                                         ['temperature_2m_mean', 'wind_speed_10m_max',
-                                                          'precipitation_sum', 'precipitation_hours', 'weather_code'],
-                                                         ['Temperature', 'Wind Speed',
-                                                          'Precipitation Sum', 'Precipitation Hours', 'Weather Type'],
-                                                         date_column='date')
-    result_list.set_content(list_widget)
-    graphs_list.set_content(plots_widget)
+        results = ProgressiveResults(['temperature_2m_mean', 'wind_speed_10m_max',
+                                      'precipitation_sum', 'precipitation_hours', 'weather_code'],
+                                     ['Temperature', 'Wind Speed',
+                                      'Precipitation Sum', 'Precipitation Hours', 'Weather Type'],
+                                     date_column='date')
+    result_list.set_content(results.list_widget)
+    graphs_list.set_content(results.plots_widget)
+
+    # sessions asking for the same forecast at the same time share one computation
+    stream = DEFAULT_FORECAST_JOBS.predict_stream(user_input)
+    loop = asyncio.get_running_loop()
+    prediction, actual = None, None
+    # the forecast runs in a worker thread, each variable is shown as soon as its model is done
+    while (partial := await loop.run_in_executor(None, next, stream, None)) is not None:
+        prediction, actual = partial
+        results.update(actual, prediction)
+    print('\033[92m', prediction, actual, '\033[0m')
 
 
 options_box.set_on_predict_btn_pressed(build_weather_forecast)
@@ -238,4 +240,4 @@ template = pn.template.FastListTemplate(
     header_background=ACCENT_BASE_COLOR,
     accent_base_color=ACCENT_BASE_COLOR,
     main=[main_component],
-).servable()
\ No newline at end of file
+).servable()
\ No newline at end of file
@@ -79,6 +79,66 @@ def build_results_widget(actual_weather, predicted_weather, use_columns: List[st
     return list_widget, plots_widget
 
 
+class ProgressiveResults:
+    """
+    Result list and plots that fill in while the forecast runs.
+
+    Every update adds the predicted columns that arrived since the last one: the result list is redrawn
+    with them and their plots join the plot selector.
+    """
+
+    def __init__(self, use_columns: List[str], column_names: List[str], date_column='date'):
+        """
+
+        :param use_columns: columns to be displayed on the graph and the result list
+        :param column_names: pretty names for columns in the same order as use_columns
+        :param date_column: column with the dates of actual_weather
+        """
+        if len(use_columns) != len(column_names):
+            raise ValueError("use_columns and column_names lengths do not match")
+        self.use_columns = use_columns
+        self.column_names = column_names
+        self.date_column = date_column
+        self.list_widget = pn.pane.Markdown('')
+        self._plots = {}
+        self._dynamic_plot = DynamicContentHolder()
+        self._select_plot = pn.widgets.Select(options=[]).clone(margin=25)
+        self._select_plot.param.watch(lambda event: _replace_plot(event, self._dynamic_plot, self._plots), 'value')
+        self.plots_widget = pn.Column(
+            self._select_plot,
+            self._dynamic_plot.get_holder()
+        )
+
+    def update(self, actual_weather, predicted_weather):
+        """
+
+        :param actual_weather: dataframe, historical weather
+        :param predicted_weather: dataframe, predicted weather so far, must be the same length as actual_weather
+        """
+        if len(actual_weather) != len(predicted_weather):
+            raise ValueError("actual_weather and predicted_weather lengths do not match")
+        ready = [(column_name, pretty_name) for column_name, pretty_name in zip(self.use_columns, self.column_names)
+                 if column_name in predicted_weather.columns]
+        new = [(column_name, pretty_name) for column_name, pretty_name in ready if pretty_name not in self._plots]
+        if not new:
+            return
+
+        self.list_widget.object = _build_result_list_widget(actual_weather, predicted_weather,
+                                                            [column_name for column_name, _ in ready],
+                                                            [pretty_name for _, pretty_name in ready],
+                                                            self.date_column)
+        dates = _extract_column(actual_weather, self.date_column)
+        for column_name, pretty_name in new:
+            self._plots[pretty_name] = _create_plot_matplot(dates, _extract_column(actual_weather, column_name),
+                                                            _extract_column(predicted_weather, column_name),
+                                                            pretty_name)
+        first_plot = not self._select_plot.options
+        self._select_plot.options = [pretty_name for _, pretty_name in ready]
+        if first_plot:
+            self._select_plot.value = ready[0][1]
+            self._dynamic_plot.set_content(self._plots[ready[0][1]])
+
+
 def _to_pretty_row(pretty_name, actual_value, predicted_value):
     return _colored_rectangles([pretty_name, actual_value, predicted_value],
                                ["green", "orange", "#27B4BE"])
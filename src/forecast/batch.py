@@ -0,0 +1,189 @@
+import argparse
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from api.grid import snap_to_grid
+from forecast.forecast import WeatherForecast
+from forecast.result_cache import DEFAULT_RESULT_CACHE
+from weather_prediction.engines import DEFAULT_ENGINE, get_engine
+
+JOB_COLUMNS = ["lat", "lon", "from", "to", "type"]
+
+# forecast of a batch worker process, set by _init_worker
+_forecast: WeatherForecast | None = None
+
+
+def read_jobs(path: str) -> DataFrame:
+    """
+    Read forecast jobs from a CSV or Parquet file.
+
+    :param path: (str) File with the columns lat, lon, from, to and type, one job per row. Parquet if the name
+    ends with .parquet, CSV otherwise.
+    :return: (DataFrame) Jobs with "from" and "to" as ISO 8601 dates.
+    :raises ValueError: If a column is missing.
+    """
+    jobs = pd.read_parquet(path) if str(path).endswith(".parquet") else pd.read_csv(path)
+    missing = [column for column in JOB_COLUMNS if column not in jobs.columns]
+    if missing:
+        raise ValueError(f"Jobs file {path} misses the columns {', '.join(missing)}")
+    jobs = jobs[JOB_COLUMNS].reset_index(drop=True)
+    for column in ["from", "to"]:
+        jobs[column] = pd.to_datetime(jobs[column]).dt.strftime("%Y-%m-%d")
+    return jobs
+
+
+class BatchRunner:
+    """
+    Runs forecast jobs headless, on a process pool.
+
+    Jobs of the same grid cell go to the same worker as one task, so they share its caches and never write
+    the history of a location from two processes. Predictions and actual weather are written to Parquet as tasks
+    finish, one file per forecast type, with a "job" column holding the row of the job. Failing jobs are recorded
+    with their error and do not stop the batch.
+    """
+
+    def __init__(self, output_dir: str, engine: str = DEFAULT_ENGINE, workers: int | None = None,
+                 result_cache: bool = True):
+        """
+        Initialize batch runner.
+
+        :param output_dir: (str) Directory the result files are written to. Created if needed.
+        :param engine: (str) Name of the forecasting engine, see weather_prediction.engines.ENGINES.
+        :param workers: (int | None) Number of worker processes. If None, one per CPU.
+        If 1, everything runs in the calling process.
+        :param result_cache: (bool) Serve jobs from the forecast result cache and store their results in it.
+        """
+        self._output_dir = Path(output_dir)
+        self._engine = engine
+        self._workers = workers or os.cpu_count()
+        self._result_cache = result_cache
+
+    def run(self, jobs: DataFrame) -> dict[str, Any]:
+        """
+        Forecast every job and write the results.
+
+        Writes predictions_<type>.parquet and actuals_<type>.parquet for every forecast type and jobs.parquet
+        with the status, error and stage timings of every job.
+
+        :param jobs: (DataFrame) Jobs, see read_jobs.
+        :return: (dict[str, Any]) Number of jobs, failed jobs, seconds, jobs per second and the mean seconds
+        of every stage over the forecasted jobs.
+        """
+        started = time.perf_counter()
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        user_inputs = jobs.to_dict("records")
+        tasks: dict[tuple[float, float], list[int]] = {}
+        for job, user_input in enumerate(user_inputs):
+            tasks.setdefault(snap_to_grid(user_input["lat"], user_input["lon"]), []).append(job)
+
+        writers: dict[str, pq.ParquetWriter] = {}
+        summaries = []
+        try:
+            for results in self._results(list(tasks.values()), user_inputs):
+                write_started = time.perf_counter()
+                for job, user_input, prediction, actual, timings, error in results:
+                    if error is None:
+                        forecast_type = user_input["type"].lower()
+                        self._write(writers, f"predictions_{forecast_type}", prediction.assign(job=job))
+                        self._write(writers, f"actuals_{forecast_type}", actual.assign(job=job))
+                    summaries.append({"job": job, **user_input, "error": error, **timings})
+                # writing is timed per task, every job of the task gets its share
+                for summary in summaries[len(summaries) - len(results):]:
+                    summary["write"] = (time.perf_counter() - write_started) / len(results)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        summary = DataFrame(summaries, columns=None if summaries else ["job"] + JOB_COLUMNS + ["error"])
+        summary = summary.sort_values("job", ignore_index=True)
+        summary.to_parquet(self._output_dir / "jobs.parquet", index=False)
+        seconds = time.perf_counter() - started
+        succeeded = summary[summary["error"].isna()]
+        stages = [column for column in summary.columns if column not in ["job", "error"] + JOB_COLUMNS]
+        return {"jobs": len(summary), "failed": len(summary) - len(succeeded), "seconds": seconds,
+                "jobs_per_second": len(summary) / seconds,
+                "stages": {stage: float(succeeded[stage].mean()) for stage in stages if succeeded[stage].notna().any()}}
+
+    def _results(self, tasks: list[list[int]], user_inputs: list[dict]):
+        """Run the tasks, yielding the results of every task as it finishes."""
+        if self._workers == 1 or len(tasks) == 1:
+            _init_worker(self._engine, self._result_cache)
+            for task in tasks:
+                yield _run_jobs([(job, user_inputs[job]) for job in task])
+            return
+        # spawn, not fork: forked workers would inherit the locks of the fetch and fitting threads
+        with ProcessPoolExecutor(max_workers=min(self._workers, len(tasks)),
+                                 mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(self._engine, self._result_cache)) as executor:
+            futures = [executor.submit(_run_jobs, [(job, user_inputs[job]) for job in task]) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def _write(self, writers: dict[str, pq.ParquetWriter], name: str, frame: DataFrame):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if name not in writers:
+            writers[name] = pq.ParquetWriter(self._output_dir / f"{name}.parquet", table.schema)
+        writers[name].write_table(table.cast(writers[name].schema))
+
+
+def _init_worker(engine: str, result_cache: bool):
+    """Create the forecast of a worker process. Its models fit in the process itself, not on another pool."""
+    global _forecast
+    _forecast = WeatherForecast(engine, result_cache=DEFAULT_RESULT_CACHE if result_cache else None,
+                                model_kwargs=get_engine(engine).in_process_kwargs())
+
+
+def _run_jobs(jobs: list[tuple[int, dict]]) -> list[tuple]:
+    """
+    Forecast jobs one after another. Runs in a worker process.
+
+    :param jobs: (list[tuple[int, dict]]) Row and request of every job.
+    :return: (list[tuple]) Per job: row, request, prediction, actual weather, stage timings and error
+    (None if the forecast succeeded, prediction and actual weather are None otherwise).
+    """
+    results = []
+    for job, user_input in jobs:
+        started = time.perf_counter()
+        try:
+            prediction, actual = _forecast.predict(user_input)
+            error = None
+        except Exception as e:
+            traceback.print_exc()
+            prediction, actual, error = None, None, f"{type(e).__name__}: {e}"
+        timings = {**_forecast.timings, "total": time.perf_counter() - started}
+        results.append((job, user_input, prediction, actual, timings, error))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Forecast a batch of locations and date ranges")
+    parser.add_argument("--jobs", help="CSV or Parquet file with lat, lon, from, to and type columns", required=True,
+                        dest="jobs")
+    parser.add_argument("--output", help="Directory to write the results to", required=True, dest="output")
+    parser.add_argument("--engine", help="Forecasting engine", required=False, dest="engine", default=DEFAULT_ENGINE)
+    parser.add_argument("--workers", help="Worker processes, one per CPU by default", required=False, dest="workers",
+                        type=int)
+    parser.add_argument("--no-result-cache", help="Forecast every job, even if its result is cached",
+                        action="store_false", dest="result_cache")
+
+    args = parser.parse_args()
+
+    stats = BatchRunner(args.output, args.engine, args.workers, args.result_cache).run(read_jobs(args.jobs))
+    print(f"{stats['jobs']} jobs in {stats['seconds']:.1f} s ({stats['jobs_per_second']:.2f} jobs/s), "
+          f"{stats['failed']} failed")
+    for stage, seconds in stats["stages"].items():
+        print(f"  {stage:<14} {seconds:8.3f} s/job")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,25 @@
+from weather_prediction.engines import DEFAULT_ENGINE
 from weather_prediction.weather_predictor import WeatherPredictor
-from weather_prediction.weather_code.weather_code_prediction import WeatherCodesPredictor
+from weather_prediction.weather_code.weather_code_prediction import CLASSIFIER_VERSION, WeatherCodesPredictor
+from weather_prediction.weather_code.online_weather_code_prediction import DEFAULT_ONLINE_PREDICTOR
 from utils.analyses_utils import DataFrameType
+from api.grid import snap_to_grid
+from forecast.result_cache import DEFAULT_RESULT_CACHE, ForecastResultCache
 import datetime
+import time
 
 
 class WeatherForecast:
-    def __init__(self):
-        self.weather_predictor = WeatherPredictor()
-        self.weather_code_predictor = WeatherCodesPredictor()
+    def __init__(self, engine: str = DEFAULT_ENGINE, online_weather_codes: bool = False,
+                 result_cache: ForecastResultCache | None = DEFAULT_RESULT_CACHE, model_kwargs=None):
+        self.engine = engine
+        self.weather_predictor = WeatherPredictor(engine, model_kwargs=model_kwargs)
+        # seconds the latest forecast spent per stage, e.g. "fetch", "predict" and "weather_codes"
+        self.timings = {}
+        # online weather codes depend on what the predictor has learned so far, so they are never cached
+        self.result_cache = None if online_weather_codes else result_cache
+        # the online predictor is shared, it keeps learning the history of every location it has seen
+        self.weather_code_predictor = DEFAULT_ONLINE_PREDICTOR if online_weather_codes else WeatherCodesPredictor()
         self.include_regressors_daily = ['temperature_2m_mean', 'wind_speed_10m_max',
                                          'precipitation_sum', 'precipitation_hours']
         self.include_regressors_hourly = [
@@ -16,14 +28,27 @@ class WeatherForecast:
         ]
 
     def predict(self, user_input):
+        for prediction, actual in self.predict_stream(user_input):
+            pass
+        return prediction, actual
+
+    def predict_stream(self, user_input):
+        """
+        Predict the weather, yielding the prediction so far every time variables are predicted.
+
+        :param user_input: (dict) Request, as predict takes it.
+        :return: (Iterator[tuple[pd.DataFrame, pd.DataFrame]]) Prediction with the variables predicted so far
+        and the actual weather. The weather type follows once the variables it is classified from are predicted,
+        the last pair is the result of predict.
+        """
         if user_input['type'] == 'Hourly':
             is_hourly = True
         elif user_input['type'] == 'Daily':
             is_hourly = False
         else:
             raise ValueError("User input type is neither Hourly nor Daily!")
-        lon = user_input['lon']
-        lat = user_input['lat']
+        # snapped coordinates are used for every cache, history store and model lookup down the line
+        lat, lon = snap_to_grid(user_input['lat'], user_input['lon'])
         start_date_str = user_input['from']
         end_date_str = user_input['to']
 
@@ -35,42 +60,75 @@ class WeatherForecast:
             start_date_str, end_date_str = end_date_str, start_date_str
 
         distance_days = (end_date_obj - start_date_obj).days
+        cache_key = None
+        self.timings = {}
+        if self.result_cache is not None:
+            started = time.perf_counter()
+            cache_key = self._result_key(lat, lon, start_date_str, end_date_str, user_input['type'], distance_days,
+                                         ForecastResultCache.is_final(end_date_obj))
+            cached = self.result_cache.get(cache_key)
+            self.timings["cache"] = time.perf_counter() - started
+            if cached is not None:
+                yield cached
+                return
+
         if is_hourly:
-            return self._get_for_hours(lat, lon, start_date_str, distance_days)
+            stream = self._stream_for_hours(lat, lon, start_date_str, distance_days)
         else:
-            return self._get_for_days(lat, lon, start_date_str, distance_days)
+            stream = self._stream_for_days(lat, lon, start_date_str, distance_days)
+        for result in stream:
+            yield result
+        self.timings.update(self.weather_predictor.timings)
+        if cache_key is not None:
+            started = time.perf_counter()
+            self.result_cache.put(cache_key, *result)
+            self.timings["cache"] += time.perf_counter() - started
+
+    def _result_key(self, lat, lon, start_date_str, end_date_str, forecast_type, distance_days, is_final):
+        # the training window is part of the key, so profiling new windows does not serve stale results
+        if forecast_type == 'Hourly':
+            train_size = self.weather_predictor.training_size(DataFrameType.HourlyHistory, distance_days * 24)
+        else:
+            train_size = self.weather_predictor.training_size(DataFrameType.DailyHistory, distance_days)
+        # so are the model and classifier versions, so changing a model does not serve stale results either
+        classifier = f"{type(self.weather_code_predictor).__name__}:{CLASSIFIER_VERSION}"
+        # results computed from a stand-in archive (api.replay_server) are never served as real ones
+        version = (f"{self.engine}:{self.weather_predictor.model_version}:{classifier}:{train_size}:"
+                   f"{self.weather_predictor.archive_source}")
+        if not is_final:
+            # the archive still fills in recent days, their results are only reused on the day they were made
+            version += f":{datetime.date.today().isoformat()}"
+        return ForecastResultCache.key(version, lat, lon, start_date_str, end_date_str, forecast_type)
 
     def _transform_date(self, date_str):
         return datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
 
-    def _get_for_hours(self, lat, lon, start_date_str, distance_days):
-        actual_data = self.weather_predictor.get_actual_data(lat, lon, start_date_str, days=0, hours=distance_days*24)
-        prediction_dict = (self.weather_predictor.
-                           predict_weather(lat, lon, start_date_str,
-                                           days=0, hours=distance_days*24))
-        history = prediction_dict[DataFrameType.HourlyHistory.value]
-        prediction = prediction_dict[DataFrameType.HourlyPrediction.value]
-        weather_codes = self.weather_code_predictor.get_weather_codes_frame(
-            history, prediction, self.include_regressors_hourly, 'weather_code',
-            self.include_regressors_hourly
-        )
-        prediction['weather_code'] = weather_codes
-        actual_hourly = actual_data[DataFrameType.HourlyHistory.value]
-        actual_hourly['weather_code'] = WeatherCodesPredictor.replace_weather_codes(actual_hourly['weather_code'])
-        return prediction, actual_hourly
+    def _stream_for_hours(self, lat, lon, start_date_str, distance_days):
+        stream = self.weather_predictor.predict_weather_stream_with_actual_data(lat, lon, start_date_str,
+                                                                                days=0, hours=distance_days*24)
+        return self._with_weather_codes(stream, lat, lon, DataFrameType.HourlyHistory, DataFrameType.HourlyPrediction,
+                                        self.include_regressors_hourly)
+
+    def _stream_for_days(self, lat, lon, start_date_str, distance_days):
+        stream = self.weather_predictor.predict_weather_stream_with_actual_data(lat, lon, start_date_str,
+                                                                                days=distance_days, hours=0)
+        return self._with_weather_codes(stream, lat, lon, DataFrameType.DailyHistory, DataFrameType.DailyPrediction,
+                                        self.include_regressors_daily)
 
-    def _get_for_days(self, lat, lon, start_date_str, distance_days):
-        actual_data = self.weather_predictor.get_actual_data(lat, lon, start_date_str, days=distance_days, hours=0)
-        prediction_dict = (self.weather_predictor.
-                           predict_weather(lat, lon, start_date_str,
-                                           days=distance_days, hours=0))
-        history = prediction_dict[DataFrameType.DailyHistory.value]
-        prediction = prediction_dict[DataFrameType.DailyPrediction.value]
-        weather_codes = self.weather_code_predictor.get_weather_codes_frame(
-            history, prediction, self.include_regressors_daily, 'weather_code',
-            self.include_regressors_daily
-        )
-        prediction['weather_code'] = weather_codes
-        actual_daily = actual_data[DataFrameType.DailyHistory.value]
-        actual_daily['weather_code'] = WeatherCodesPredictor.replace_weather_codes(actual_daily['weather_code'])
-        return prediction, actual_daily
+    def _with_weather_codes(self, stream, lat, lon, history_type, prediction_type, include_regressors):
+        actual, weather_codes = None, None
+        for prediction_dict, actual_data in stream:
+            if actual is None:
+                actual = actual_data[history_type.value]
+                actual['weather_code'] = WeatherCodesPredictor.replace_weather_codes(actual['weather_code'])
+            prediction = prediction_dict[prediction_type.value]
+            if weather_codes is None and set(include_regressors) <= set(prediction.columns):
+                started = time.perf_counter()
+                weather_codes = self.weather_code_predictor.get_weather_codes_frame(
+                    prediction_dict[history_type.value], prediction, include_regressors, 'weather_code',
+                    include_regressors, location=(lat, lon)
+                )
+                self.timings["weather_codes"] = time.perf_counter() - started
+            if weather_codes is not None:
+                prediction['weather_code'] = weather_codes
+            yield prediction, actual
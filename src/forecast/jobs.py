@@ -0,0 +1,112 @@
+import threading
+from concurrent.futures import Future
+from typing import Callable, Iterator
+
+import pandas as pd
+
+from api.grid import snap_to_grid
+from forecast.forecast import WeatherForecast
+
+ForecastKey = tuple[float, float, str, str, str]
+
+
+class ForecastJobs:
+    """
+    Runs forecasts so that identical requests in flight share one computation.
+
+    The first request of a key runs the forecast, requests of the same key arriving while it runs wait for it
+    and all of them get its result. Requests are identical when snapped coordinates, date range and type match.
+    """
+
+    def __init__(self, forecast_factory: Callable[[], WeatherForecast] = WeatherForecast):
+        """
+        Initialize forecast jobs.
+
+        :param forecast_factory: (Callable[[], WeatherForecast]) Creates the forecast a job runs.
+        """
+        self._forecast_factory = forecast_factory
+        self._running: dict[ForecastKey, Future] = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(user_input: dict) -> ForecastKey:
+        """
+        Get the job key of a request.
+
+        :param user_input: (dict) Request, as WeatherForecast.predict takes it.
+        :return: (ForecastKey) Snapped latitude and longitude, first and last date and type.
+        """
+        lat, lon = snap_to_grid(user_input['lat'], user_input['lon'])
+        start, end = sorted([user_input['from'], user_input['to']])
+        return lat, lon, start, end, user_input['type']
+
+    def predict(self, user_input: dict) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Predict the weather, or wait for the running forecast of an identical request.
+
+        :param user_input: (dict) Request, as WeatherForecast.predict takes it.
+        :return: (tuple[pd.DataFrame, pd.DataFrame]) Prediction and actual weather. Every caller gets its own copies.
+        """
+        key = self.key(user_input)
+        future, leader = self._claim(key)
+        if leader:
+            try:
+                future.set_result(self._forecast_factory().predict(user_input))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._release(key)
+
+        prediction, actual = future.result()
+        return prediction.copy(), actual.copy()
+
+    def predict_stream(self, user_input: dict) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+        """
+        Predict the weather like predict, yielding the prediction so far every time variables are predicted.
+
+        Only the request running the forecast sees the partial results, identical requests get the final one.
+
+        :param user_input: (dict) Request, as WeatherForecast.predict takes it.
+        :return: (Iterator[tuple[pd.DataFrame, pd.DataFrame]]) Prediction and actual weather, see
+        WeatherForecast.predict_stream. Every caller gets its own copies.
+        """
+        key = self.key(user_input)
+        future, leader = self._claim(key)
+        if leader:
+            try:
+                for result in self._forecast_factory().predict_stream(user_input):
+                    yield result[0].copy(), result[1].copy()
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+                raise
+            finally:
+                if not future.done():
+                    # the caller stopped reading, the waiting requests fail instead of waiting forever
+                    future.set_exception(RuntimeError("The forecast was abandoned"))
+                self._release(key)
+            return
+
+        prediction, actual = future.result()
+        yield prediction.copy(), actual.copy()
+
+    def _claim(self, key: ForecastKey) -> tuple[Future, bool]:
+        """Get the future of the running job of a key, or start one. True if the caller has to run it."""
+        with self._lock:
+            future = self._running.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._running[key] = future
+            self.computed += 1
+            return future, True
+
+    def _release(self, key: ForecastKey):
+        with self._lock:
+            del self._running[key]
+
+
+DEFAULT_FORECAST_JOBS = ForecastJobs()
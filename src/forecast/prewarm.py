@@ -0,0 +1,170 @@
+import argparse
+import datetime
+import threading
+import time
+import traceback
+from typing import Callable
+
+from json_reader.autocomplete_helper import AutocompleteHelper
+from json_reader.builder import CityCollectionBuilder
+from json_reader.city import CityInfo
+from forecast.jobs import DEFAULT_FORECAST_JOBS, ForecastJobs
+
+DEFAULT_PREWARM_CITIES = 20
+FORECAST_TYPES = ('Daily', 'Hourly')
+
+# the running background prewarmer, see start_prewarm
+_prewarmer = None
+_prewarmer_lock = threading.Lock()
+
+
+def default_window(today: datetime.date | None = None) -> tuple[datetime.date, datetime.date]:
+    """
+    Get the date range the app suggests: the last 7 days up to yesterday.
+
+    :param today: (datetime.date | None) Current date. If None, today.
+    :return: (tuple[datetime.date, datetime.date]) First and last date.
+    """
+    yesterday = (today or datetime.date.today()) - datetime.timedelta(days=1)
+    return yesterday - datetime.timedelta(days=7), yesterday
+
+
+def top_cities(autocomplete_helper: AutocompleteHelper, n: int) -> list[CityInfo]:
+    """
+    Get the most populous cities.
+
+    :param autocomplete_helper: (AutocompleteHelper) Loaded cities, ordered by population.
+    :param n: (int) Number of cities.
+    :return: (list[CityInfo]) Cities, most populous first.
+    """
+    return list(autocomplete_helper.map.values())[:n]
+
+
+class Prewarmer:
+    """
+    Computes the forecasts of the app's default window for a list of cities ahead of the users.
+
+    Every forecast runs the full prediction, so history lands in the history store, fitted models in the model
+    cache and the result in the forecast result cache. Cities sharing a grid cell are forecasted once. The window
+    and the keys of results that are not final move with the date, so the background thread runs again just
+    after every local date change.
+    """
+
+    def __init__(self, cities: list[CityInfo], forecast_types: tuple[str, ...] = FORECAST_TYPES,
+                 forecast_jobs: ForecastJobs = DEFAULT_FORECAST_JOBS, after_midnight: float = 60,
+                 clock: Callable[[], datetime.datetime] = datetime.datetime.now):
+        """
+        Initialize prewarmer.
+
+        :param cities: (list[CityInfo]) Cities to forecast, in the order they are forecasted.
+        :param forecast_types: (tuple[str, ...]) Forecast types, "Daily" and/or "Hourly".
+        :param forecast_jobs: (ForecastJobs) Runs the forecasts, so users asking for a city being prewarmed
+        wait for its forecast instead of computing it again.
+        :param after_midnight: (float) Seconds after the date change the background thread runs again.
+        :param clock: (Callable[[], datetime.datetime]) Gives the current local time.
+        """
+        self._cities = cities
+        self._forecast_types = forecast_types
+        self._forecast_jobs = forecast_jobs
+        self._after_midnight = after_midnight
+        self._clock = clock
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def requests(self, today: datetime.date | None = None) -> list[dict]:
+        """
+        Get the forecast requests of one run.
+
+        :param today: (datetime.date | None) Current date. If None, the date of the clock.
+        :return: (list[dict]) Requests, as WeatherForecast.predict takes them, in the order of the cities.
+        """
+        start, end = default_window(today or self._clock().date())
+        requests = {}
+        for city in self._cities:
+            for forecast_type in self._forecast_types:
+                user_input = {'lat': city.lat, 'lon': city.lon, 'type': forecast_type,
+                              'from': start.isoformat(), 'to': end.isoformat()}
+                requests.setdefault(ForecastJobs.key(user_input), user_input)
+        return list(requests.values())
+
+    def run_once(self) -> dict[str, float]:
+        """
+        Compute the forecasts of all cities. A failing forecast is reported and skipped.
+
+        :return: (dict[str, float]) Number of computed and failed forecasts and seconds the run took.
+        """
+        started = time.perf_counter()
+        computed = failed = 0
+        for user_input in self.requests():
+            if self._stopped.is_set():
+                break
+            try:
+                self._forecast_jobs.predict(user_input)
+                computed += 1
+            except Exception as e:
+                print("Error while prewarming", user_input, e)
+                traceback.print_exc()
+                failed += 1
+        return {"forecasts": computed, "failed": failed, "seconds": time.perf_counter() - started}
+
+    def seconds_until_next_run(self) -> float:
+        """
+        Get the time the background thread waits for after a run.
+
+        :return: (float) Seconds until after_midnight seconds past the next local date change.
+        """
+        now = self._clock()
+        next_run = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time(),
+                                             tzinfo=now.tzinfo) + datetime.timedelta(seconds=self._after_midnight)
+        return (next_run - now).total_seconds()
+
+    def start(self):
+        """Run in a background thread, once right away and then just after every date change."""
+        self._thread = threading.Thread(target=self._run, daemon=True, name="prewarm")
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the forecast it is computing."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            day = self._clock().date()
+            self.run_once()
+            # a run that went past midnight prewarmed yesterday's window, the next one starts right away
+            if self._clock().date() == day:
+                self._stopped.wait(self.seconds_until_next_run())
+
+
+def start_prewarm(cities: list[CityInfo]):
+    """
+    Start prewarming the forecasts of cities in the background. No-op once a prewarmer runs.
+
+    :param cities: (list[CityInfo]) Cities to forecast, see Prewarmer.
+    """
+    global _prewarmer
+    with _prewarmer_lock:
+        if _prewarmer is None and cities:
+            _prewarmer = Prewarmer(cities)
+            _prewarmer.start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the default forecasts of the most populous cities")
+    parser.add_argument("--cities", help="Number of cities", required=False, dest="cities", type=int,
+                        default=DEFAULT_PREWARM_CITIES)
+    parser.add_argument("--types", help="Comma separated forecast types", required=False, dest="types",
+                        default=",".join(FORECAST_TYPES))
+
+    args = parser.parse_args()
+
+    cities = top_cities(CityCollectionBuilder().build_map(), args.cities)
+    stats = Prewarmer(cities, tuple(args.types.split(","))).run_once()
+    print(f"Prewarmed {stats['forecasts']:.0f} forecasts of {len(cities)} cities in {stats['seconds']:.1f} s, "
+          f"{stats['failed']:.0f} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import datetime
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from api.history_store import HistoryStore
+from utils.file_utils import atomic_write, cache_entries, evict_lru
+from utils.path_utils import data_dir
+
+# bump when the way forecasts are made changes, so old results are not served anymore
+FORECAST_VERSION = 1
+
+
+class ForecastResultCache:
+    """
+    Disk-backed cache of forecast results.
+
+    The prediction and the actual weather of a forecast are stored as Parquet files, which keep the compact
+    float32 measurements and the categorical weather types as they are. When the cache grows over max_bytes,
+    the least recently used results are evicted. Results of ranges that are not final yet (see is_final) should
+    be keyed by the day they were made.
+    """
+
+    def __init__(self, root: str | None = None, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize result cache.
+
+        :param root: (str | None) Directory the results are stored in. Created on first write.
+        If None, .forecasts in the data directory, see utils.path_utils.data_dir.
+        :param max_bytes: (int) Size the cache is kept under.
+        """
+        self._root_dir = root
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(version: str, lat: float, lon: float, start: str, end: str, forecast_type: str) -> str:
+        """
+        Get the cache key of a forecast.
+
+        :param version: (str) Everything besides the request the result depends on, e.g. the engine.
+        :param lat: (float) Snapped latitude.
+        :param lon: (float) Snapped longitude.
+        :param start: (str) First date ISO 8601.
+        :param end: (str) Last date ISO 8601.
+        :param forecast_type: (str) "Daily" or "Hourly".
+        :return: (str) Key.
+        """
+        parts = [FORECAST_VERSION, version, float(lat), float(lon), start, end, forecast_type]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    @staticmethod
+    def is_final(end: datetime.date) -> bool:
+        """
+        Check if a forecast up to a date only compares against archive data that does not change anymore.
+
+        :param end: (datetime.date) Last date of the forecast.
+        :return: (bool) True if the result stays valid.
+        """
+        return end <= datetime.date.today() - datetime.timedelta(days=HistoryStore.recent_days)
+
+    def get(self, key: str) -> tuple[DataFrame, DataFrame] | None:
+        """
+        Get a forecast result.
+
+        :param key: (str) Key of the result.
+        :return: (tuple[DataFrame, DataFrame] | None) Prediction and actual weather, None if not cached.
+        """
+        try:
+            prediction = pq.read_table(self._path(key, "prediction")).to_pandas()
+            actual = pq.read_table(self._path(key, "actual")).to_pandas()
+            os.utime(self._path(key, "prediction"))  # mark as recently used
+            os.utime(self._path(key, "actual"))
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return prediction, actual
+
+    def put(self, key: str, prediction: DataFrame, actual: DataFrame):
+        """
+        Store a forecast result and evict the least recently used results if the cache got too big.
+
+        :param key: (str) Key of the result.
+        :param prediction: (DataFrame) Predicted weather.
+        :param actual: (DataFrame) Actual weather.
+        """
+        with self._lock:
+            self._root.mkdir(parents=True, exist_ok=True)
+            # the actual weather is written last, get only finds results whose both parts are complete
+            _write(self._path(key, "prediction"), prediction)
+            _write(self._path(key, "actual"), actual)
+            evict_lru(self._entries(), self._max_bytes)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get cache statistics.
+
+        :return: (dict[str, int]) Hits and misses of this process, number of cached results and their size.
+        """
+        entries = self._entries()
+        return {"hits": self.hits, "misses": self.misses,
+                "results": sum(len(files) == 2 for files, _, _ in entries.values()),
+                "bytes": sum(size for _, size, _ in entries.values())}
+
+    @property
+    def _root(self) -> Path:
+        return Path(self._root_dir) if self._root_dir is not None else data_dir('.forecasts')
+
+    def _entries(self) -> dict[str, tuple[list[Path], int, float]]:
+        # the prediction and the actual weather of a result are one entry
+        return cache_entries(self._root.glob("*.parquet"), key=lambda path: path.name.split(".")[0])
+
+    def _path(self, key: str, part: str) -> Path:
+        return self._root / f"{key}.{part}.parquet"
+
+
+def _write(path: Path, frame: DataFrame):
+    atomic_write(path, lambda tmp: pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), tmp))
+
+
+DEFAULT_RESULT_CACHE = ForecastResultCache()
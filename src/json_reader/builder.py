@@ -1,3 +1,5 @@
+import traceback
+
 from json_reader.json_parser import JSONParser
 from json_reader.city import CityCollection
 from utils.files_definition import FilePaths
@@ -21,3 +23,17 @@ class CityCollectionBuilder:
         cities_map = AutocompleteHelper()
         cities_map.load_from(collection)
         return cities_map
+
+
+def init_autocomplete_helper() -> AutocompleteHelper:
+    """
+    Build the autocomplete helper of the default cities, which the app and the API search.
+
+    :return: (AutocompleteHelper) Helper of the default cities, an empty one if they could not be read.
+    """
+    try:
+        return CityCollectionBuilder().build_map()
+    except Exception as e:
+        print("Error while creating AutoCompleteHelper:", e)
+        traceback.print_exc()
+        return AutocompleteHelper()
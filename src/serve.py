@@ -0,0 +1,37 @@
+import argparse
+from pathlib import Path
+
+import panel as pn
+
+from api.forecast_api import routes
+from json_reader.builder import init_autocomplete_helper
+
+APP_PATH = Path(__file__).with_name("app.py")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app and its JSON API on one server")
+    parser.add_argument("--port", help="Port to listen on", required=False, dest="port", type=int, default=5006)
+    parser.add_argument("--address", help="Address to listen on", required=False, dest="address")
+    parser.add_argument("--allow-websocket-origin", help="Host allowed to connect to the app, can be repeated",
+                        required=False, dest="websocket_origin", action="append")
+    parser.add_argument("--num-threads", help="Threads the sessions of the app run on", required=False,
+                        dest="num_threads", type=int)
+    parser.add_argument("--api-workers", help="Maximum number of API requests worked on at once", required=False,
+                        dest="api_workers", type=int, default=8)
+    parser.add_argument("--admin", help="Serve the admin panel at /admin", action="store_true", dest="admin")
+    parser.add_argument("--liveness-endpoint", help="Serve a liveness endpoint at this path", required=False,
+                        dest="liveness_endpoint")
+
+    args = parser.parse_args()
+
+    if args.num_threads:
+        pn.config.nthreads = args.num_threads
+    # the API shares the process, and so the forecast jobs and caches, with the sessions of the app
+    pn.serve({"app": str(APP_PATH)}, port=args.port, address=args.address, websocket_origin=args.websocket_origin,
+             extra_patterns=routes(init_autocomplete_helper(), max_workers=args.api_workers),
+             admin=args.admin, liveness=args.liveness_endpoint or False, show=False, start=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,14 @@
 from enum import Enum, auto
 
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 
+# compact schema of the weather frames: measurements as float32, raw weather codes (WMO, 0-99) as uint8
+MEASUREMENT_DTYPE = np.float32
+CODE_DTYPE = np.uint8
+code_columns = ["weather_code"]
+
 
 def plot_features_evolution(data_frame: pd.DataFrame, features: list[str], time: list[str]):
     """
@@ -57,5 +63,22 @@ def prepare_data(df: pd.DataFrame, discrete_features: list[str]) -> pd.DataFrame
     df = df.rename(columns={"date": "ds"})
     df = df.dropna(subset=discrete_features)
     df = df.interpolate(method="linear", limit_direction="both")
-    return df
+    return compact_dtypes(df)
+
+
+def compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Casts measurements to MEASUREMENT_DTYPE and weather codes without missing values to CODE_DTYPE.
+
+    Other columns (dates, labels) are kept as they are.
+
+    :param df: (pd.DataFrame) Dataframe with features.
+    :return: (pd.DataFrame) Dataframe in the compact schema.
+    """
+    dtypes = {}
+    for column in df.columns:
+        if column in code_columns and not df[column].isna().any():
+            dtypes[column] = CODE_DTYPE
+        elif column not in code_columns and pd.api.types.is_float_dtype(df[column]):
+            dtypes[column] = MEASUREMENT_DTYPE
+    return df.astype(dtypes, copy=False) if dtypes else df
 
@@ -0,0 +1,87 @@
+import contextlib
+import os
+import tempfile
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+
+@contextlib.contextmanager
+def file_lock(path: Path):
+    """
+    Hold an exclusive lock on a lock file, which serializes the processes locking the same file.
+
+    Without fcntl (Windows) the lock file is created but not locked, callers still need a lock of their own
+    for the threads of a process.
+
+    :param path: (Path) Lock file. Created with its directory if needed.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as file:
+        if fcntl is not None:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write(path: Path, write: Callable[[str], None]):
+    """
+    Write a file through a temporary file, so readers never see a half written file. Every writer gets its own
+    temporary file, so writers in other processes do not move it away from each other.
+
+    :param path: (Path) File to write. Its directory must exist.
+    :param write: (Callable[[str], None]) Writes the content to the path of the temporary file it is given.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def cache_entries(paths: Iterable[Path],
+                  key: Callable[[Path], str] = lambda path: path.name) -> dict[str, tuple[list[Path], int, float]]:
+    """
+    Group the files of a disk cache into its entries.
+
+    :param paths: (Iterable[Path]) Files of the cache. Files removed meanwhile are skipped.
+    :param key: (Callable[[Path], str]) Key of the entry a file belongs to, by default every file is an entry.
+    :return: (dict[str, tuple[list[Path], int, float]]) Files, total size and last use (the oldest modification
+    time of its files) per key.
+    """
+    entries = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        files, size, used = entries.get(key(path), ([], 0, float("inf")))
+        entries[key(path)] = (files + [path], size + stat.st_size, min(used, stat.st_mtime))
+    return entries
+
+
+def evict_lru(entries: dict[str, tuple[list[Path], int, float]], max_bytes: int):
+    """
+    Remove the least recently used entries of a disk cache until it is not bigger than max_bytes. All files of
+    an entry are removed together, so no entry is left incomplete.
+
+    :param entries: (dict[str, tuple[list[Path], int, float]]) Entries of the cache, see cache_entries.
+    :param max_bytes: (int) Size the cache is kept under.
+    """
+    total = sum(size for _, size, _ in entries.values())
+    for files, size, _ in sorted(entries.values(), key=lambda entry: entry[2]):
+        if total <= max_bytes:
+            break
+        for path in files:
+            path.unlink(missing_ok=True)
+        total -= size
@@ -1,3 +1,4 @@
 class FilePaths:
     TEST_CITIES_FILE = "resource/test/test-city.json"
     DEFAULT_CITIES_FILE = "resource/cities/cities.json"
+    TRAINING_WINDOWS_FILE = "resource/training_windows.json"
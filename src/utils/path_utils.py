@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -24,6 +25,16 @@ class ParentPath:
         self.config_path = current_directory
 
 
+def data_dir(name: str) -> Path:
+    """
+    Get the path of a local data directory, e.g. a cache.
+
+    Data directories are kept next to the sources, or in WEATHERCAST_DATA_DIR if it is set.
+    The variable is read on every call, so it also moves the directories of caches created before.
+    """
+    return Path(os.environ.get("WEATHERCAST_DATA_DIR") or ParentPath().config_path) / name
+
+
 def debugger_is_active() -> bool:
     """Return if the debugger is currently active"""
     return hasattr(sys, 'gettrace') and sys.gettrace() is not None
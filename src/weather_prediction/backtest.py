@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from utils.analyses_utils import DataFrameType
+
+
+class Backtester:
+    """
+    Rolling-origin backtesting of a forecasting engine.
+
+    Every origin is a row of the dataset. The model is trained on the train_size rows before the origin
+    and predicts the next horizon periods, which are compared to the actual values. Origins are stride rows
+    apart, so windows overlap if stride is smaller than train_size + horizon. Windows are forecasted
+    on a process pool, the errors of all windows are reduced at once per variable and horizon step.
+    """
+
+    def __init__(self, model_class: type, df: DataFrame, df_type: DataFrameType, regressors: list[str],
+                 train_size: int, horizon: int, stride: int | None = None, workers: int | None = None,
+                 model_kwargs: dict[str, Any] | None = None):
+        """
+        Initialize backtester.
+
+        :param model_class: (type[WeatherPredictionModel]) Forecasting engine to test.
+        :param df: (pd.DataFrame) Dataframe with features.
+        :param df_type: (DataFrameType) Type of the dataframe (Daily or Hourly)
+        :param regressors: (list[str]) List of independent variables.
+        :param train_size: (int) Number of periods to use for training.
+        :param horizon: (int) Number of periods to predict from every origin.
+        :param stride: (int | None) Rows between two origins. If None, train_size + horizon (no overlap).
+        :param workers: (int | None) Number of worker processes. If None, one per CPU.
+        If 1, everything runs in the calling process.
+        :param model_kwargs: (dict[str, Any] | None) Extra arguments of the model constructor.
+        """
+        self._model_class = model_class
+        self._df = df.reset_index(drop=True)
+        self._df_type = df_type
+        self._regressors = regressors
+        self._train_size = train_size
+        self._horizon = horizon
+        self._stride = stride or train_size + horizon
+        self._workers = workers or os.cpu_count()
+        self._model_kwargs = model_kwargs or {}
+
+    def origins(self) -> list[int]:
+        """
+        Get the origins of all windows.
+
+        :return: (list[int]) Row of the first predicted period of every window.
+        """
+        return list(range(self._train_size, len(self._df) - self._horizon + 1, self._stride))
+
+    def run(self) -> dict[str, DataFrame]:
+        """
+        Forecast every window and calculate the errors.
+
+        :return: (dict[str, DataFrame]) "MAE" and "RMSE", each with one row per horizon step (1 to horizon)
+        and one column per variable.
+        :raises ValueError: If the dataset is too short for a single window.
+        """
+        origins = self.origins()
+        if not origins:
+            raise ValueError(f"Dataset of {len(self._df)} rows is too short for a window of "
+                             f"{self._train_size} + {self._horizon} periods")
+
+        tasks = [(self._model_class, self._df.iloc[origin - self._train_size:origin], self._df_type,
+                  self._regressors, self._model_kwargs, self._horizon, self._df.iloc[origin]["ds"], self._train_size)
+                 for origin in origins]
+        if self._workers == 1 or len(tasks) == 1:
+            forecasts = [_forecast_window(*task) for task in tasks]
+        else:
+            # spawn, not fork: the app process runs server and fetch threads that must not be forked
+            with ProcessPoolExecutor(max_workers=min(self._workers, len(tasks)),
+                                     mp_context=multiprocessing.get_context("spawn")) as executor:
+                forecasts = list(executor.map(_forecast_window, *zip(*tasks)))
+
+        # forecasts are matched to the actual values by date, rows missing in the dataset are ignored
+        variables = [column for column in self._df.columns if column != "ds"]
+        actual_by_date = self._df.set_index("ds")[variables]
+        predicted = np.stack([forecast[variables].to_numpy(dtype=np.float64) for forecast in forecasts])
+        actual = np.stack([actual_by_date.reindex(forecast["ds"]).to_numpy(dtype=np.float64)
+                           for forecast in forecasts])
+
+        errors = predicted - actual
+        steps = pd.RangeIndex(1, self._horizon + 1, name="step")
+        return {
+            "MAE": DataFrame(np.nanmean(np.abs(errors), axis=0), index=steps, columns=variables),
+            "RMSE": DataFrame(np.sqrt(np.nanmean(errors ** 2, axis=0)), index=steps, columns=variables)
+        }
+
+
+def _forecast_window(model_class: type, train: DataFrame, df_type: DataFrameType, regressors: list[str],
+                     model_kwargs: dict[str, Any], horizon: int, start_ds: pd.Timestamp,
+                     train_size: int) -> DataFrame:
+    """Forecast one backtest window. Runs in a worker process."""
+    model = model_class(train, df_type, regressors, **model_kwargs)
+    return model.predict(horizon, start_ds, train_size)
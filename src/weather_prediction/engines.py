@@ -0,0 +1,23 @@
+from weather_prediction.harmonic.harmonic_model import HarmonicWeatherPredictionModel
+from weather_prediction.prediction_model import WeatherPredictionModel
+from weather_prediction.prophet.prophet_model import ProphetWeatherPredictionModel
+
+# forecasting engines by name, all of them follow the WeatherPredictionModel predict/test contract
+ENGINES: dict[str, type[WeatherPredictionModel]] = {
+    "prophet": ProphetWeatherPredictionModel,
+    "harmonic": HarmonicWeatherPredictionModel
+}
+DEFAULT_ENGINE = "prophet"
+
+
+def get_engine(name: str) -> type[WeatherPredictionModel]:
+    """
+    Get a forecasting engine by name.
+
+    :param name: (str) Name of the engine, one of ENGINES.
+    :return: (type[WeatherPredictionModel]) Model class of the engine.
+    :raises ValueError: If there is no engine with this name.
+    """
+    if name not in ENGINES:
+        raise ValueError(f"Unknown engine {name}, expected one of {', '.join(ENGINES)}")
+    return ENGINES[name]
@@ -0,0 +1,66 @@
+import pandas as pd
+
+from api.api_client import ApiClient
+
+
+class FetchPlanner:
+    """
+    Plans the history requests of one forecast.
+
+    Collects the date ranges the forecast needs (e.g. the training window and the evaluation window),
+    fetches the union of overlapping or adjacent ranges once per resolution and slices every range
+    out of the single result.
+    """
+
+    def __init__(self):
+        self._ranges: dict[str, tuple[str, pd.Timestamp, pd.Timestamp]] = {}
+
+    def add(self, name: str, resolution: str, start: str, end: str):
+        """
+        Add a date range to fetch.
+
+        :param name: (str) Name the sliced frame is returned under.
+        :param resolution: (str) "daily" or "hourly".
+        :param start: (str) Start date ISO 8601 (inclusive).
+        :param end: (str) End date ISO 8601 (inclusive).
+        """
+        self._ranges[name] = (resolution, pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize())
+
+    def plan(self) -> list[tuple[str, pd.Timestamp, pd.Timestamp]]:
+        """
+        Get the requests that cover all added ranges.
+
+        :return: (list[tuple[str, pd.Timestamp, pd.Timestamp]]) (resolution, start, end) of every request.
+        """
+        requests = []
+        for resolution, start, end in sorted(self._ranges.values()):
+            if requests and requests[-1][0] == resolution and start <= requests[-1][2] + pd.Timedelta(days=1):
+                requests[-1] = (resolution, requests[-1][1], max(requests[-1][2], end))
+            else:
+                requests.append((resolution, start, end))
+        return requests
+
+    def fetch(self, api_client: ApiClient, lat: float, lon: float) -> dict[str, pd.DataFrame]:
+        """
+        Fetch all added ranges for one location.
+
+        :param api_client: (ApiClient) Client to fetch with.
+        :param lat: (float) Latitude.
+        :param lon: (float) Longitude.
+        :return: (dict[str, pd.DataFrame]) Frame of every added range, by name.
+        """
+        fetched = []
+        for resolution, start, end in self.plan():
+            if resolution == "daily":
+                df = api_client.get_daily_weather_history(lat, lon, start.date().__str__(), end.date().__str__())
+            else:
+                df = api_client.get_hourly_weather_history(lat, lon, start.date().__str__(), end.date().__str__())
+            fetched.append((resolution, start, end, df))
+
+        frames = {}
+        for name, (resolution, start, end) in self._ranges.items():
+            df = next(df for fetched_resolution, fetched_start, fetched_end, df in fetched
+                      if fetched_resolution == resolution and fetched_start <= start and end <= fetched_end)
+            mask = (df["date"] >= start) & (df["date"] < end + pd.Timedelta(days=1))
+            frames[name] = df.loc[mask].reset_index(drop=True)
+        return frames
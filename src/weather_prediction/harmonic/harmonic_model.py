@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+
+from utils.analyses_utils import DataFrameType
+from weather_prediction.prediction_model import WeatherPredictionModel
+
+
+class HarmonicWeatherPredictionModel(WeatherPredictionModel):
+    """
+    Seasonal regression model. Fits all variables of a dataframe at once with NumPy.
+
+    Every variable is modeled as a linear trend plus Fourier terms of the yearly and the daily
+    seasonality, which are enabled by the rules Prophet uses for its automatic seasonalities.
+    The independent variables are solved together as one batched least squares problem over a shared
+    design matrix. The other variables are solved together in a second one, which also has the
+    independent variables as regressors.
+    """
+
+    version = 1
+    yearly_order = 10  # same Fourier orders as Prophet uses by default
+    daily_order = 4
+    ridge = 1e-3  # small L2 penalty relative to the number of rows, keeps short windows stable
+
+    def predict(self, periods: int, start_date: str, train_size: int) -> pd.DataFrame:
+        """
+        Predict using seasonal regression.
+
+        First, predict the independent variables. Then, predict the other variables
+        using the predicted independent variables as regressors.
+
+        :param start_date: (str) Start date for the prediction.
+        :param periods: (int) Number of periods to predict. (hours or days)
+        :param train_size: (int) Number of periods to use for training.
+        :return: (pd.DataFrame) Dataframe with predictions.
+        :raises ValueError: If the DataFrameType is unknown.
+        """
+        train_data = self._train_data(start_date, train_size)
+        complete_future = self._create_empty_future(periods, start_date, self._df_type)
+
+        first, last = train_data["ds"].min(), train_data["ds"].max()
+        x_train = self._design(train_data["ds"], first, last)
+        x_future = self._design(complete_future["ds"], first, last)
+
+        # independent variables, all at once
+        regressors_train = train_data[self._regressors].to_numpy(dtype=np.float64)
+        regressors_future = x_future @ _solve(x_train, regressors_train, self.ridge)
+
+        # other variables, all at once, with the standardized independent variables as extra columns
+        mean = regressors_train.mean(axis=0)
+        std = regressors_train.std(axis=0)
+        std[std == 0] = 1
+        x_train = np.hstack([x_train, (regressors_train - mean) / std])
+        x_future = np.hstack([x_future, (regressors_future - mean) / std])
+        other_variables = self._other_variables()
+        other_future = x_future @ _solve(x_train, train_data[other_variables].to_numpy(dtype=np.float64), self.ridge)
+
+        complete_future[self._regressors] = regressors_future
+        complete_future[other_variables] = other_future
+        return complete_future
+
+    def _design(self, ds: pd.Series, first: pd.Timestamp, last: pd.Timestamp) -> np.ndarray:
+        """
+        Build the design matrix: intercept, linear trend and the enabled Fourier terms.
+
+        :param ds: (pd.Series) Dates to build the rows for.
+        :param first: (pd.Timestamp) First date of the training data.
+        :param last: (pd.Timestamp) Last date of the training data.
+        :return: (np.ndarray) Matrix with one row per date.
+        """
+        span_days = max((last - first) / pd.Timedelta(days=1), 1)
+        days = ((ds - first) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+        columns = [np.ones_like(days), days / span_days]
+
+        seasonalities = []
+        if span_days >= 2 * 365:
+            seasonalities.append((365.25, self.yearly_order))
+        if self._df_type == DataFrameType.HourlyHistory and span_days >= 2:
+            seasonalities.append((1.0, self.daily_order))
+
+        # phase is counted from the epoch, so all windows share the same seasonal terms
+        epoch_days = ((ds - pd.Timestamp(0)) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+        for period, order in seasonalities:
+            angles = 2 * np.pi * np.outer(epoch_days / period, np.arange(1, order + 1))
+            columns.extend(np.sin(angles).T)
+            columns.extend(np.cos(angles).T)
+        return np.column_stack(columns)
+
+
+def _solve(x: np.ndarray, y: np.ndarray, ridge: float) -> np.ndarray:
+    """
+    Solve the ridge least squares problem x @ coefficients = y for every column of y at once.
+
+    :param x: (np.ndarray) Design matrix, first column is the (not penalized) intercept.
+    :param y: (np.ndarray) Targets, one column per variable.
+    :param ridge: (float) Penalty per row of x.
+    :return: (np.ndarray) Coefficients, one column per variable.
+    """
+    penalty = ridge * len(x) * np.eye(x.shape[1])
+    penalty[0, 0] = 0
+    return np.linalg.solve(x.T @ x + penalty, x.T @ y)
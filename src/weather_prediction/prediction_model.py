@@ -0,0 +1,147 @@
+from abc import ABC, abstractmethod
+from typing import Any, Iterator
+
+import pandas as pd
+from pandas import DataFrame
+
+from utils.analyses_utils import DataFrameType
+from weather_prediction.backtest import Backtester
+
+
+class WeatherPredictionModel(ABC):
+    """
+    Base of the forecasting engines. Used to predict all variables for the weather in the future.
+
+    Independent variables are predicted independently. Other variables are
+    predicted using the predicted independent variables as regressors.
+    """
+
+    # bump when the predictions of the engine change, so results cached from older ones are not served anymore
+    version = 1
+    # constructor arguments that change the predictions, not only how they are computed
+    output_kwargs: tuple[str, ...] = ()
+
+    def __init__(self, df: DataFrame, df_type: DataFrameType, regressors: list[str],
+                 location: tuple[float, float] | None = None):
+        """
+        Initialize model.
+
+        :param df: (pd.DataFrame) Dataframe with features.
+        :param df_type: (DataFrameType) Type of the dataframe (Daily or Hourly)
+        :param regressors: (list[str]) List of independent variables.
+        :param location: (tuple[float, float] | None) Grid cell (latitude, longitude) the data belongs to.
+        """
+        self._df = df
+        self._regressors = regressors
+        self._df_type = df_type
+        self._location = location
+
+    @abstractmethod
+    def predict(self, periods: int, start_date: str, train_size: int) -> pd.DataFrame:
+        """
+        Predict all variables.
+
+        :param start_date: (str) Start date for the prediction.
+        :param periods: (int) Number of periods to predict. (hours or days)
+        :param train_size: (int) Number of periods to use for training.
+        :return: (pd.DataFrame) Dataframe with "ds", the independent variables and then the other variables.
+        :raises ValueError: If the DataFrameType is unknown.
+        """
+
+    def predict_stream(self, periods: int, start_date: str, train_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Predict all variables, yielding the prediction so far every time variables are ready.
+
+        Engines that predict variables one by one override this, by default all variables are yielded at once.
+        Parameters as for predict.
+
+        :return: (Iterator[pd.DataFrame]) Dataframes with "ds" and the variables predicted so far, in the column
+        order of predict. The last one is the complete prediction.
+        """
+        yield self.predict(periods, start_date, train_size)
+
+    @classmethod
+    def test(cls, period: int,
+             df: pd.DataFrame, df_type: DataFrameType,
+             regressors: list[str],
+             train_size: int = 100, stride: int | None = None, workers: int | None = None,
+             model_kwargs: dict[str, Any] | None = None) -> dict[str, dict[str, Any]]:
+
+        """Test the prediction
+
+        Backtests the model from rolling origins (see Backtester) and reports the average MAE and RMSE
+        of each variable on the last day of the forecast. By default, the dataset is split into chunks of size
+        (train_size + period) and the next period is predicted after each of them.
+
+        :param period: (int) Number of period to predict. (days)
+        :param df: (pd.DataFrame) Dataframe with features.
+        :param df_type: (DataFrameType) Type of the dataframe (Daily or Hourly)
+        :param regressors: (list[str]) List of independent variables.
+        :param train_size: (int) Number of periods to use for training.
+        :param stride: (int | None) Rows between two forecast origins. If None, train_size + period.
+        :param workers: (int | None) Number of worker processes the windows are forecasted in. If None, one per CPU.
+        :param model_kwargs: (dict[str, Any] | None) Extra arguments of the model constructor.
+        :return: (dict[str, dict[str, Any]]) Dictionary with validation metrics for each variable.
+        """
+        backtester = cls.backtester(df, df_type, regressors, train_size, period, stride, workers, model_kwargs)
+        return {metric: errors.iloc[-1].to_dict() for metric, errors in backtester.run().items()}
+
+    @classmethod
+    def in_process_kwargs(cls) -> dict[str, Any]:
+        """
+        Get the constructor arguments that keep the model in the calling process, for callers that already
+        run one model per worker process (backtests, batch forecasts).
+
+        :return: (dict[str, Any]) Extra arguments of the model constructor.
+        """
+        return {}
+
+    @classmethod
+    def backtester(cls, df: pd.DataFrame, df_type: DataFrameType, regressors: list[str], train_size: int,
+                   horizon: int, stride: int | None = None, workers: int | None = None,
+                   model_kwargs: dict[str, Any] | None = None) -> Backtester:
+        """
+        Get a rolling-origin backtester of this model, see Backtester for the parameters.
+
+        :return: (Backtester) Backtester.
+        """
+        return Backtester(cls, df, df_type, regressors, train_size, horizon, stride, workers, model_kwargs)
+
+    def _train_data(self, start_date: str, train_size: int) -> pd.DataFrame:
+        """
+        Get the training data of a prediction.
+
+        :param start_date: (str) Start date for the prediction.
+        :param train_size: (int) Number of periods to use for training.
+        :return: (pd.DataFrame) The train_size periods before start_date.
+        :raises ValueError: If the DataFrameType is unknown.
+        """
+        if self._df_type == DataFrameType.DailyHistory:
+            start_train_date = pd.to_datetime(start_date) - pd.DateOffset(days=train_size)
+            end_train_date = pd.to_datetime(start_date) - pd.DateOffset(days=1)
+        elif self._df_type == DataFrameType.HourlyHistory:
+            start_train_date = pd.to_datetime(start_date) - pd.DateOffset(hours=train_size)
+            end_train_date = pd.to_datetime(start_date) - pd.DateOffset(hours=1)
+        else:
+            raise ValueError("Unknown DataFrameType")
+
+        return self._df[(self._df["ds"] >= start_train_date) & (self._df["ds"] <= end_train_date)]
+
+    def _other_variables(self) -> list[str]:
+        """Get the variables predicted using the independent variables as regressors."""
+        return [column for column in self._df.columns if column not in self._regressors and column != "ds"]
+
+    @staticmethod
+    def _create_empty_future(periods: int, start, df_type: DataFrameType) -> pd.DataFrame:
+        """
+        Create empty future dataframe.
+
+        :param periods: (int) Number of periods to predict.
+        :return: (pd.DataFrame) Empty dataframe with future dates.
+        """
+        future = pd.DataFrame()
+        if df_type == DataFrameType.DailyHistory:
+            future["ds"] = pd.date_range(start=start, periods=periods, freq="D")
+        elif df_type == DataFrameType.HourlyHistory:
+            future["ds"] = pd.date_range(start=start, periods=periods, freq="h")
+        return future
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+from pandas import DataFrame
+
+from utils.file_utils import atomic_write, cache_entries, evict_lru
+from utils.path_utils import data_dir
+
+# bump when the way models are built changes, so old cache entries are not used anymore
+MODEL_VERSION = 1
+
+
+class ModelCache:
+    """
+    Disk-backed cache of fitted Prophet models.
+
+    Models are stored serialized (prophet.serialize.model_to_json), one file per key. When the cache grows
+    over max_bytes, the least recently used files are evicted. The cache also remembers the latest model
+    of every series (location, variable and regressors), which refits of a shifted window start from.
+    These pointers count towards max_bytes and are evicted like models.
+    """
+
+    def __init__(self, root: str | None = None, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize model cache.
+
+        :param root: (str | None) Directory the models are stored in. Created on first write.
+        If None, .models in the data directory, see utils.path_utils.data_dir.
+        :param max_bytes: (int) Size the cache is kept under.
+        """
+        self._root_dir = root
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def series_key(location: tuple[float, float] | None, df_type: str, variable: str, regressors: list[str]) -> str:
+        """
+        Get the key of a series of models, which differ only in their training window.
+
+        :param location: (tuple[float, float] | None) Grid cell (latitude, longitude) of the data, if known.
+        :param df_type: (str) Type of the data (DataFrameType value).
+        :param variable: (str) Predicted variable.
+        :param regressors: (list[str]) Regressors of the model.
+        :return: (str) Key.
+        """
+        parts = [MODEL_VERSION, location, df_type, variable, sorted(regressors)]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    @staticmethod
+    def key(location: tuple[float, float] | None, df_type: str, variable: str, regressors: list[str],
+            train: DataFrame) -> str:
+        """
+        Get the cache key of a model.
+
+        Besides grid cell, variable, regressor set and training window, the key covers the training data
+        itself, so a window whose data changed (e.g. days the archive filled in later) is fitted again.
+
+        :param location: (tuple[float, float] | None) Grid cell (latitude, longitude) of the data, if known.
+        :param df_type: (str) Type of the data (DataFrameType value).
+        :param variable: (str) Predicted variable.
+        :param regressors: (list[str]) Regressors of the model.
+        :param train: (DataFrame) Training data with a "ds" column.
+        :return: (str) Key.
+        """
+        data_digest = hashlib.sha1(pd.util.hash_pandas_object(train, index=False).to_numpy()).hexdigest()
+        parts = [ModelCache.series_key(location, df_type, variable, regressors),
+                 str(train["ds"].min()), str(train["ds"].max()), data_digest]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        """
+        Get a serialized model.
+
+        :param key: (str) Key of the model.
+        :return: (str | None) Serialized model, None if it is not cached.
+        """
+        path = self._path(key)
+        try:
+            model_json = path.read_text(encoding="utf-8")
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return model_json
+
+    def latest(self, series: str) -> str | None:
+        """
+        Get the serialized model stored last in a series.
+
+        :param series: (str) Key of the series, see series_key.
+        :return: (str | None) Serialized model, None if the series has no cached model.
+        """
+        try:
+            path = self._root / f"{series}.latest"
+            key = path.read_text(encoding="utf-8")
+            model_json = self._path(key).read_text(encoding="utf-8")
+            os.utime(path)  # mark as recently used
+            return model_json
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, model_json: str, series: str | None = None):
+        """
+        Store a serialized model and evict the least recently used models if the cache got too big.
+
+        :param key: (str) Key of the model.
+        :param model_json: (str) Serialized model.
+        :param series: (str | None) Key of the series the model becomes the latest model of.
+        """
+        with self._lock:
+            self._root.mkdir(parents=True, exist_ok=True)
+            _write(self._path(key), model_json)
+            if series is not None:
+                _write(self._root / f"{series}.latest", key)
+            evict_lru(self._entries(), self._max_bytes)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Get cache statistics.
+
+        :return: (dict[str, int]) Hits and misses of this process, number of cached models and their size.
+        """
+        entries = self._entries()
+        return {"hits": self.hits, "misses": self.misses, "models": sum(name.endswith(".json") for name in entries),
+                "bytes": sum(size for _, size, _ in entries.values())}
+
+    @property
+    def _root(self) -> Path:
+        return Path(self._root_dir) if self._root_dir is not None else data_dir('.models')
+
+    def _entries(self) -> dict[str, tuple[list[Path], int, float]]:
+        return cache_entries([*self._root.glob("*.json"), *self._root.glob("*.latest")])
+
+    def _path(self, key: str) -> Path:
+        return self._root / f"{key}.json"
+
+
+def _write(path: Path, text: str):
+    atomic_write(path, lambda tmp: Path(tmp).write_text(text, encoding="utf-8"))
@@ -1,15 +1,43 @@
-from typing import Any
-
+import collections
+import functools
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
 from prophet import Prophet
 from prophet.diagnostics import cross_validation, performance_metrics
-from sklearn.metrics import mean_absolute_error as MAE
+from prophet.serialize import model_from_json, model_to_json
 
 from utils.analyses_utils import DataFrameType
+from weather_prediction.backtest import Backtester
+from weather_prediction.prediction_model import WeatherPredictionModel
+from weather_prediction.prophet.model_cache import ModelCache
+
+DEFAULT_MODEL_CACHE = ModelCache()
+
+# worker pools are kept alive between predictions, starting a worker costs more than a fit
+_executors: dict[int, Executor] = {}
+_executors_lock = threading.Lock()
+
+# timings of the latest fits, see fit_stats
+_fit_timings: collections.deque[dict[str, float]] = collections.deque(maxlen=1000)
+
+# directory a worker process lets CmdStan write its output files to, set by _init_worker
+_output_root: str | None = None
 
 
-class ProphetWeatherPredictionModel:
+class ProphetWeatherPredictionModel(WeatherPredictionModel):
     """
     Prophet model. Used to predict all variables for the weather in the future.
 
@@ -17,17 +45,59 @@ class ProphetWeatherPredictionModel:
     predicted using the predicted independent variables as regressors.
     """
 
-    def __init__(self, df: DataFrame, df_type: DataFrameType, regressors: list[str]):
+    version = 1
+    output_kwargs = ("intervals",)
+
+    def __init__(self, df: DataFrame, df_type: DataFrameType, regressors: list[str], workers: int | None = None,
+                 location: tuple[float, float] | None = None,
+                 model_cache: ModelCache | None = DEFAULT_MODEL_CACHE, warm_start: bool = True,
+                 intervals: bool = False):
         """
         Initialize Prophet model.
 
         :param df: (pd.DataFrame) Dataframe with features.
         :param df_type: (DataFrameType) Type of the dataframe (Daily or Hourly)
         :param regressors: (list[str]) List of independent variables.
+        :param workers: (int | None) Number of worker processes the models are fitted in.
+        If None, one per CPU. If 1, everything runs in the calling process.
+        :param location: (tuple[float, float] | None) Grid cell (latitude, longitude) the data belongs to.
+        :param model_cache: (ModelCache | None) Cache of fitted models. If None, every model is fitted.
+        :param warm_start: (bool) Start the optimizer of every fit from the parameters of the latest cached
+        model of the same location and variable. Refits of a slightly shifted window then converge much faster.
+        :param intervals: (bool) Also predict uncertainty intervals, as "<variable>_lower" and "<variable>_upper"
+        columns after the predicted variables. Costs Prophet's sampling of 1000 trend/noise paths per prediction,
+        without it only the point forecast is evaluated.
+        """
+        super().__init__(df, df_type, regressors, location)
+        self._workers = workers or os.cpu_count()
+        self._model_cache = model_cache
+        self._warm_start = warm_start
+        self._intervals = intervals
+
+    @classmethod
+    def backtester(cls, df: pd.DataFrame, df_type: DataFrameType, regressors: list[str], train_size: int,
+                   horizon: int, stride: int | None = None, workers: int | None = None,
+                   model_kwargs: dict[str, Any] | None = None) -> Backtester:
+        """
+        Get a rolling-origin backtester of this model, see Backtester for the parameters.
+
+        The backtest windows already run in parallel, so each window fits its models in its own process.
+        Windows neither use nor fill the model cache: a warm start from whichever window finished last would
+        make the errors depend on scheduling, and the models of a backtest would evict the ones the app uses.
+
+        :return: (Backtester) Backtester.
         """
-        self._df = df
-        self._regressors = regressors
-        self._df_type = df_type
+        model_kwargs = {**cls.in_process_kwargs(), "model_cache": None, "warm_start": False, **(model_kwargs or {})}
+        return super().backtester(df, df_type, regressors, train_size, horizon, stride, workers, model_kwargs)
+
+    @classmethod
+    def in_process_kwargs(cls) -> dict[str, Any]:
+        """
+        Get the constructor arguments that keep the model in the calling process: it fits without worker pool.
+
+        :return: (dict[str, Any]) Extra arguments of the model constructor.
+        """
+        return {"workers": 1}
 
     def validate(self) -> dict[str, DataFrame]:
         """
@@ -73,123 +143,391 @@ class ProphetWeatherPredictionModel:
         First, predict the independent variables. Then, predict the other variables
         using the predicted independent variables as regressors.
 
+        The work runs as a small dependency graph on the worker pool: all models are fitted
+        at once, since fitting needs the training data only; each independent variable is predicted
+        as soon as its model is fitted; the other variables are predicted once all independent
+        variables are.
+
         :param start_date: (str) Start date for the prediction.
         :param periods: (int) Number of periods to predict. (hours or days)
         :param train_size: (int) Number of periods to use for training.
         :return: (pd.DataFrame) Dataframe with predictions.
         :raises ValueError: If the DataFrameType is unknown.
         """
-        if self._df_type == DataFrameType.DailyHistory:
-            start_train_date = pd.to_datetime(start_date) - pd.DateOffset(days=train_size)
-            end_train_date = pd.to_datetime(start_date) - pd.DateOffset(days=1)
-        elif self._df_type == DataFrameType.HourlyHistory:
-            start_train_date = pd.to_datetime(start_date) - pd.DateOffset(hours=train_size)
-            end_train_date = pd.to_datetime(start_date) - pd.DateOffset(hours=1)
-        else:
-            raise ValueError("Unknown DataFrameType")
+        for prediction in self.predict_stream(periods, start_date, train_size):
+            pass
+        return prediction
 
-        train_data = self._df[(self._df["ds"] >= start_train_date) & (self._df["ds"] <= end_train_date)]
+    def predict_stream(self, periods: int, start_date: str, train_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Predict using Prophet model, yielding the prediction so far as soon as each variable is predicted.
+
+        Runs the same work as predict, so the first variable is ready after its own fit, not after all of them.
+
+        :param start_date: (str) Start date for the prediction.
+        :param periods: (int) Number of periods to predict. (hours or days)
+        :param train_size: (int) Number of periods to use for training.
+        :return: (Iterator[pd.DataFrame]) Dataframes with "ds" and the variables predicted so far.
+        The last one is the complete prediction.
+        :raises ValueError: If the DataFrameType is unknown.
+        """
+        train_data = self._train_data(start_date, train_size)
 
         future_with_regressors = self._create_empty_future(periods, start_date, self._df_type)
         only_future = future_with_regressors[["ds"]].copy()
 
-        # create a dictionary to hold the different independent variable forecasts
+        executor = self._executor()
+        other_variables = self._other_variables()
+
+        fits = {}
         for regressor in self._regressors:
-            train = train_data[["ds", regressor]].copy()
-            train = train.rename(columns={regressor: "y"})
+            train = train_data[["ds", regressor]].rename(columns={regressor: "y"})
+            fits[regressor] = functools.partial(self._fit, executor, regressor, train, [])
+        for variable in other_variables:
+            train = train_data[["ds", variable] + self._regressors].rename(columns={variable: "y"})
+            fits[variable] = functools.partial(self._fit, executor, variable, train, self._regressors)
+        if not isinstance(executor, _InlineExecutor):
+            # fit every model at once, inline every model is fitted right before it is predicted instead
+            fits = {variable: _started(fit) for variable, fit in fits.items()}
+
+        # predict the independent variables as their models become ready
+        predictions, bounds = {}, {}
+        regressor_fits = {regressor: fits[regressor] for regressor in self._regressors}
+        for regressor, (values, variable_bounds) in _predict_as_fitted(executor, regressor_fits, only_future,
+                                                                       self._intervals):
+            future_with_regressors[regressor] = predictions[regressor] = values
+            bounds[regressor] = variable_bounds
+            yield self._assemble(only_future, predictions, bounds)
 
-            # create a new Prophet model
-            regressor_model = Prophet(seasonality_mode="multiplicative")
-            regressor_model.fit(train)
+        # now calculate the forecasts for the other variables
+        variable_fits = {variable: fits[variable] for variable in other_variables}
+        for variable, (values, variable_bounds) in _predict_as_fitted(executor, variable_fits,
+                                                                      future_with_regressors, self._intervals):
+            predictions[variable], bounds[variable] = values, variable_bounds
+            yield self._assemble(only_future, predictions, bounds)
+
+    def _assemble(self, future: DataFrame, predictions: dict[str, np.ndarray],
+                  bounds: dict[str, tuple[np.ndarray, np.ndarray] | None]) -> DataFrame:
+        """
+        Build the prediction frame of the variables predicted so far.
 
-            regressor_future = regressor_model.predict(only_future)
+        :param future: (DataFrame) Frame with the "ds" column.
+        :param predictions: (dict[str, np.ndarray]) Predicted values by variable.
+        :param bounds: (dict[str, tuple[np.ndarray, np.ndarray] | None]) Uncertainty bounds by variable.
+        :return: (DataFrame) "ds", the independent variables, the other variables and then the bounds, if requested.
+        """
+        complete_future = future.copy()
+        ordered = [variable for variable in self._regressors + self._other_variables() if variable in predictions]
+        for variable in ordered:
+            complete_future[variable] = predictions[variable]
+        if self._intervals:
+            for variable in ordered:
+                complete_future[f"{variable}_lower"], complete_future[f"{variable}_upper"] = bounds[variable]
+        return complete_future
 
-            # add the forecast to the dictionary
-            future_with_regressors[regressor] = regressor_future["yhat"]
+    def _fit(self, executor: Executor, variable: str, train: DataFrame, regressors: list[str]) -> Future:
+        """
+        Fit a model of one variable, or take it from the model cache.
 
-        # now calculate the forecasts for the other variables
-        complete_future = future_with_regressors.copy()
+        A fitted model becomes the latest model of its series, which warm starts the next fit.
 
-        other_variables = [column for column in self._df.columns if column not in self._regressors and column != "ds"]
-        for variable in other_variables:
-            train = train_data[["ds", variable]].copy()
-            train = train.rename(columns={variable: "y"})
+        :param executor: (Executor) Executor to fit on.
+        :param variable: (str) Predicted variable.
+        :param train: (DataFrame) Training data with "ds", "y" and the regressor columns.
+        :param regressors: (list[str]) Regressors of the model.
+        :return: (Future) Future of the serialized fitted model.
+        """
+        if self._model_cache is None:
+            return _untimed(executor.submit(_timed_fit, train, regressors, None, time.time()))
+
+        key = self._model_cache.key(self._location, self._df_type.value, variable, regressors, train)
+        model_json = self._model_cache.get(key)
+        if model_json is not None:
+            future = Future()
+            future.set_result(model_json)
+            return future
+
+        series = self._model_cache.series_key(self._location, self._df_type.value, variable, regressors)
+        init_json = self._model_cache.latest(series) if self._warm_start else None
+        future = _untimed(executor.submit(_timed_fit, train, regressors, init_json, time.time()))
+        future.add_done_callback(lambda done: done.exception() or self._model_cache.put(key, done.result(), series))
+        return future
 
-            # create a new Prophet models
-            variable_model = Prophet(seasonality_mode="multiplicative")
-            for regressor in self._regressors:
-                variable_model.add_regressor(regressor)
-                train[regressor] = train_data[regressor]
-            variable_model.fit(train)
+    def _executor(self) -> Executor:
+        if self._workers == 1:
+            return _InlineExecutor()
+        return _worker_pool(self._workers)[0]
 
-            variable_future = variable_model.predict(future_with_regressors)
 
-            complete_future[variable] = variable_future["yhat"]
+def start_workers(workers: int | None = None):
+    """
+    Start the fitting workers ahead of the first prediction.
 
-        return complete_future
+    Workers live as long as the process. Each one loads Prophet and CmdStan once and runs a warm-up fit,
+    so no prediction pays for starting them. Returns right away, the workers start in the background.
 
-    @staticmethod
-    def test(period: int,
-             df: pd.DataFrame, df_type: DataFrameType,
-             regressors: list[str],
-             train_size: int = 100) -> dict[str, dict[str, Any]]:
+    :param workers: (int | None) Number of worker processes, as for ProphetWeatherPredictionModel.
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1:
+        return
+    executor, created = _worker_pool(workers)
+    if created:
+        for _ in range(workers):
+            executor.submit(time.sleep, 0)
 
-        """Test the prediction
 
-        Currently, calculates the average MAE for each variable by splitting the dataset
-        into chunks of size (train_size + period) and predicting the next period.
+def fit_stats() -> dict[str, Any]:
+    """
+    Get timings of the latest fits of this process.
 
-        :param period: (int) Number of period to predict. (days)
-        :param df: (pd.DataFrame) Dataframe with features.
-        :param df_type: (DataFrameType) Type of the dataframe (Daily or Hourly)
-        :param regressors: (list[str]) List of independent variables.
-        :param train_size: (int) Number of periods to use for training.
-        :return: (dict[str, dict[str, Any]]) Dictionary with validation metrics for each variable.
-        """
-        test_size = period
+    Per fit: "dispatch" from submitting the fit to a worker picking it up, "prepare" building the model
+    and its Stan data, "stan" the CmdStan run (process launch, file round trip and the optimization),
+    "serialize" serializing the fitted model and "total" from submit to the end of the fit.
+
+    :return: (dict[str, Any]) Number of fits, mean seconds of every phase, the share of the total time
+    not spent in CmdStan ("overhead_share") and the mean number of optimizer iterations ("mean_iterations").
+    """
+    timings = list(_fit_timings)
+    if not timings:
+        return {"fits": 0}
+    phases = [phase for phase in timings[0] if phase != "iterations"]
+    means = {phase: float(np.mean([timing[phase] for timing in timings])) for phase in phases}
+    return {"fits": len(timings), "mean_seconds": means,
+            "overhead_share": 1 - means["stan"] / means["total"] if means["total"] > 0 else 0.0,
+            "mean_iterations": float(np.mean([timing["iterations"] for timing in timings]))}
+
+
+def _worker_pool(workers: int) -> tuple[Executor, bool]:
+    """Get the shared pool with a number of workers and whether it was just created."""
+    with _executors_lock:
+        if workers in _executors:
+            return _executors[workers], False
+        # spawn, not fork: the app process runs server and fetch threads that must not be forked
+        _executors[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                  initializer=_init_worker)
+        return _executors[workers], True
+
+
+def _init_worker():
+    """
+    Prepare a fitting worker process.
+
+    CmdStan output goes to a directory of the worker in shared memory, if the system has one,
+    and a warm-up fit loads the CmdStan model and everything a fit touches before the first real fit.
+    """
+    global _output_root
+    logging.getLogger("cmdstanpy").setLevel(logging.WARNING)
+    logging.getLogger("prophet").setLevel(logging.WARNING)
+    _output_root = tempfile.mkdtemp(prefix="prophet-", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    # atexit does not run in pool workers, their finalizers do
+    multiprocessing.util.Finalize(None, shutil.rmtree, args=(_output_root,), kwargs={"ignore_errors": True},
+                                  exitpriority=0)
+    warm_up = pd.DataFrame({"ds": pd.date_range("2000-01-01", periods=100, freq="D"),
+                            "y": np.sin(np.arange(100) / 5)})
+    _fit(warm_up, [])
+
+
+def _untimed(future: Future) -> Future:
+    """Get a future of the serialized model of a _timed_fit future and record the timings of the fit."""
+    model_future = Future()
+
+    def done(timed: Future):
+        if timed.exception() is not None:
+            model_future.set_exception(timed.exception())
+            return
+        model_json, timings = timed.result()
+        timings["total"] = time.time() - timings.pop("submitted")
+        _fit_timings.append(timings)
+        model_future.set_result(model_json)
+
+    future.add_done_callback(done)
+    return model_future
+
+
+def _started(fit: Callable[[], Future]) -> Callable[[], Future]:
+    """Start a fit right away. Returns a callable giving its future, like the fit itself."""
+    future = fit()
+    return lambda: future
+
+
+def _predict_as_fitted(executor: Executor, fits: dict[str, Callable[[], Future]], future: DataFrame,
+                       intervals: bool) -> Iterator[tuple[str, tuple]]:
+    """
+    Predict every variable as soon as its model is fitted.
+
+    :param executor: (Executor) Executor to predict on.
+    :param fits: (dict[str, Callable[[], Future]]) Fits by variable, each returns the future of the serialized
+    fitted model.
+    :param future: (DataFrame) Dates to predict, with the regressor columns the models need.
+    :param intervals: (bool) Also predict the uncertainty intervals.
+    :return: (Iterator[tuple[str, tuple]]) Variable and the result of _predict, in the order they finish.
+    """
+    if isinstance(executor, _InlineExecutor):
+        for variable, fit in fits.items():
+            yield variable, _predict(fit().result(), future, intervals)
+        return
+
+    fitting = {fit(): variable for variable, fit in fits.items()}
+    predicting = {}
+    while fitting or predicting:
+        done, _ = wait(list(fitting) + list(predicting), return_when=FIRST_COMPLETED)
+        for finished in done:
+            if finished in fitting:
+                predicting[executor.submit(_predict, finished.result(), future, intervals)] = fitting.pop(finished)
+        for finished in done:
+            if finished in predicting:
+                yield predicting.pop(finished), finished.result()
+
+
+class _InlineExecutor(Executor):
+    """Executor running every task right away in the calling process."""
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
 
-        testing_period_size = test_size + train_size
 
-        # calculate the validation metrics for each variable on
-        # each bunch of dates (testing_period_size) in the dataset
-        variables = df.columns
+def _fit(train: DataFrame, regressors: list[str], init_json: str | None = None) -> str:
+    """
+    Fit a Prophet model. Runs in a worker process.
 
-        predicted = {variable: [] for variable in variables}
-        actual = {variable: [] for variable in variables}
-        for i in range(0, len(df) - testing_period_size, testing_period_size):
-            train = df[i:i + train_size].copy()
-            test_date_index = i + testing_period_size - 1
-            test_date = df.iloc[test_date_index]
+    :param train: (DataFrame) Training data with "ds", "y" and the regressor columns.
+    :param regressors: (list[str]) Regressors of the model.
+    :param init_json: (str | None) Serialized model of the same variable to start the optimizer from.
+    :return: (str) Serialized fitted model.
+    """
+    return _timed_fit(train, regressors, init_json, time.time())[0]
 
-            start_ds = df.iloc[i + train_size]["ds"]  # start forecasting from
 
-            model = ProphetWeatherPredictionModel(train, df_type, regressors)
-            forecast = model.predict(test_size, start_ds, train_size)
-            predicted_date = forecast.iloc[-1]
+def _timed_fit(train: DataFrame, regressors: list[str], init_json: str | None,
+               submitted: float) -> tuple[str, dict[str, float]]:
+    """
+    Fit a Prophet model and time the phases of the fit. Runs in a worker process.
+
+    :param train: (DataFrame) Training data with "ds", "y" and the regressor columns.
+    :param regressors: (list[str]) Regressors of the model.
+    :param init_json: (str | None) Serialized model of the same variable to start the optimizer from.
+    :param submitted: (float) Time the fit was submitted at (time.time()).
+    :return: (tuple[str, dict[str, float]]) Serialized fitted model and the timings, see fit_stats,
+    with the number of optimizer iterations as "iterations".
+    """
+    started = time.time()
+    model = Prophet(seasonality_mode="multiplicative")
+    for regressor in regressors:
+        model.add_regressor(regressor)
+    kwargs = {}
+    if init_json is not None:
+        # parameters whose shape does not fit this model are replaced by the defaults by Prophet itself
+        kwargs["init"] = _stan_init(model_from_json(init_json))
+    output_dir = tempfile.mkdtemp(dir=_output_root) if _output_root is not None else None
+    if output_dir is not None:
+        kwargs["output_dir"] = output_dir
+
+    stan_seconds = 0.0
+    iterations = 0
+    backend_fit = model.stan_backend.fit
+
+    def timed_backend_fit(*args, **fit_kwargs):
+        nonlocal stan_seconds, iterations
+        stan_started = time.perf_counter()
+        try:
+            return backend_fit(*args, **fit_kwargs)
+        finally:
+            stan_seconds += time.perf_counter() - stan_started
+            # read before the output directory is removed
+            iterations = _iterations(getattr(model.stan_backend, "stan_fit", None))
+
+    model.stan_backend.fit = timed_backend_fit
+    try:
+        model.fit(train, **kwargs)
+    finally:
+        if output_dir is not None:
+            shutil.rmtree(output_dir, ignore_errors=True)
+    fitted = time.time()
+    model_json = model_to_json(model)
+    finished = time.time()
+
+    return model_json, {"submitted": submitted,
+                        "dispatch": started - submitted,
+                        "prepare": fitted - started - stan_seconds,
+                        "stan": stan_seconds,
+                        "serialize": finished - fitted,
+                        "iterations": iterations}
+
+
+def _iterations(stan_fit) -> int:
+    """
+    Get the number of optimizer iterations of a CmdStan run from its console output.
 
-            assert test_date["ds"] == predicted_date["ds"]
+    :param stan_fit: Result of the CmdStan optimization (cmdstanpy.CmdStanMLE), None if the fit failed.
+    :return: (int) Number of the last iteration reported, 0 if unknown.
+    """
+    iterations = 0
+    try:
+        for path in stan_fit.runset.stdout_files:
+            for line in Path(path).read_text(encoding="utf-8").splitlines():
+                # progress rows start with the iteration number, followed by log prob, ||dx||, ||grad||, ...
+                fields = line.split()
+                if len(fields) >= 7 and fields[0].isdigit():
+                    iterations = int(fields[0])
+    except (AttributeError, OSError):
+        pass
+    return iterations
+
+
+def _stan_init(model: Prophet) -> dict[str, Any]:
+    """
+    Get the fitted parameters of a model in the form Prophet.fit accepts as init.
 
-            for variable in variables:
-                actual[variable].append(test_date[variable])
-                predicted[variable].append(predicted_date[variable])
+    :param model: (Prophet) Fitted model.
+    :return: (dict[str, Any]) Initial values of the optimizer.
+    """
+    init = {}
+    for name in ["k", "m", "sigma_obs"]:
+        init[name] = model.params[name][0][0]
+    for name in ["delta", "beta"]:
+        init[name] = model.params[name][0]
+    return init
 
-        metrics = {"MAE": {}}
-        for variable in variables:
-            metrics["MAE"][variable] = MAE(actual[variable], predicted[variable])
 
-        return metrics
+def _predict(model_json: str, future: DataFrame,
+             intervals: bool = False) -> tuple[np.ndarray, tuple[np.ndarray, np.ndarray] | None]:
+    """
+    Predict with a fitted Prophet model. Runs in a worker process.
 
-    @staticmethod
-    def _create_empty_future(periods: int, start, df_type: DataFrameType) -> pd.DataFrame:
-        """
-        Create empty future dataframe.
+    :param model_json: (str) Serialized fitted model.
+    :param future: (DataFrame) Dates to predict, with the regressor columns if the model has any.
+    :param intervals: (bool) Also predict the uncertainty interval, by Prophet's sampling.
+    :return: (tuple[np.ndarray, tuple[np.ndarray, np.ndarray] | None]) Predicted values
+    and the (lower, upper) bounds if requested.
+    """
+    model = model_from_json(model_json)
+    if intervals:
+        forecast = model.predict(future)
+        return forecast["yhat"].to_numpy(), (forecast["yhat_lower"].to_numpy(), forecast["yhat_upper"].to_numpy())
+    return _point_forecast(model, future), None
 
-        :param periods: (int) Number of periods to predict.
-        :return: (pd.DataFrame) Empty dataframe with future dates.
-        """
-        future = pd.DataFrame()
-        if df_type == DataFrameType.DailyHistory:
-            future["ds"] = pd.date_range(start=start, periods=periods, freq="D")
-        elif df_type == DataFrameType.HourlyHistory:
-            future["ds"] = pd.date_range(start=start, periods=periods, freq="h")
-        return future
+
+def _point_forecast(model: Prophet, future: DataFrame) -> np.ndarray:
+    """
+    Evaluate the point forecast of a fitted Prophet model: trend, seasonalities and regressor terms.
+
+    Same yhat as Prophet.predict, without the uncertainty sampling and the per-component frame.
+
+    :param model: (Prophet) Fitted model.
+    :param future: (DataFrame) Dates to predict, with the regressor columns if the model has any.
+    :return: (np.ndarray) Predicted values.
+    """
+    df = model.setup_dataframe(future.copy())
+    trend = model.predict_trend(df)
+    features, _, component_cols, _ = model.make_all_seasonality_features(df)
+    x = features.to_numpy()
+    beta = model.params["beta"].mean(axis=0)  # a single row for MAP fits, the mean of the draws for MCMC
+    multiplicative = x @ (beta * component_cols["multiplicative_terms"].to_numpy())
+    additive = x @ (beta * component_cols["additive_terms"].to_numpy()) * model.y_scale
+    return np.asarray(trend * (1 + multiplicative) + additive)
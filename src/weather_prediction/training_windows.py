@@ -0,0 +1,205 @@
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from api.api_client import ApiClient
+from utils.analyses_utils import prepare_data, DataFrameType
+from utils.files_definition import FilePaths
+from utils.path_utils import ParentPath
+from weather_prediction.engines import DEFAULT_ENGINE, get_engine
+from weather_prediction.features import daily_discrete_features, daily_regressors, hourly_discrete_features, \
+    hourly_regressors
+
+# candidate training sizes and horizons the autotuner tries by default (days for daily, hours for hourly)
+default_candidates = {"daily": [30, 60, 90, 180, 365, 730], "hourly": [240, 500, 1000, 2000]}
+default_horizons = {"daily": [1, 7, 14, 30], "hourly": [24, 72, 168]}
+
+
+class TrainingWindows:
+    """
+    Lookup table of training sizes, tuned per engine, resolution and forecast horizon.
+
+    The table is written by the autotuner of this module (see main) and stored as JSON:
+    {engine: {resolution: [{"horizon": ..., "train_size": ..., "profiles": [...]}, ...]}}.
+    A forecast uses the entry of the shortest tuned horizon that covers it.
+    """
+
+    def __init__(self, table: dict[str, dict[str, list[dict[str, Any]]]] | None = None):
+        """
+        Initialize training windows.
+
+        :param table: (dict | None) Table in the stored form. If None, the table is empty.
+        """
+        self._table = table or {}
+
+    @staticmethod
+    def default_path() -> Path:
+        return Path(ParentPath().config_path) / FilePaths.TRAINING_WINDOWS_FILE
+
+    @classmethod
+    def load(cls, path: str | Path | None = None) -> "TrainingWindows":
+        """
+        Load a table. A missing file is an empty table.
+
+        :param path: (str | Path | None) JSON file. If None, the default table in the resources.
+        :return: (TrainingWindows) Loaded table.
+        """
+        path = Path(path) if path is not None else cls.default_path()
+        if not path.exists():
+            return cls()
+        return cls(json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, path: str | Path | None = None):
+        path = Path(path) if path is not None else self.default_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self._table, indent=2), encoding="utf-8")
+
+    def train_size(self, engine: str, resolution: str, horizon: int) -> int | None:
+        """
+        Get the tuned training size of a forecast.
+
+        :param engine: (str) Name of the forecasting engine.
+        :param resolution: (str) "daily" or "hourly".
+        :param horizon: (int) Number of periods to predict.
+        :return: (int | None) Training size, None if no tuned horizon covers the forecast.
+        """
+        entries = [entry for entry in self._table.get(engine, {}).get(resolution, []) if entry["horizon"] >= horizon]
+        if not entries:
+            return None
+        return min(entries, key=lambda entry: entry["horizon"])["train_size"]
+
+    def set(self, engine: str, resolution: str, horizon: int, train_size: int, profiles: list[dict[str, Any]]):
+        """
+        Set the training size of a horizon, replacing an earlier entry.
+
+        :param engine: (str) Name of the forecasting engine.
+        :param resolution: (str) "daily" or "hourly".
+        :param horizon: (int) Number of periods to predict.
+        :param train_size: (int) Chosen training size.
+        :param profiles: (list[dict[str, Any]]) Measurements of every candidate, kept for reference.
+        """
+        entries = [entry for entry in self._table.setdefault(engine, {}).setdefault(resolution, [])
+                   if entry["horizon"] != horizon]
+        entries.append({"horizon": horizon, "train_size": train_size, "profiles": profiles})
+        self._table[engine][resolution] = sorted(entries, key=lambda entry: entry["horizon"])
+
+
+def profile_windows(df: pd.DataFrame, df_type: DataFrameType, regressors: list[str], horizon: int,
+                    candidates: list[int], engine: str = DEFAULT_ENGINE, windows: int = 8,
+                    workers: int | None = None) -> list[dict[str, Any]]:
+    """
+    Backtest every candidate training size on the same forecast origins.
+
+    :param df: (pd.DataFrame) Prepared dataframe with features, long enough for the largest candidate.
+    :param df_type: (DataFrameType) Type of the dataframe (Daily or Hourly)
+    :param regressors: (list[str]) List of independent variables.
+    :param horizon: (int) Number of periods to predict.
+    :param candidates: (list[int]) Training sizes to try.
+    :param engine: (str) Name of the forecasting engine.
+    :param windows: (int) Number of forecast origins, spread over the part of df every candidate can train on.
+    :param workers: (int | None) Number of worker processes of the backtests.
+    :return: (list[dict[str, Any]]) One profile per candidate: "train_size", "seconds_per_window", "fetch_days",
+    "mae" (mean over the horizon, per variable) and "score" (mean MAE relative to the best candidate, 1 is best).
+    :raises ValueError: If df is too short for the largest candidate.
+    """
+    df = df.reset_index(drop=True)
+    first_origin = max(candidates)
+    usable = len(df) - horizon - first_origin
+    if usable < 0:
+        raise ValueError(f"Dataframe of {len(df)} rows is too short for {max(candidates)} + {horizon} periods")
+    stride = max(usable // max(windows - 1, 1), 1)
+    periods_per_day = 24 if df_type == DataFrameType.HourlyHistory else 1
+
+    profiles = []
+    for train_size in sorted(candidates):
+        # all candidates forecast from the same origins, so their errors are comparable
+        backtester = get_engine(engine).backtester(df.iloc[first_origin - train_size:], df_type, regressors,
+                                                   train_size, horizon, stride, workers)
+        started = time.perf_counter()
+        errors = backtester.run()
+        elapsed = time.perf_counter() - started
+        profiles.append({"train_size": train_size,
+                         "seconds_per_window": elapsed / len(backtester.origins()),
+                         "fetch_days": int(np.ceil(train_size / periods_per_day)),
+                         "mae": errors["MAE"].mean().to_dict()})
+
+    # variables have very different scales, so every variable is compared to its best candidate
+    best = pd.DataFrame([profile["mae"] for profile in profiles]).min()
+    for profile in profiles:
+        relative = pd.Series(profile["mae"]) / best.where(best > 0, 1)
+        profile["score"] = float(relative.mean())
+    return profiles
+
+
+def choose_window(profiles: list[dict[str, Any]], tolerance: float) -> int:
+    """
+    Choose the cheapest training size within the accuracy tolerance of the best one.
+
+    :param profiles: (list[dict[str, Any]]) Profiles of the candidates, see profile_windows.
+    :param tolerance: (float) Allowed relative loss of accuracy, e.g. 0.05 for 5 %.
+    :return: (int) Training size.
+    """
+    best_score = min(profile["score"] for profile in profiles)
+    acceptable = [profile for profile in profiles if profile["score"] <= best_score * (1 + tolerance)]
+    return min(acceptable, key=lambda profile: (profile["fetch_days"], profile["seconds_per_window"]))["train_size"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the training windows of the weather predictor")
+    parser.add_argument("--lat", help="Latitude", required=True, dest="lat", type=float)
+    parser.add_argument("--lon", help="Longitude", required=True, dest="lon", type=float)
+    parser.add_argument("--end", help="Last day of the backtested history", required=False, dest="end",
+                        default=(pd.Timestamp.today() - pd.Timedelta(days=7)).date().__str__())
+    parser.add_argument("--resolution", help="daily or hourly", required=False, dest="resolution",
+                        choices=["daily", "hourly"], default="daily")
+    parser.add_argument("--horizons", help="Comma separated horizons", required=False, dest="horizons")
+    parser.add_argument("--candidates", help="Comma separated training sizes", required=False, dest="candidates")
+    parser.add_argument("--tolerance", help="Allowed relative loss of accuracy", required=False, dest="tolerance",
+                        type=float, default=0.05)
+    parser.add_argument("--windows", help="Forecast origins per backtest", required=False, dest="windows",
+                        type=int, default=8)
+    parser.add_argument("--engine", help="Forecasting engine", required=False, dest="engine", default=DEFAULT_ENGINE)
+    parser.add_argument("--output", help="Table to update", required=False, dest="output",
+                        default=str(TrainingWindows.default_path()))
+
+    args = parser.parse_args()
+    horizons = [int(value) for value in args.horizons.split(",")] if args.horizons \
+        else default_horizons[args.resolution]
+    candidates = [int(value) for value in args.candidates.split(",")] if args.candidates \
+        else default_candidates[args.resolution]
+
+    # one fetch covers the largest candidate before the first origin and all origins after it
+    if args.resolution == "daily":
+        days = max(candidates) + max(horizons) * args.windows
+        df_type, regressors, discrete_features = DataFrameType.DailyHistory, daily_regressors, daily_discrete_features
+    else:
+        days = (max(candidates) + max(horizons) * args.windows) // 24 + 1
+        df_type, regressors, discrete_features = DataFrameType.HourlyHistory, hourly_regressors, \
+            hourly_discrete_features
+    start = (pd.Timestamp(args.end) - pd.Timedelta(days=days)).date().__str__()
+    client = ApiClient()
+    if args.resolution == "daily":
+        df = client.get_daily_weather_history(args.lat, args.lon, start, args.end)
+    else:
+        df = client.get_hourly_weather_history(args.lat, args.lon, start, args.end)
+    df = prepare_data(df, discrete_features)
+
+    windows = TrainingWindows.load(args.output)
+    for horizon in horizons:
+        profiles = profile_windows(df, df_type, regressors, horizon, candidates, args.engine, args.windows)
+        train_size = choose_window(profiles, args.tolerance)
+        windows.set(args.engine, args.resolution, horizon, train_size, profiles)
+        print(f"{args.resolution} horizon {horizon}: train on {train_size}")
+        for profile in profiles:
+            print(f"  {profile['train_size']:>6} periods  {profile['seconds_per_window']:8.3f} s/window  "
+                  f"{profile['fetch_days']:>5} days fetched  score {profile['score']:.3f}")
+    windows.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from pandas import DataFrame
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+
+Classifier = tuple[StandardScaler, LogisticRegression]
+
+
+class ClassifierCache:
+    """
+    In-memory cache of fitted weather code classifiers (scaler and classifier pairs).
+
+    Keeps at most max_entries classifiers and evicts the least recently used one beyond that.
+    A fitted pair only holds a few coefficients per class and regressor, so the bound is a bound on memory.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        Initialize classifier cache.
+
+        :param max_entries: (int) Number of classifiers the cache keeps.
+        """
+        self._max_entries = max_entries
+        self._classifiers: OrderedDict[str, Classifier] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(location: tuple[float, float] | None, df: DataFrame, regressors: list[str], codes_column: str) -> str:
+        """
+        Get the cache key of a classifier.
+
+        Besides grid cell, training window and regressor list, the key covers the training data itself,
+        so a window whose data changed is fitted again.
+
+        :param location: (tuple[float, float] | None) Grid cell (latitude, longitude) of the data, if known.
+        :param df: (DataFrame) Training data.
+        :param regressors: (list[str]) Regressors of the classifier.
+        :param codes_column: (str) Column with the weather codes.
+        :return: (str) Key.
+        """
+        date_column = next((column for column in ["ds", "date"] if column in df.columns), None)
+        window = (str(df[date_column].min()), str(df[date_column].max())) if date_column else None
+        data = df[regressors + [codes_column]]
+        data_digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=False).to_numpy()).hexdigest()
+        parts = [location, window, list(regressors), codes_column, data_digest]
+        return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Classifier | None:
+        """
+        Get a fitted classifier.
+
+        :param key: (str) Key of the classifier.
+        :return: (Classifier | None) Scaler and classifier, None if not cached.
+        """
+        with self._lock:
+            classifier = self._classifiers.get(key)
+            if classifier is None:
+                self.misses += 1
+                return None
+            self._classifiers.move_to_end(key)
+            self.hits += 1
+            return classifier
+
+    def put(self, key: str, classifier: Classifier):
+        """
+        Store a fitted classifier and evict the least recently used ones beyond max_entries.
+
+        :param key: (str) Key of the classifier.
+        :param classifier: (Classifier) Scaler and classifier.
+        """
+        with self._lock:
+            self._classifiers[key] = classifier
+            self._classifiers.move_to_end(key)
+            while len(self._classifiers) > self._max_entries:
+                self._classifiers.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._classifiers)
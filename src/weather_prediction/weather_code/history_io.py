@@ -0,0 +1,89 @@
+import argparse
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas import DataFrame
+
+from utils.analyses_utils import compact_dtypes
+
+HistorySource = str | Path | bytes | memoryview | pa.Buffer
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_FILE_MAGIC = b"ARROW1"
+
+
+def read_history(source: HistorySource, columns: list[str] | None = None) -> DataFrame:
+    """
+    Read weather history stored as Arrow IPC (file or stream format) or Parquet.
+
+    Files are memory-mapped and bytes are wrapped, not copied. Arrow columns without missing values
+    then become frame columns without another copy, so only the requested columns are ever read.
+
+    :param source: (HistorySource) Path of a .parquet or Arrow IPC (.arrow, .feather) file, or the bytes of one.
+    :param columns: (list[str] | None) Columns to read. If None, all of them.
+    :return: (DataFrame) Weather history.
+    """
+    if isinstance(source, (str, Path)):
+        path = Path(source)
+        if path.suffix == ".parquet":
+            table = pq.read_table(path, columns=columns, memory_map=True)
+        else:
+            table = _read_ipc(pa.memory_map(str(path)), columns)
+    else:
+        buffer = source if isinstance(source, pa.Buffer) else pa.py_buffer(source)
+        if buffer.size >= 4 and buffer.slice(0, 4).to_pybytes() == _PARQUET_MAGIC:
+            table = pq.read_table(pa.BufferReader(buffer), columns=columns)
+        else:
+            table = _read_ipc(pa.BufferReader(buffer), columns)
+    return table.to_pandas(split_blocks=True)
+
+
+def write_history(df: DataFrame, path: str | Path):
+    """
+    Write weather history in the compact schema, as Parquet (.parquet) or Arrow IPC file (any other suffix).
+
+    :param df: (DataFrame) Weather history.
+    :param path: (str | Path) Output file.
+    """
+    table = pa.Table.from_pandas(compact_dtypes(df), preserve_index=False)
+    if Path(path).suffix == ".parquet":
+        pq.write_table(table, path)
+    else:
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def json_to_history(json_path: str | Path, path: str | Path):
+    """
+    Convert a JSON export of weather history (as read by pd.read_json) to a binary history file.
+
+    :param json_path: (str | Path) JSON export.
+    :param path: (str | Path) Output file, see write_history.
+    """
+    write_history(pd.read_json(json_path), path)
+
+
+def _read_ipc(source, columns: list[str] | None) -> pa.Table:
+    """Read an Arrow IPC file or stream, whichever the source holds."""
+    if source.read(len(_ARROW_FILE_MAGIC)) == _ARROW_FILE_MAGIC:
+        source.seek(0)
+        table = pa.ipc.open_file(source).read_all()
+    else:
+        source.seek(0)
+        table = pa.ipc.open_stream(source).read_all()
+    return table.select(columns) if columns is not None else table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert JSON weather history exports to Arrow or Parquet")
+    parser.add_argument("input", help="JSON export")
+    parser.add_argument("output", help="Output file, .parquet for Parquet, Arrow IPC file otherwise")
+
+    args = parser.parse_args()
+    json_to_history(args.input, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,54 @@
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
+import numpy as np
 import pandas as pd
 
+from weather_prediction.weather_code.classifier_cache import ClassifierCache
+from weather_prediction.weather_code.history_io import HistorySource, read_history
+
+DEFAULT_CLASSIFIER_CACHE = ClassifierCache()
+
+# bump when the way weather codes are classified changes, so cached forecast results are not served anymore
+CLASSIFIER_VERSION = 1
+
+# general weather type of every weather code, see https://open-meteo.com/en/docs
+weather_code_labels = {
+    0: 'clear',
+    1: 'cloudy',
+    2: 'cloudy',
+    3: 'cloudy',
+    45: 'foggy',
+    48: 'foggy',
+    51: 'drizzle',
+    53: 'drizzle',
+    55: 'drizzle',
+    56: 'drizzle',
+    57: 'drizzle',
+    61: 'rain',
+    63: 'rain',
+    65: 'rain',
+    66: 'rain',
+    67: 'rain',
+    71: 'snow',
+    73: 'snow',
+    75: 'snow',
+    77: 'snow',
+    80: 'rain showers',
+    81: 'rain showers',
+    82: 'rain showers',
+    85: 'snow showers',
+    86: 'snow showers',
+    95: 'thunderstorm',
+    96: 'thunderstorm',
+    99: 'thunderstorm',
+}
+# labels are kept as a categorical, one byte per row instead of a string object
+WEATHER_LABEL_DTYPE = pd.CategoricalDtype(list(dict.fromkeys(weather_code_labels.values())) + ['unknown'])
+_unknown_label_code = WEATHER_LABEL_DTYPE.categories.get_loc('unknown')
+_label_codes = np.full(256, _unknown_label_code, dtype=np.int8)
+for _code, _label in weather_code_labels.items():
+    _label_codes[_code] = WEATHER_LABEL_DTYPE.categories.get_loc(_label)
+
 
 class WeatherCodesPredictor:
     @staticmethod
@@ -24,9 +71,31 @@ class WeatherCodesPredictor:
         return WeatherCodesPredictor._predict(df, to_predict, include_regressors, codes_column,
                                               include_regressors_predict)
 
+    @staticmethod
+    def get_weather_codes_binary(historical_data: HistorySource,
+                                 to_predict: pd.DataFrame,
+                                 include_regressors: list,
+                                 codes_column='weather_code',
+                                 include_regressors_predict=None):
+        """
+
+        :param historical_data: historical weather data as Arrow IPC or Parquet (path of a file or its bytes),
+        see history_io.json_to_history for converting JSON exports. Only the needed columns are read, without copying
+        :param to_predict: dataframe of weather forecast, for which weather codes have to be predicted
+        :param include_regressors: list of regressors to use in the model (extracted from historical data)
+        :param codes_column: (default='weather_code') name of the column with weather codes (historical data)
+        :param include_regressors_predict (default=None) regressors to use in prediction.
+        If None, include_regressors will be used
+        :return: list of weather types in order that matches to_predict dataframe
+        """
+        df = read_history(historical_data, list(dict.fromkeys(include_regressors + [codes_column])))
+        return WeatherCodesPredictor._predict(df, to_predict, include_regressors, codes_column,
+                                              include_regressors_predict)
+
     @staticmethod
     def get_weather_codes_frame(historical_data_frame, to_predict, include_regressors, codes_column='weather_code',
-                                include_regressors_predict=None):
+                                include_regressors_predict=None, location=None,
+                                classifier_cache=DEFAULT_CLASSIFIER_CACHE):
         """
 
                 :param historical_data_frame: historical weather data from api (as dataframe)
@@ -35,30 +104,44 @@ class WeatherCodesPredictor:
                 :param codes_column: (default='weather_code') name of the column with weather codes (historical data)
                 :param include_regressors_predict (default=None) regressors to use in prediction.
                 If None, include_regressors will be used
+                :param location: (default=None) grid cell (latitude, longitude) of the historical data
+                :param classifier_cache: (default=DEFAULT_CLASSIFIER_CACHE) cache of fitted classifiers.
+                If None, the classifier is always fitted
                 :return: list of weather types in order that matches to_predict dataframe
                 """
         return WeatherCodesPredictor._predict(historical_data_frame, to_predict, include_regressors,
-                                              codes_column, include_regressors_predict)
+                                              codes_column, include_regressors_predict, location, classifier_cache)
 
     @staticmethod
-    def _predict(df, to_predict, include_regressors, codes_column, include_regressors_predict):
+    def _predict(df, to_predict, include_regressors, codes_column, include_regressors_predict, location=None,
+                 classifier_cache=None):
         if not include_regressors_predict:
             include_regressors_predict = include_regressors
         x_train = df[include_regressors]
         x_predict = to_predict[include_regressors_predict]
         y = df[codes_column]
         if y.nunique() < 2:
-            return [y.to_list()[0]] * len(to_predict.index)
-        y = WeatherCodesPredictor.replace_weather_codes(y)
+            label = WeatherCodesPredictor.replace_weather_codes(y.iloc[:1]).iloc[0]
+            return pd.Categorical([label] * len(to_predict.index), dtype=WEATHER_LABEL_DTYPE)
+
+        key, classifier = None, None
+        if classifier_cache is not None:
+            key = classifier_cache.key(location, df, include_regressors, codes_column)
+            classifier = classifier_cache.get(key)
+        if classifier is None:
+            y = WeatherCodesPredictor.replace_weather_codes(y)
 
-        scaler = StandardScaler()
-        x_train_scaled = scaler.fit_transform(x_train)
-        x_predict_scaled = scaler.transform(x_predict)
+            scaler = StandardScaler()
+            x_train_scaled = scaler.fit_transform(x_train)
 
-        model = LogisticRegression(multi_class='multinomial', solver='lbfgs')
-        model.fit(x_train_scaled, y)
+            model = LogisticRegression(multi_class='multinomial', solver='lbfgs')
+            model.fit(x_train_scaled, y)
+            classifier = (scaler, model)
+            if classifier_cache is not None:
+                classifier_cache.put(key, classifier)
 
-        return model.predict(x_predict_scaled)
+        scaler, model = classifier
+        return pd.Categorical(model.predict(scaler.transform(x_predict)), dtype=WEATHER_LABEL_DTYPE)
 
     @staticmethod
     def replace_weather_codes(y):
@@ -66,39 +149,12 @@ class WeatherCodesPredictor:
         Substitutes similar weather types with one general type (e.g. "Light rain", "Heavy rain" -> "Rain")
         Weather codes definition: https://open-meteo.com/en/docs
         :param y: Sequence of weather codes
-        :return: Normalized weather codes
+        :return: Normalized weather codes, as a categorical series with WEATHER_LABEL_DTYPE
         """
-        replacements ={
-            0: 'clear',
-            1: 'cloudy',
-            2: 'cloudy',
-            3: 'cloudy',
-            45: 'foggy',
-            48: 'foggy',
-            51: 'drizzle',
-            53: 'drizzle',
-            55: 'drizzle',
-            56: 'drizzle',
-            57: 'drizzle',
-            61: 'rain',
-            63: 'rain',
-            65: 'rain',
-            66: 'rain',
-            67: 'rain',
-            71: 'snow',
-            73: 'snow',
-            75: 'snow',
-            77: 'snow',
-            80: 'rain showers',
-            81: 'rain showers',
-            82: 'rain showers',
-            85: 'snow showers',
-            86: 'snow showers',
-            95: 'thunderstorm',
-            96: 'thunderstorm',
-            99: 'thunderstorm',
-        }
-
-        y_mapped = y.map(replacements).fillna('unknown')
-        return y_mapped.astype(str)
+        y = pd.Series(y)
+        codes = y.to_numpy(dtype=np.float64)
+        known = ~np.isnan(codes) & (codes >= 0) & (codes < len(_label_codes))
+        label_codes = np.full(len(codes), _unknown_label_code, dtype=np.int8)
+        label_codes[known] = _label_codes[codes[known].astype(np.intp)]
+        return pd.Series(pd.Categorical.from_codes(label_codes, dtype=WEATHER_LABEL_DTYPE), index=y.index, name=y.name)
 
@@ -1,17 +1,20 @@
-from typing import Any
+import time
+from typing import Any, Iterator
 
 import pandas as pd
 
 from api.api_client import ApiClient
-from utils.analyses_utils import prepare_data, DataFrameType
+from utils.analyses_utils import prepare_data, DataFrameType, MEASUREMENT_DTYPE
 from weather_prediction.features import daily_discrete_features, daily_regressors, hourly_discrete_features, \
     hourly_regressors
-from weather_prediction.prophet.prophet_model import ProphetWeatherPredictionModel
+from weather_prediction.fetch_planner import FetchPlanner
+from weather_prediction.training_windows import TrainingWindows
+from weather_prediction.engines import DEFAULT_ENGINE, get_engine
 
-hourly_train_size = 1000  # how many hours to use for training
+hourly_train_size = 1000  # how many hours to use for training, unless the training windows are tuned
 
 
-# formula to calculate the number of days to train the model
+# formula to calculate the number of days to train the model, unless the training windows are tuned
 def calculate_daily_training_size(period: int) -> int:
     return int(period * 9 - 5) % 100000
 
@@ -19,8 +22,35 @@ def calculate_daily_training_size(period: int) -> int:
 class WeatherPredictor:
     """Class for predicting weather"""
 
-    def __init__(self):
+    def __init__(self, engine: str = DEFAULT_ENGINE, training_windows: TrainingWindows | None = None,
+                 model_kwargs: dict[str, Any] | None = None):
+        """
+        Initialize weather predictor.
+
+        :param engine: (str) Name of the forecasting engine, see weather_prediction.engines.ENGINES.
+        :param training_windows: (TrainingWindows | None) Tuned training sizes. If None, the table
+        in the resources is loaded. Horizons it does not cover fall back to the default sizes.
+        :param model_kwargs: (dict[str, Any] | None) Extra arguments of the model constructor.
+        """
         self._api_client = ApiClient()
+        self._engine = engine
+        self._model_class = get_engine(engine)
+        self._model_kwargs = model_kwargs or {}
+        self._training_windows = training_windows if training_windows is not None else TrainingWindows.load()
+        # seconds the latest predict_weather_stream_with_actual_data spent fetching and predicting
+        self.timings: dict[str, float] = {}
+
+    @property
+    def archive_source(self) -> str:
+        """Archive API the history is fetched from, see ApiClient.source."""
+        return self._api_client.source
+
+    @property
+    def model_version(self) -> str:
+        """Version of the engine and its constructor arguments that change the predictions."""
+        output_kwargs = {name: value for name, value in sorted(self._model_kwargs.items())
+                         if name in self._model_class.output_kwargs}
+        return f"{self._model_class.version}:{output_kwargs}"
 
     def predict_weather(self, lat: float, lon: float, start: str,
                         hours: int = 0,
@@ -57,6 +87,76 @@ class WeatherPredictor:
         else:
             return {}
 
+    def predict_weather_with_actual_data(self, lat: float, lon: float, start: str,
+                                         hours: int = 0,
+                                         days: int = 0) -> tuple[dict[str, pd.DataFrame], dict[str, pd.DataFrame]]:
+        """Predict weather for specific location and get the actual weather for the predicted period.
+
+        The training window and the predicted period are adjacent, so both are fetched in one request
+        per resolution instead of one request each.
+
+        :param lat: (float) Latitude.
+        :param lon: (float) Longitude.
+        :param start: (str) Start date ISO 8601 from which the prediction will be started, e.g. start=2024-01-12
+        :param hours: (int) Number of hours to predict.
+        :param days: (int) Number of days to predict.
+        :return: (tuple[dict, dict]) Same dictionaries as predict_weather and get_actual_data return.
+        """
+        for prediction, actual in self.predict_weather_stream_with_actual_data(lat, lon, start, hours, days):
+            pass
+        return prediction, actual
+
+    def predict_weather_stream_with_actual_data(self, lat: float, lon: float, start: str, hours: int = 0,
+                                                days: int = 0) -> Iterator[tuple[dict[str, pd.DataFrame],
+                                                                                 dict[str, pd.DataFrame]]]:
+        """Predict weather like predict_weather_with_actual_data, yielding every time variables are predicted.
+
+        :param lat: (float) Latitude.
+        :param lon: (float) Longitude.
+        :param start: (str) Start date ISO 8601 from which the prediction will be started, e.g. start=2024-01-12
+        :param hours: (int) Number of hours to predict.
+        :param days: (int) Number of days to predict.
+        :return: (Iterator[tuple[dict, dict]]) Dictionaries of predict_weather_with_actual_data. The prediction frames
+        hold the variables predicted so far, the last pair is complete. Hourly weather is predicted before daily.
+        """
+        assert hours > 0 or days > 0, "At least one of hours or days must be greater than 0."
+
+        planner = FetchPlanner()
+        if hours > 0:
+            hourly_end = pd.Timestamp(start) + pd.Timedelta(days=hours // 24 + (1 if hours % 24 > 0 else 0))
+            hourly_periods = (hourly_end - pd.Timestamp(start)).days * 24
+            planner.add(DataFrameType.HourlyHistory.value, "hourly", *self._hourly_training_range(start, hourly_periods))
+            planner.add(DataFrameType.HourlyPrediction.value, "hourly", start, hourly_end - pd.Timedelta(days=1))
+        if days > 0:
+            daily_end = pd.Timestamp(start) + pd.Timedelta(days=days)
+            planner.add(DataFrameType.DailyHistory.value, "daily", *self._daily_training_range(start, daily_end))
+            planner.add(DataFrameType.DailyPrediction.value, "daily", start, daily_end - pd.Timedelta(days=1))
+        started = time.perf_counter()
+        frames = planner.fetch(self._api_client, lat, lon)
+        self.timings = {"fetch": time.perf_counter() - started, "predict": 0.0}
+
+        prediction, actual = {}, {}
+        if hours > 0:
+            actual[DataFrameType.HourlyHistory.value] = frames[DataFrameType.HourlyPrediction.value]
+            started = time.perf_counter()
+            for hourly_prediction, hourly_df in self._stream_hourly_weather(
+                    lat, lon, start, hourly_end.__str__(), frames[DataFrameType.HourlyHistory.value]):
+                self.timings["predict"] += time.perf_counter() - started
+                prediction[DataFrameType.HourlyPrediction.value] = hourly_prediction
+                prediction[DataFrameType.HourlyHistory.value] = hourly_df
+                yield dict(prediction), dict(actual)
+                started = time.perf_counter()
+        if days > 0:
+            actual[DataFrameType.DailyHistory.value] = frames[DataFrameType.DailyPrediction.value]
+            started = time.perf_counter()
+            for daily_prediction, daily_df in self._stream_daily_weather(
+                    lat, lon, start, daily_end.__str__(), frames[DataFrameType.DailyHistory.value]):
+                self.timings["predict"] += time.perf_counter() - started
+                prediction[DataFrameType.DailyPrediction.value] = daily_prediction
+                prediction[DataFrameType.DailyHistory.value] = daily_df
+                yield dict(prediction), dict(actual)
+                started = time.perf_counter()
+
     def calculate_metrics(self, lat: float, lon: float, start: str, end: str) -> dict[str, dict[str, Any]]:
         """Calculate metrics for specific location.
 
@@ -70,11 +170,11 @@ class WeatherPredictor:
         end = (pd.Timestamp(end)).date()
         dataframe = self._api_client.get_daily_weather_history(lat, lon, start.__str__(), end.__str__())
         dataframe = prepare_data(dataframe, daily_discrete_features)
-        test = ProphetWeatherPredictionModel.test(7,
-                                                  dataframe,
-                                                  DataFrameType.DailyHistory,
-                                                  daily_regressors,
-                                                  calculate_daily_training_size(7))
+        test = self._model_class.test(7,
+                                      dataframe,
+                                      DataFrameType.DailyHistory,
+                                      daily_regressors,
+                                      self._daily_training_size(7))
         return test
 
     def get_actual_data(self, lat: float, lon: float, start: str,
@@ -100,7 +200,45 @@ class WeatherPredictor:
         else:
             return {}
 
-    def _predict_daily_weather(self, lat: float, lon: float, start: str, end: str) -> (pd.DataFrame, pd.DataFrame):
+    def training_size(self, df_type: DataFrameType, distance: int) -> int:
+        """
+        Get the number of periods the model of a forecast is trained on.
+
+        :param df_type: (DataFrameType) DailyHistory or HourlyHistory.
+        :param distance: (int) Number of periods to predict. (days or hours)
+        :return: (int) Number of periods to use for training. (days or hours)
+        :raises ValueError: If the DataFrameType is unknown.
+        """
+        if df_type == DataFrameType.DailyHistory:
+            return self._daily_training_size(distance)
+        elif df_type == DataFrameType.HourlyHistory:
+            return self._hourly_training_size(distance)
+        raise ValueError("Unknown DataFrameType")
+
+    def _daily_training_size(self, period: int) -> int:
+        """Get the number of days the daily model of a period is trained on."""
+        return self._training_windows.train_size(self._engine, "daily", period) \
+            or calculate_daily_training_size(period)
+
+    def _hourly_training_size(self, hours: int) -> int:
+        """Get the number of hours the hourly model of a period is trained on."""
+        return self._training_windows.train_size(self._engine, "hourly", hours) or hourly_train_size
+
+    def _daily_training_range(self, start: str, end: str) -> (str, str):
+        """Get the dates (inclusive) the daily model is trained on."""
+        period = (pd.to_datetime(end) - pd.to_datetime(start)).days
+        df_start = (pd.to_datetime(start) - pd.Timedelta(days=self._daily_training_size(period))).date()
+        df_end = (pd.to_datetime(start) - pd.Timedelta(days=1)).date()
+        return df_start.__str__(), df_end.__str__()
+
+    def _hourly_training_range(self, start: str, hours: int) -> (str, str):
+        """Get the dates (inclusive) the hourly model is trained on."""
+        df_start = (pd.to_datetime(start) - pd.Timedelta(days=self._hourly_training_size(hours) // 24)).date()
+        df_end = (pd.to_datetime(start) - pd.Timedelta(days=1)).date()
+        return df_start.__str__(), df_end.__str__()
+
+    def _predict_daily_weather(self, lat: float, lon: float, start: str, end: str,
+                               df: pd.DataFrame = None) -> (pd.DataFrame, pd.DataFrame):
         """
         Predict daily weather for specific location.
 
@@ -108,20 +246,30 @@ class WeatherPredictor:
         :param lon: (float) Longitude.
         :param start: (str) Start date to predict ISO 8601, e.g. start=2024-01-12
         :param end: (str) End date to predict ISO 8601, e.g. end=2024-01-26.
+        :param df: (pd.DataFrame) Already fetched training history. If None, it is fetched.
         :return: (dict) Predicted daily weather.
         """
+        for prediction, df in self._stream_daily_weather(lat, lon, start, end, df):
+            pass
+        return prediction, df
+
+    def _stream_daily_weather(self, lat: float, lon: float, start: str, end: str,
+                              df: pd.DataFrame = None) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+        """Predict daily weather like _predict_daily_weather, yielding the prediction so far."""
         period = (pd.to_datetime(end) - pd.to_datetime(start)).days
-        df_start = (pd.to_datetime(start) - pd.Timedelta(days=calculate_daily_training_size(period))).date()
-        df_end = (pd.to_datetime(start) - pd.Timedelta(days=1)).date()
-        df = self._api_client.get_daily_weather_history(lat, lon, df_start.__str__(), df_end.__str__())
+        if df is None:
+            df = self._api_client.get_daily_weather_history(lat, lon, *self._daily_training_range(start, end))
         df = prepare_data(df, daily_discrete_features)
 
-        daily_model = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, daily_regressors)
+        daily_model = self._model_class(df, DataFrameType.DailyHistory, daily_regressors, location=(lat, lon),
+                                        **self._model_kwargs)
 
         start_date = pd.to_datetime(start)
-        return daily_model.predict(period, start_date.__str__(), calculate_daily_training_size(period)), df
+        for prediction in daily_model.predict_stream(period, start_date.__str__(), self._daily_training_size(period)):
+            yield self._compact_prediction(prediction), df
 
-    def _predict_hourly_weather(self, lat: float, lon: float, start: str, end: str) -> (pd.DataFrame, pd.DataFrame):
+    def _predict_hourly_weather(self, lat: float, lon: float, start: str, end: str,
+                                df: pd.DataFrame = None) -> (pd.DataFrame, pd.DataFrame):
         """
         Predict hourly weather for specific location.
 
@@ -129,18 +277,33 @@ class WeatherPredictor:
         :param lon: (float) Longitude.
         :param start: (str) Start date to predict ISO 8601, e.g. start=2024-01-12.
         :param end: (str) End date to predict ISO 8601, e.g. end=2024-01-26.
+        :param df: (pd.DataFrame) Already fetched training history. If None, it is fetched.
         :return: (dict) Predicted hourly weather.
         """
-        df_start = (pd.to_datetime(start) - pd.Timedelta(days=hourly_train_size // 24)).date()
-        df_end = (pd.to_datetime(start) - pd.Timedelta(days=1)).date()
-        df = self._api_client.get_hourly_weather_history(lat, lon, df_start.__str__(), df_end.__str__())
+        for prediction, df in self._stream_hourly_weather(lat, lon, start, end, df):
+            pass
+        return prediction, df
+
+    def _stream_hourly_weather(self, lat: float, lon: float, start: str, end: str,
+                               df: pd.DataFrame = None) -> Iterator[tuple[pd.DataFrame, pd.DataFrame]]:
+        """Predict hourly weather like _predict_hourly_weather, yielding the prediction so far."""
+        periods = (pd.to_datetime(end) - pd.to_datetime(start)).days * 24
+        if df is None:
+            df = self._api_client.get_hourly_weather_history(lat, lon, *self._hourly_training_range(start, periods))
         df = prepare_data(df, hourly_discrete_features)
 
-        hourly_model = ProphetWeatherPredictionModel(df, DataFrameType.HourlyHistory, hourly_regressors)
+        hourly_model = self._model_class(df, DataFrameType.HourlyHistory, hourly_regressors, location=(lat, lon),
+                                         **self._model_kwargs)
 
-        period = pd.to_datetime(end) - pd.to_datetime(start)
         start_date = pd.to_datetime(start)
-        return hourly_model.predict(period.days * 24, start_date.__str__(), hourly_train_size), df
+        for prediction in hourly_model.predict_stream(periods, start_date.__str__(),
+                                                      self._hourly_training_size(periods)):
+            yield self._compact_prediction(prediction), df
+
+    @staticmethod
+    def _compact_prediction(prediction: pd.DataFrame) -> pd.DataFrame:
+        """Keep predicted values as MEASUREMENT_DTYPE, like the history they are predicted from."""
+        return prediction.astype({column: MEASUREMENT_DTYPE for column in prediction.columns if column != "ds"})
 
 
 #pd.set_option('display.max_columns', None)
@@ -160,4 +323,4 @@ class WeatherPredictor:
 # print(actual[DataFrameType.HourlyHistory.value])
 
 # metrics = predictor.calculate_metrics(-11.754611883149868, 19.918700267723633, "2020-01-01", "2021-01-01")
-# print(metrics)
\ No newline at end of file
+# print(metrics)
\ No newline at end of file
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from api.replay_server import ReplayServer
+
+
+@pytest.fixture(autouse=True, scope="session")
+def data_dir(tmp_path_factory):
+    """
+    Keep the default history store, model cache and result cache of the tests in a temporary directory,
+    so nothing the tests compute is served by the app later.
+    """
+    previous = os.environ.get("WEATHERCAST_DATA_DIR")
+    os.environ["WEATHERCAST_DATA_DIR"] = str(tmp_path_factory.mktemp("data"))
+    yield os.environ["WEATHERCAST_DATA_DIR"]
+    if previous is None:
+        del os.environ["WEATHERCAST_DATA_DIR"]
+    else:
+        os.environ["WEATHERCAST_DATA_DIR"] = previous
+
+
+@pytest.fixture(autouse=True, scope="session")
+def archive_api(tmp_path_factory):
+    """
+    Serve the archive API locally, so the tests do not depend on the network.
+
+    Set OPEN_METEO_ARCHIVE_URL to run against another server, e.g. the public archive API.
+    """
+    if os.environ.get("OPEN_METEO_ARCHIVE_URL"):
+        yield os.environ["OPEN_METEO_ARCHIVE_URL"]
+        return
+    with ReplayServer(str(tmp_path_factory.mktemp("fixtures")), synthetic=True) as server:
+        os.environ["OPEN_METEO_ARCHIVE_URL"] = server.url
+        yield server.url
+        del os.environ["OPEN_METEO_ARCHIVE_URL"]
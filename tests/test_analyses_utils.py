@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from utils.analyses_utils import prepare_data
+from weather_prediction.features import all_hourly_features, hourly_discrete_features
+from weather_prediction.weather_code.weather_code_prediction import WeatherCodesPredictor, WEATHER_LABEL_DTYPE
+
+
+def hourly_history(hours):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((hours, len(all_hourly_features)), dtype=np.float32) * 100,
+                      columns=all_hourly_features)
+    df["weather_code"] = rng.choice([0, 3, 61, 95], hours).astype(np.float32)
+    df.loc[5, "weather_code"] = np.nan
+    df.loc[7, "temperature_2m"] = np.nan
+    df.insert(0, "date", pd.date_range("2018-01-01", periods=hours, freq="h"))
+    return df
+
+
+def test_prepare_data_keeps_compact_dtypes():
+    df = prepare_data(hourly_history(100), hourly_discrete_features)
+
+    assert len(df) == 99
+    assert df["ds"].dtype == "datetime64[ns]"
+    assert df["weather_code"].dtype == np.uint8
+    assert (df.drop(columns=["ds", "weather_code"]).dtypes == np.float32).all()
+    assert not df.isna().any().any()
+
+
+def test_weather_code_labels():
+    labels = WeatherCodesPredictor.replace_weather_codes(pd.Series([0, 3, 61.0, np.nan, 42], name="weather_code"))
+
+    assert labels.dtype == WEATHER_LABEL_DTYPE
+    assert labels.tolist() == ["clear", "cloudy", "rain", "unknown", "unknown"]
+    assert labels.name == "weather_code"
+
+
+def test_compact_frames_use_less_than_half_the_memory():
+    df = prepare_data(hourly_history(3 * 365 * 24), hourly_discrete_features)
+    df["weather_code"] = WeatherCodesPredictor.replace_weather_codes(df["weather_code"])
+
+    wide = df.astype({column: np.float64 for column in df.columns if column not in ["ds", "weather_code"]})
+    wide["weather_code"] = wide["weather_code"].astype(str)
+
+    assert df.memory_usage(deep=True).sum() < wide.memory_usage(deep=True).sum() / 2
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+from api.api_client import ApiClient
+from api.grid import snap_to_grid
+from api.history_store import HistoryStore
+from api.replay_server import ReplayServer, fixture_key
+from weather_prediction.features import all_daily_features, all_hourly_features
+
+
+def test_split_range_short():
+    assert ApiClient._split_range("2019-03-01", "2019-05-01", 1) == [("2019-03-01", "2019-05-01")]
+
+
+def test_split_range_calendar_years():
+    chunks = ApiClient._split_range("2000-01-26", "2020-01-26", 5)
+    assert chunks == [("2000-01-26", "2004-12-31"), ("2005-01-01", "2009-12-31"), ("2010-01-01", "2014-12-31"),
+                      ("2015-01-01", "2019-12-31"), ("2020-01-01", "2020-01-26")]
+
+
+def test_batch_from_replay_server(tmp_path):
+    with ReplayServer(str(tmp_path / "fixtures"), synthetic=True) as server:
+        client = ApiClient(history_store=None, url=server.url)
+        locations = [(50.45, 30.52), (49.84, 24.03)]
+        frames = client.get_daily_weather_history_batch(locations, "2020-01-01", "2020-01-10")
+        long_frame = client.get_daily_weather_history_batch(locations, "2020-01-01", "2020-01-10", long_format=True)
+        single = client.get_daily_weather_history(49.84, 24.03, "2020-01-01", "2020-01-10")
+
+    assert len(frames) == 2
+    assert list(frames[0].columns) == ["date"] + all_daily_features
+    assert len(frames[0]) == 10
+    assert (frames[0].dtypes[all_daily_features] == np.float32).all()
+    assert not frames[0].equals(frames[1])
+    pd.testing.assert_frame_equal(frames[1], single)
+    assert long_frame["location"].tolist() == [0] * 10 + [1] * 10
+
+
+def test_chunked_history_matches_single_request(tmp_path):
+    with ReplayServer(str(tmp_path / "fixtures"), synthetic=True) as server:
+        client = ApiClient(history_store=None, url=server.url)
+        chunked = client.get_hourly_weather_history(50.45, 30.52, "2019-12-20", "2020-01-10")
+        client.chunk_years = {"daily": 5, "hourly": 100}
+        single = client.get_hourly_weather_history(50.45, 30.52, "2019-12-20", "2020-01-10")
+
+    assert list(chunked.columns) == ["date"] + all_hourly_features
+    assert len(chunked) == 22 * 24
+    pd.testing.assert_frame_equal(chunked, single)
+
+
+def test_history_store_fills_gaps(tmp_path):
+    store = HistoryStore(str(tmp_path / "history"))
+    with ReplayServer(str(tmp_path / "fixtures"), synthetic=True) as server:
+        client = ApiClient(history_store=store, url=server.url)
+        first = client.get_daily_weather_history(50.45, 30.52, "2020-01-01", "2020-01-20")
+        shifted = client.get_daily_weather_history(50.45, 30.52, "2020-01-05", "2020-01-25")
+        direct = ApiClient(history_store=None, url=server.url).get_daily_weather_history(
+            50.45, 30.52, "2020-01-05", "2020-01-25")
+
+    assert len(first) == 20
+    pd.testing.assert_frame_equal(shifted, direct)
+    location = snap_to_grid(50.45, 30.52)
+    source = store.for_source(client.source)
+    assert source.missing_ranges("daily", *location, "2020-01-01", "2020-01-25", all_daily_features) == []
+    # history of one archive is never served as history of another
+    other = store.for_source("https://archive-api.open-meteo.com/v1/archive")
+    assert other.missing_ranges("daily", *location, "2020-01-01", "2020-01-25", all_daily_features) != []
+
+
+def test_replay_server_serves_fixtures(tmp_path):
+    query = "latitude=50.5&longitude=30.5&start_date=2020-01-01&end_date=2020-01-02&daily=weather_code"
+    (tmp_path / f"{fixture_key(query)}.fb").write_bytes(b"recorded")
+
+    with ReplayServer(str(tmp_path)) as server:
+        assert server.answer("daily=weather_code&start_date=2020-01-01&end_date=2020-01-02&"
+                             "latitude=50.5&longitude=30.5") == (200, b"recorded")
+        assert server.answer(query.replace("2020-01-02", "2020-01-03"))[0] == 404
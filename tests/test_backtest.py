@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.analyses_utils import DataFrameType
+from weather_prediction.backtest import Backtester
+from weather_prediction.harmonic.harmonic_model import HarmonicWeatherPredictionModel
+
+
+def hourly_history(hours=600):
+    ds = pd.date_range("2020-03-01", periods=hours, freq="h")
+    t = np.arange(hours)
+    temperature = 10 + 5 * np.sin(2 * np.pi * t / 24) + np.sin(t / 7)
+    return pd.DataFrame({
+        "ds": ds,
+        "temperature_2m": temperature,
+        "relative_humidity_2m": 90 - 2 * temperature
+    })
+
+
+def backtester(df, **kwargs):
+    return Backtester(HarmonicWeatherPredictionModel, df, DataFrameType.HourlyHistory, ["temperature_2m"],
+                      train_size=100, horizon=12, **kwargs)
+
+
+def test_origins():
+    df = hourly_history()
+    assert backtester(df).origins() == list(range(100, 589, 112))
+    assert backtester(df, stride=24).origins() == list(range(100, 589, 24))
+    with pytest.raises(ValueError):
+        backtester(df.head(50)).run()
+
+
+def test_errors_per_horizon_step():
+    errors = backtester(hourly_history(), stride=24, workers=1).run()
+
+    assert list(errors) == ["MAE", "RMSE"]
+    assert errors["MAE"].index.tolist() == list(range(1, 13))
+    assert errors["MAE"].columns.tolist() == ["temperature_2m", "relative_humidity_2m"]
+    assert (errors["RMSE"] >= errors["MAE"] - 1e-12).all().all()
+
+
+def test_worker_pool_matches_inline():
+    df = hourly_history()
+    inline = backtester(df, stride=48, workers=1).run()
+    pooled = backtester(df, stride=48, workers=2).run()
+
+    for metric in inline:
+        pd.testing.assert_frame_equal(inline[metric], pooled[metric])
+
+
+def test_model_test_reports_last_step():
+    df = hourly_history()
+    metrics = HarmonicWeatherPredictionModel.test(12, df, DataFrameType.HourlyHistory, ["temperature_2m"], 100,
+                                                  stride=24, workers=1)
+    errors = backtester(df, stride=24, workers=1).run()
+
+    assert metrics["MAE"] == errors["MAE"].iloc[-1].to_dict()
+    assert metrics["RMSE"] == errors["RMSE"].iloc[-1].to_dict()
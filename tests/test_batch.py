@@ -0,0 +1,43 @@
+import pandas as pd
+import pytest
+
+from forecast.batch import BatchRunner, read_jobs
+
+
+def write_jobs(tmp_path):
+    path = tmp_path / "jobs.csv"
+    pd.DataFrame({
+        "lat": [50.44, 50.41, 40.0, 40.0],
+        "lon": [30.52, 30.53, 20.0, 20.0],
+        "from": ["2020-01-01", "2020-01-07", "2020-03-01", "2020-03-01"],
+        "to": ["2020-01-07", "2020-01-01", "2020-03-03", "2020-03-03"],
+        "type": ["Daily", "Daily", "Hourly", "Weekly"],
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_read_jobs_requires_columns(tmp_path):
+    path = tmp_path / "jobs.parquet"
+    pd.DataFrame({"lat": [1.0], "lon": [2.0], "from": [pd.Timestamp("2020-01-01")]}).to_parquet(path)
+    with pytest.raises(ValueError, match="to, type"):
+        read_jobs(str(path))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_writes_results(tmp_path, workers):
+    output = tmp_path / "output"
+    runner = BatchRunner(str(output), engine="harmonic", workers=workers, result_cache=False)
+    stats = runner.run(read_jobs(str(write_jobs(tmp_path))))
+
+    assert (stats["jobs"], stats["failed"]) == (4, 1)
+    assert {"fetch", "predict", "weather_codes", "write", "total"} <= set(stats["stages"])
+
+    daily = pd.read_parquet(output / "predictions_daily.parquet")
+    assert sorted(daily["job"].unique()) == [0, 1]
+    assert len(daily) == 12
+    hourly = pd.read_parquet(output / "actuals_hourly.parquet")
+    assert hourly["job"].unique().tolist() == [2] and len(hourly) == 48
+
+    jobs = pd.read_parquet(output / "jobs.parquet")
+    assert jobs["job"].tolist() == [0, 1, 2, 3]
+    assert jobs["error"].isna().tolist() == [True, True, True, False]
@@ -0,0 +1,19 @@
+import pandas as pd
+
+from display_results import ProgressiveResults
+
+
+def test_progressive_results_add_arriving_columns():
+    actual = pd.DataFrame({"date": pd.date_range("2020-01-01", periods=2), "temperature": [1.0, 2.0],
+                           "pressure": [3.0, 4.0]})
+    results = ProgressiveResults(["temperature", "pressure"], ["Temperature", "Pressure"])
+
+    results.update(actual, pd.DataFrame({"ds": actual["date"], "temperature": [1.5, 2.5]}))
+    assert results._select_plot.options == ["Temperature"]
+    assert results._select_plot.value == "Temperature"
+    assert "Temperature" in results.list_widget.object and "Pressure" not in results.list_widget.object
+
+    results.update(actual, pd.DataFrame({"ds": actual["date"], "temperature": [1.5, 2.5], "pressure": [3.5, 4.5]}))
+    assert results._select_plot.options == ["Temperature", "Pressure"]
+    assert results._select_plot.value == "Temperature"
+    assert "Pressure" in results.list_widget.object
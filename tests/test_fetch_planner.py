@@ -0,0 +1,29 @@
+import pandas as pd
+
+from api.api_client import ApiClient
+from weather_prediction.fetch_planner import FetchPlanner
+
+
+def test_adjacent_ranges_are_fetched_once():
+    planner = FetchPlanner()
+    planner.add("train", "daily", "2019-12-01", "2019-12-31")
+    planner.add("actual", "daily", "2020-01-01", "2020-01-07")
+    planner.add("hourly", "hourly", "2020-01-01", "2020-01-02")
+    planner.add("far", "daily", "2020-03-01", "2020-03-02")
+
+    assert planner.plan() == [("daily", pd.Timestamp("2019-12-01"), pd.Timestamp("2020-01-07")),
+                              ("daily", pd.Timestamp("2020-03-01"), pd.Timestamp("2020-03-02")),
+                              ("hourly", pd.Timestamp("2020-01-01"), pd.Timestamp("2020-01-02"))]
+
+
+def test_slices_match_separate_requests():
+    client = ApiClient(history_store=None)
+    planner = FetchPlanner()
+    planner.add("train", "hourly", "2019-12-20", "2019-12-31")
+    planner.add("actual", "hourly", "2020-01-01", "2020-01-02")
+    frames = planner.fetch(client, 50.45, 30.52)
+
+    pd.testing.assert_frame_equal(frames["train"],
+                                  client.get_hourly_weather_history(50.45, 30.52, "2019-12-20", "2019-12-31"))
+    pd.testing.assert_frame_equal(frames["actual"],
+                                  client.get_hourly_weather_history(50.45, 30.52, "2020-01-01", "2020-01-02"))
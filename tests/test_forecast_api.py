@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import pandas as pd
+import pytest
+import requests
+from tornado.httpserver import HTTPServer
+from tornado.netutil import bind_sockets
+from tornado.web import Application
+
+from api.forecast_api import columnar_json, routes
+from forecast.forecast import WeatherForecast
+from forecast.jobs import ForecastJobs
+from json_reader.builder import CityCollectionBuilder
+from utils.files_definition import FilePaths
+
+
+@pytest.fixture(scope="module")
+def api_url():
+    autocomplete_helper = CityCollectionBuilder(FilePaths.TEST_CITIES_FILE).build_map()
+    forecast_jobs = ForecastJobs(lambda: WeatherForecast(engine="harmonic", result_cache=None))
+    sockets = bind_sockets(0, "127.0.0.1")
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        HTTPServer(Application(routes(autocomplete_helper, forecast_jobs))).add_sockets(sockets)
+        loop.call_soon(started.set)
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    started.wait()
+    yield f"http://127.0.0.1:{sockets[0].getsockname()[1]}/api"
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+
+
+def test_forecast(api_url):
+    response = requests.get(f"{api_url}/forecast", params={"lat": 50.45, "lon": 30.52, "from": "2020-01-01",
+                                                          "to": "2020-01-07", "type": "Daily"})
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/json"
+    body = response.json()
+    assert set(body) == {"prediction", "actual"}
+    for frame, date_column in [(body["prediction"], "ds"), (body["actual"], "date")]:
+        assert frame[date_column][0].startswith("2020-01-01")
+        assert len({len(values) for values in frame.values()}) == 1
+        assert all(isinstance(weather_code, str) for weather_code in frame["weather_code"])
+
+
+@pytest.mark.parametrize("params, reason", [
+    ({"type": "Weekly"}, "type"),
+    ({"from": "2020-13-01"}, "from"),
+    ({"lat": "north"}, "lat"),
+    ({"to": "2999-01-01"}, "to"),
+    ({"to": "2020-01-01"}, "empty"),
+])
+def test_forecast_bad_request(api_url, params, reason):
+    params = {"lat": 50.45, "lon": 30.52, "from": "2020-01-01", "to": "2020-01-07", **params}
+    response = requests.get(f"{api_url}/forecast", params=params)
+    assert response.status_code == 400
+    assert response.json()["error"] is True
+    assert reason in response.json()["reason"]
+
+
+def test_forecast_missing_argument(api_url):
+    response = requests.get(f"{api_url}/forecast", params={"lat": 50.45})
+    assert response.status_code == 400
+    assert "lon" in response.json()["reason"]
+
+
+def test_cities(api_url):
+    response = requests.get(f"{api_url}/cities", params={"q": "ushu", "n": 5})
+    assert response.status_code == 200
+    assert response.json() == {"name": ["Ushuaia, Argentina, Tierra del Fuego"], "lat": [-54.799999],
+                               "lon": [-68.300003]}
+
+
+def test_closest_city(api_url):
+    response = requests.get(f"{api_url}/closest", params={"lat": -54.3, "lon": -36.5})
+    assert response.status_code == 200
+    assert response.json()["name"] == ["Grytviken, South Georgia and the South Sandwich Islands"]
+
+
+def test_columnar_json_keeps_missing_values():
+    frame = pd.DataFrame({"date": pd.to_datetime(["2020-01-01", "2020-01-02"]), "value": [1.5, None]})
+    assert columnar_json(frame) == '{"date":["2020-01-01T00:00:00","2020-01-02T00:00:00"],"value":[1.5,null]}'
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from forecast.jobs import ForecastJobs
+
+
+class StreamingForecast:
+    calls = 0
+
+    def predict_stream(self, user_input):
+        StreamingForecast.calls += 1
+        for columns in range(1, 4):
+            time.sleep(0.1)
+            yield pd.DataFrame({f"value_{column}": [0.0] for column in range(columns)}), pd.DataFrame({"value": [0.0]})
+
+
+class SlowForecast:
+    calls = 0
+
+    def predict(self, user_input):
+        SlowForecast.calls += 1
+        time.sleep(0.2)
+        if user_input['type'] == 'Broken':
+            raise ValueError("broken")
+        return pd.DataFrame({"value": [user_input['lat']]}), pd.DataFrame({"value": [0.0]})
+
+
+def user_input(lat=50.44, lon=30.52, type='Daily'):
+    return {"lat": lat, "lon": lon, "type": type, "from": "2020-01-01", "to": "2020-01-07"}
+
+
+def run_concurrently(jobs, inputs):
+    results = [None] * len(inputs)
+
+    def run(index):
+        try:
+            results[index] = jobs.predict(inputs[index])
+        except ValueError as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(len(inputs))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_identical_requests_share_one_forecast():
+    SlowForecast.calls = 0
+    jobs = ForecastJobs(SlowForecast)
+    # same grid cell, dates given in the other order
+    inputs = [user_input() for _ in range(4)] + [{**user_input(lat=50.41), "from": "2020-01-07", "to": "2020-01-01"}]
+    results = run_concurrently(jobs, inputs)
+
+    assert SlowForecast.calls == 1
+    assert (jobs.computed, jobs.coalesced) == (1, 4)
+    assert all(prediction["value"].tolist() == [50.44] for prediction, _ in results)
+    assert results[0][0] is not results[1][0]
+
+    # finished jobs are not cached
+    jobs.predict(user_input())
+    assert SlowForecast.calls == 2
+
+
+def test_other_requests_run_separately():
+    SlowForecast.calls = 0
+    jobs = ForecastJobs(SlowForecast)
+    run_concurrently(jobs, [user_input(), user_input(lat=40.0), user_input(type='Hourly')])
+    assert SlowForecast.calls == 3
+
+
+def test_errors_reach_every_waiter():
+    SlowForecast.calls = 0
+    jobs = ForecastJobs(SlowForecast)
+    results = run_concurrently(jobs, [user_input(type='Broken')] * 3)
+
+    assert SlowForecast.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    with pytest.raises(ValueError):
+        jobs.predict(user_input(type='Broken'))
+
+
+def test_stream_waiters_get_the_final_result():
+    StreamingForecast.calls = 0
+    jobs = ForecastJobs(StreamingForecast)
+    streams = [None, None]
+
+    def run(index):
+        streams[index] = [list(prediction.columns) for prediction, _ in jobs.predict_stream(user_input())]
+
+    leader = threading.Thread(target=run, args=(0,))
+    leader.start()
+    time.sleep(0.05)
+    run(1)
+    leader.join()
+
+    assert StreamingForecast.calls == 1
+    assert streams[0] == [["value_0"], ["value_0", "value_1"], ["value_0", "value_1", "value_2"]]
+    assert streams[1] == [["value_0", "value_1", "value_2"]]
+
+
+def test_abandoned_stream_fails_waiters():
+    jobs = ForecastJobs(StreamingForecast)
+    stream = jobs.predict_stream(user_input())
+    next(stream)
+    errors = []
+
+    def wait():
+        try:
+            list(jobs.predict_stream(user_input()))
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    time.sleep(0.05)
+    stream.close()
+    waiter.join()
+
+    assert len(errors) == 1
+    assert jobs.coalesced == 1
+    assert len(list(jobs.predict_stream(user_input()))) == 3
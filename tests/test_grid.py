@@ -0,0 +1,33 @@
+import pandas as pd
+
+from api.api_client import ApiClient
+from api.grid import snap_to_grid
+from api.replay_server import ReplayServer
+
+
+def test_nearby_clicks_share_cell():
+    assert snap_to_grid(50.4501, 30.5233) == snap_to_grid(50.4689, 30.5112) == (50.5, 30.5)
+
+
+def test_snap_is_idempotent():
+    snapped = snap_to_grid(-11.754611883149868, 19.918700267723633)
+    assert snapped == (-11.75, 20.0)
+    assert snap_to_grid(*snapped) == snapped
+
+
+def test_longitude_wraps():
+    assert snap_to_grid(0.0, 190.0) == (0.0, -170.0)
+
+
+def test_snapped_and_unsnapped_requests_get_the_same_data(tmp_path):
+    clicked, snapped = (50.4501, 30.5233), snap_to_grid(50.4501, 30.5233)
+    with ReplayServer(str(tmp_path), synthetic=True) as server:
+        client = ApiClient(history_store=None, url=server.url)
+        # straight to the API, the public methods would snap the clicked point themselves
+        at_click, at_cell = (client._fetch("daily", [location], "2020-01-01", "2020-01-31")[0]
+                             for location in [clicked, snapped])
+        pd.testing.assert_frame_equal(at_click, at_cell)
+
+        # without the grid-aligned parameters, the archive answers the point itself
+        query = "latitude={}&longitude={}&start_date=2020-01-01&end_date=2020-01-01&daily=temperature_2m_mean"
+        assert server.answer(query.format(*clicked)) != server.answer(query.format(*snapped))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.analyses_utils import DataFrameType
+from weather_prediction.engines import get_engine
+from weather_prediction.harmonic import harmonic_model
+from weather_prediction.harmonic.harmonic_model import HarmonicWeatherPredictionModel
+
+
+def hourly_history(hours=1500):
+    ds = pd.date_range("2020-03-01", periods=hours, freq="h")
+    t = np.arange(hours)
+    temperature = 10 + 5 * np.sin(2 * np.pi * (t - 6) / 24)
+    return pd.DataFrame({
+        "ds": ds,
+        "temperature_2m": temperature,
+        "cloud_cover": 40 + 10 * np.cos(2 * np.pi * t / 24),
+        "relative_humidity_2m": 90 - 2 * temperature
+    })
+
+
+def test_predict_shape():
+    df = hourly_history()
+    model = HarmonicWeatherPredictionModel(df, DataFrameType.HourlyHistory, ["temperature_2m", "cloud_cover"])
+    forecast = model.predict(48, "2020-04-30", 1000)
+
+    assert list(forecast.columns) == ["ds", "temperature_2m", "cloud_cover", "relative_humidity_2m"]
+    assert forecast["ds"].tolist() == list(pd.date_range("2020-04-30", periods=48, freq="h"))
+    assert not forecast.isna().any().any()
+
+
+def test_predicts_daily_cycle_and_dependent_variables(monkeypatch):
+    solves = []
+    solve = harmonic_model._solve
+    monkeypatch.setattr(harmonic_model, "_solve", lambda x, y, ridge: solves.append(y.shape) or solve(x, y, ridge))
+    df = hourly_history()
+    model = HarmonicWeatherPredictionModel(df, DataFrameType.HourlyHistory, ["temperature_2m", "cloud_cover"])
+    forecast = model.predict(48, "2020-04-30", 1000)
+
+    actual = df.set_index("ds").loc[forecast["ds"]].reset_index()
+    for variable in ["temperature_2m", "cloud_cover", "relative_humidity_2m"]:
+        np.testing.assert_allclose(forecast[variable], actual[variable], atol=0.5)
+    # one batched solve for the independent variables and one for the others, not one per variable
+    assert solves == [(1000, 2), (1000, 1)]
+
+
+def test_unknown_engine():
+    assert get_engine("harmonic") is HarmonicWeatherPredictionModel
+    with pytest.raises(ValueError):
+        get_engine("unknown")
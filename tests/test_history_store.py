@@ -0,0 +1,99 @@
+import datetime
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from api.history_store import HistoryStore
+
+
+def daily_frame(start, end):
+    dates = pd.date_range(start=start, end=end, freq="D")
+    return pd.DataFrame({
+        "date": dates,
+        "temperature_2m_mean": np.arange(len(dates), dtype=np.float32),
+        "precipitation_sum": np.ones(len(dates), dtype=np.float32)
+    })
+
+
+def test_missing_ranges_empty_store(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    missing = store.missing_ranges("daily", 50.45, 30.52, "2020-01-01", "2020-01-31", ["temperature_2m_mean"])
+    assert missing == [(datetime.date(2020, 1, 1), datetime.date(2020, 1, 31))]
+
+
+def test_only_gaps_are_missing(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    variables = ["temperature_2m_mean", "precipitation_sum"]
+    store.write("daily", 50.45, 30.52, "2020-01-05", "2020-01-10", daily_frame("2020-01-05", "2020-01-10"))
+
+    missing = store.missing_ranges("daily", 50.45, 30.52, "2020-01-01", "2020-01-12", variables)
+    assert missing == [(datetime.date(2020, 1, 1), datetime.date(2020, 1, 4)),
+                       (datetime.date(2020, 1, 11), datetime.date(2020, 1, 12))]
+
+    store.write("daily", 50.45, 30.52, "2020-01-11", "2020-01-12", daily_frame("2020-01-11", "2020-01-12"))
+    missing = store.missing_ranges("daily", 50.45, 30.52, "2020-01-06", "2020-01-12", variables)
+    assert missing == []
+
+    # a variable that was never written is missing everywhere
+    missing = store.missing_ranges("daily", 50.45, 30.52, "2020-01-06", "2020-01-12", ["sunshine_duration"])
+    assert missing == [(datetime.date(2020, 1, 6), datetime.date(2020, 1, 12))]
+
+
+def test_read_returns_requested_slice(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    store.write("daily", 50.45, 30.52, "2020-01-01", "2020-01-10", daily_frame("2020-01-01", "2020-01-10"))
+
+    frame = store.read("daily", 50.45, 30.52, "2020-01-03", "2020-01-05", ["precipitation_sum", "temperature_2m_mean"])
+    assert list(frame.columns) == ["date", "precipitation_sum", "temperature_2m_mean"]
+    assert frame["date"].tolist() == list(pd.date_range("2020-01-03", "2020-01-05", freq="D"))
+    assert frame["temperature_2m_mean"].tolist() == [2.0, 3.0, 4.0]
+    assert frame["temperature_2m_mean"].dtype == np.float32
+
+
+def test_recent_days_are_never_held(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=30)
+    store.write("daily", 50.45, 30.52, start, end, daily_frame(start, end))
+
+    missing = store.missing_ranges("daily", 50.45, 30.52, start, end, ["temperature_2m_mean"])
+    assert missing == [(datetime.date.today() - datetime.timedelta(days=HistoryStore.recent_days - 1), end)]
+
+
+def test_writers_of_other_processes_do_not_collide(tmp_path):
+    # one store per writer, as in separate processes, so the store lock does not serialize them
+    errors = []
+
+    def write():
+        try:
+            for _ in range(5):
+                HistoryStore(str(tmp_path)).write("daily", 50.45, 30.52, "2020-01-01", "2020-01-10",
+                                                  daily_frame("2020-01-01", "2020-01-10"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert list(tmp_path.rglob("*.tmp")) == []
+
+
+def write_month(root, month):
+    start, end = f"2020-{month:02d}-01", (pd.Timestamp(f"2020-{month:02d}-01") + pd.offsets.MonthEnd()).date()
+    HistoryStore(root).write("daily", 50.45, 30.52, start, end, daily_frame(start, end))
+
+
+def test_writers_of_other_processes_keep_each_others_rows(tmp_path):
+    with ProcessPoolExecutor(max_workers=4, mp_context=multiprocessing.get_context("spawn")) as executor:
+        list(executor.map(write_month, [str(tmp_path)] * 12, range(1, 13)))
+
+    store = HistoryStore(str(tmp_path))
+    assert store.missing_ranges("daily", 50.45, 30.52, "2020-01-01", "2020-12-31", ["temperature_2m_mean"]) == []
+    frame = store.read("daily", 50.45, 30.52, "2020-01-01", "2020-12-31", ["temperature_2m_mean"])
+    assert frame["date"].tolist() == list(pd.date_range("2020-01-01", "2020-12-31", freq="D"))
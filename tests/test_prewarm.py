@@ -0,0 +1,76 @@
+import datetime
+import time
+
+import pandas as pd
+
+from forecast.jobs import ForecastJobs
+from forecast.prewarm import Prewarmer, default_window, top_cities
+from json_reader.autocomplete_helper import AutocompleteHelper
+from json_reader.city import CityCollection, CityInfo
+
+
+class RecordingForecast:
+    inputs = []
+
+    def predict(self, user_input):
+        RecordingForecast.inputs.append(user_input)
+        if user_input['lat'] < 0:
+            raise ValueError("broken")
+        return pd.DataFrame({"value": [0.0]}), pd.DataFrame({"value": [0.0]})
+
+
+def cities():
+    return [CityInfo(1, "Kyiv", "UA", "Kyiv", 50.45, 30.52, 2_900_000),
+            CityInfo(2, "Kyiv suburb", "UA", "Kyiv", 50.44, 30.53, 10_000),
+            CityInfo(3, "Lviv", "UA", "Lviv", 49.84, 24.03, 720_000)]
+
+
+def test_default_window_is_the_last_week():
+    assert default_window(datetime.date(2024, 3, 10)) == (datetime.date(2024, 3, 2), datetime.date(2024, 3, 9))
+
+
+def test_top_cities_by_population():
+    helper = AutocompleteHelper()
+    helper.load_from(CityCollection(cities()))
+    assert [city.name for city in top_cities(helper, 2)] == ["Kyiv", "Lviv"]
+
+
+def test_run_once_forecasts_every_grid_cell_once():
+    RecordingForecast.inputs = []
+    broken = CityInfo(4, "Nowhere", "AQ", "AQ", -80.0, 0.0, 0)
+    prewarmer = Prewarmer(cities() + [broken], forecast_jobs=ForecastJobs(RecordingForecast))
+
+    stats = prewarmer.run_once()
+
+    # the suburb shares Kyiv's grid cell
+    assert (stats["forecasts"], stats["failed"]) == (4, 2)
+    start, end = default_window()
+    assert [(user_input['lat'], user_input['type']) for user_input in RecordingForecast.inputs] == [
+        (50.45, 'Daily'), (50.45, 'Hourly'), (49.84, 'Daily'), (49.84, 'Hourly'), (-80.0, 'Daily'), (-80.0, 'Hourly')]
+    assert all((user_input['from'], user_input['to']) == (start.isoformat(), end.isoformat())
+               for user_input in RecordingForecast.inputs)
+
+
+def test_next_run_is_just_after_midnight():
+    prewarmer = Prewarmer(cities(), clock=lambda: datetime.datetime(2024, 3, 9, 23, 59))
+    assert prewarmer.seconds_until_next_run() == 120
+    assert prewarmer.requests()[0]['to'] == "2024-03-08"
+
+
+def test_runs_again_after_the_date_change():
+    RecordingForecast.inputs = []
+    # a clock a second before midnight, which runs at the pace of the real one
+    started = datetime.datetime.now()
+    before_midnight = datetime.datetime(2024, 3, 9, 23, 59, 59)
+    prewarmer = Prewarmer(cities()[:1], ('Daily',), forecast_jobs=ForecastJobs(RecordingForecast),
+                          after_midnight=0.1, clock=lambda: before_midnight + (datetime.datetime.now() - started))
+
+    prewarmer.start()
+    deadline = time.monotonic() + 5
+    while len(RecordingForecast.inputs) < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    prewarmer.stop()
+
+    assert [user_input['to'] for user_input in RecordingForecast.inputs] == ["2024-03-08", "2024-03-09"]
+    # after the date change, the next run is a day away
+    assert 23 * 3600 < prewarmer.seconds_until_next_run() < 24 * 3600
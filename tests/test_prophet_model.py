@@ -0,0 +1,191 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from prophet.serialize import model_from_json
+
+from utils.analyses_utils import DataFrameType
+from weather_prediction.prophet.model_cache import ModelCache
+from weather_prediction.prophet.prophet_model import DEFAULT_MODEL_CACHE, ProphetWeatherPredictionModel, _fit, \
+    _point_forecast, _timed_fit, fit_stats
+
+
+def daily_history(days=200):
+    ds = pd.date_range("2019-01-01", periods=days, freq="D")
+    t = np.arange(days)
+    return pd.DataFrame({
+        "ds": ds,
+        "temperature_2m_mean": 10 + 8 * np.sin(2 * np.pi * t / 365) + np.sin(t),
+        "wind_speed_10m_max": 15 + 3 * np.cos(t / 3),
+        "precipitation_sum": 2 + np.sin(t / 2) ** 2
+    })
+
+
+def test_predict_shape():
+    df = daily_history()
+    model = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, ["temperature_2m_mean"], workers=1)
+    forecast = model.predict(7, "2019-07-20", 150)
+
+    assert list(forecast.columns) == ["ds", "temperature_2m_mean", "wind_speed_10m_max", "precipitation_sum"]
+    assert forecast["ds"].tolist() == list(pd.date_range("2019-07-20", periods=7, freq="D"))
+    assert not forecast.isna().any().any()
+
+
+def test_worker_pool_matches_inline():
+    df = daily_history()
+    regressors = ["temperature_2m_mean"]
+    inline = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, regressors, workers=1, model_cache=None)
+    pooled = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, regressors, workers=2, model_cache=None)
+
+    pd.testing.assert_frame_equal(inline.predict(7, "2019-07-20", 150), pooled.predict(7, "2019-07-20", 150))
+
+
+def test_predict_stream_yields_every_variable():
+    df = daily_history()
+    model = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, ["temperature_2m_mean"], workers=1,
+                                          model_cache=None)
+    predictions = list(model.predict_stream(7, "2019-07-20", 150))
+
+    assert [list(prediction.columns) for prediction in predictions] == [
+        ["ds", "temperature_2m_mean"],
+        ["ds", "temperature_2m_mean", "wind_speed_10m_max"],
+        ["ds", "temperature_2m_mean", "wind_speed_10m_max", "precipitation_sum"]]
+    pd.testing.assert_frame_equal(predictions[-1], model.predict(7, "2019-07-20", 150))
+
+
+def test_point_forecast_matches_prophet():
+    df = daily_history()
+    train = df[["ds", "precipitation_sum", "temperature_2m_mean"]].rename(columns={"precipitation_sum": "y"})
+    model = model_from_json(_fit(train.head(150), ["temperature_2m_mean"]))
+    future = df[["ds", "temperature_2m_mean"]].tail(50)
+
+    np.testing.assert_allclose(_point_forecast(model, future), model.predict(future)["yhat"].to_numpy())
+
+
+def test_intervals():
+    df = daily_history()
+    model = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, ["temperature_2m_mean"], workers=1,
+                                          model_cache=None, intervals=True)
+    forecast = model.predict(7, "2019-07-20", 150)
+
+    variables = ["temperature_2m_mean", "wind_speed_10m_max", "precipitation_sum"]
+    assert list(forecast.columns) == (["ds"] + variables + [f"{variable}_{bound}" for variable in variables
+                                                             for bound in ["lower", "upper"]])
+    for variable in variables:
+        assert (forecast[f"{variable}_lower"] <= forecast[variable]).all()
+        assert (forecast[variable] <= forecast[f"{variable}_upper"]).all()
+
+
+def test_model_cache_skips_fitting(tmp_path):
+    df = daily_history()
+    cache = ModelCache(str(tmp_path))
+    model = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, ["temperature_2m_mean"], workers=1,
+                                          location=(50.5, 30.5), model_cache=cache)
+    first = model.predict(7, "2019-07-20", 150)
+    assert cache.stats() == {"hits": 0, "misses": 3, "models": 3, "bytes": cache.stats()["bytes"]}
+
+    second = model.predict(7, "2019-07-20", 150)
+    assert cache.hits == 3
+    pd.testing.assert_frame_equal(first, second)
+
+    # another training window is a different model
+    model.predict(7, "2019-07-21", 150)
+    assert cache.misses == 6
+
+
+def test_model_cache_evicts_least_recently_used(tmp_path):
+    cache = ModelCache(str(tmp_path), max_bytes=25)
+    cache.put("a", "0123456789")
+    time.sleep(0.05)  # file times are not precise enough to order back-to-back writes
+    cache.put("b", "0123456789")
+    time.sleep(0.05)
+    assert cache.get("a") is not None
+    time.sleep(0.05)
+    cache.put("c", "0123456789")
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_model_cache_evicts_latest_pointers(tmp_path):
+    # every series takes 17 bytes: a 10 byte model and its 7 byte pointer
+    cache = ModelCache(str(tmp_path), max_bytes=45)
+    for series in ["a", "b", "c", "d"]:
+        cache.put(f"model_{series}", "0123456789", series=f"series_{series}")
+        time.sleep(0.05)
+
+    assert cache.stats()["bytes"] <= 45
+    assert cache.latest("series_a") is None
+    assert cache.latest("series_d") == "0123456789"
+    assert not (tmp_path / "series_a.latest").exists()
+
+
+def test_model_cache_writers_of_other_processes_do_not_collide(tmp_path):
+    # one cache per writer, as in separate processes, so the cache lock does not serialize them
+    errors = []
+
+    def put():
+        try:
+            for _ in range(20):
+                ModelCache(str(tmp_path)).put("model", "0123456789" * 100, series="series")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=put) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_warm_start_from_previous_window(tmp_path):
+    df = daily_history()
+    regressors = ["temperature_2m_mean"]
+    cache = ModelCache(str(tmp_path))
+    ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, regressors, workers=1,
+                                  model_cache=cache).predict(7, "2019-07-20", 150)
+    series = ModelCache.series_key(None, DataFrameType.DailyHistory.value, "precipitation_sum", regressors)
+    assert cache.latest(series) is not None
+
+    warm = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, regressors, workers=1,
+                                         model_cache=cache).predict(7, "2019-07-21", 150)
+    cold = ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, regressors, workers=1,
+                                         model_cache=None).predict(7, "2019-07-21", 150)
+    pd.testing.assert_frame_equal(warm, cold, rtol=0.02)
+
+    # the point of the warm start: the optimizer of the shifted window converges in fewer iterations
+    train = df[(df["ds"] >= "2019-02-21") & (df["ds"] <= "2019-07-20")]
+    train = train[["ds", "precipitation_sum"] + regressors].rename(columns={"precipitation_sum": "y"})
+    warm_iterations = _timed_fit(train, regressors, cache.latest(series), 0.0)[1]["iterations"]
+    cold_iterations = _timed_fit(train, regressors, None, 0.0)[1]["iterations"]
+    assert 0 < warm_iterations < cold_iterations
+
+
+def test_backtest_does_not_use_model_cache():
+    df = daily_history()
+    models = DEFAULT_MODEL_CACHE.stats()["models"]
+    backtest = [ProphetWeatherPredictionModel.backtester(df, DataFrameType.DailyHistory, ["temperature_2m_mean"],
+                                                         train_size=100, horizon=7, stride=40, workers=1).run()
+                for _ in range(2)]
+
+    # windows do not warm start from each other, so the errors do not depend on the order windows finish in
+    for metric in backtest[0]:
+        pd.testing.assert_frame_equal(backtest[0][metric], backtest[1][metric])
+    assert DEFAULT_MODEL_CACHE.stats()["models"] == models
+
+
+def test_fit_stats():
+    df = daily_history()
+    before = fit_stats().get("fits", 0)
+    ProphetWeatherPredictionModel(df, DataFrameType.DailyHistory, ["temperature_2m_mean"], workers=2,
+                                  model_cache=None).predict(7, "2019-07-20", 150)
+    stats = fit_stats()
+
+    assert stats["fits"] == min(before + 3, 1000)
+    assert set(stats["mean_seconds"]) == {"dispatch", "prepare", "stan", "serialize", "total"}
+    assert stats["mean_seconds"]["stan"] > 0
+    assert 0 <= stats["overhead_share"] < 1
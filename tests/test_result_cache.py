@@ -0,0 +1,129 @@
+import datetime
+import time
+
+import numpy as np
+import pandas as pd
+
+from forecast import forecast as forecast_module
+from forecast.forecast import WeatherForecast
+from forecast.result_cache import ForecastResultCache
+from weather_prediction.harmonic.harmonic_model import HarmonicWeatherPredictionModel
+
+
+def frames():
+    prediction = pd.DataFrame({
+        "ds": pd.date_range("2020-01-01", periods=3, freq="D"),
+        "temperature_2m_mean": np.array([1.5, 2.5, 3.5], dtype=np.float32),
+        "weather_code": pd.Categorical(["Clear", "Rain", "Clear"]),
+    })
+    actual = pd.DataFrame({
+        "date": pd.date_range("2020-01-01", periods=3, freq="D"),
+        "temperature_2m_mean": np.array([1.0, 2.0, 3.0], dtype=np.float32),
+    })
+    return prediction, actual
+
+
+def test_round_trip_keeps_dtypes(tmp_path):
+    cache = ForecastResultCache(str(tmp_path))
+    key = ForecastResultCache.key("harmonic", 50.4, 30.5, "2020-01-01", "2020-01-03", "Daily")
+    assert cache.get(key) is None
+
+    prediction, actual = frames()
+    cache.put(key, prediction, actual)
+    cached_prediction, cached_actual = cache.get(key)
+
+    pd.testing.assert_frame_equal(cached_prediction, prediction)
+    pd.testing.assert_frame_equal(cached_actual, actual)
+    assert cache.stats()["results"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    prediction, actual = frames()
+    probe = ForecastResultCache(str(tmp_path / "probe"))
+    probe.put("probe", prediction, actual)
+    size = probe.stats()["bytes"]
+
+    cache = ForecastResultCache(str(tmp_path / "cache"), max_bytes=2 * size)
+    cache.put("first", prediction, actual)
+    time.sleep(0.01)
+    cache.put("second", prediction, actual)
+    time.sleep(0.01)
+    cache.get("first")
+    time.sleep(0.01)
+    cache.put("third", prediction, actual)
+
+    assert cache.get("first") is not None
+    assert cache.get("second") is None
+    assert cache.get("third") is not None
+
+
+def test_eviction_removes_whole_results(tmp_path):
+    prediction, actual = frames()
+    probe = ForecastResultCache(str(tmp_path / "probe"))
+    probe.put("probe", prediction, actual)
+    size = probe.stats()["bytes"]
+
+    # one byte too many for three results, removing a single part would already be enough
+    cache = ForecastResultCache(str(tmp_path / "cache"), max_bytes=3 * size - 1)
+    for key in ["first", "second", "third"]:
+        cache.put(key, prediction, actual)
+        time.sleep(0.01)
+
+    assert sorted(path.name for path in (tmp_path / "cache").glob("*.parquet")) == [
+        "second.actual.parquet", "second.prediction.parquet", "third.actual.parquet", "third.prediction.parquet"]
+    assert cache.stats()["results"] == 2
+
+
+def test_forecast_is_served_from_cache(tmp_path):
+    cache = ForecastResultCache(str(tmp_path))
+    forecast = WeatherForecast(engine="harmonic", result_cache=cache)
+    user_input = {"lat": 50.44, "lon": 30.52, "type": 'Daily', "from": "2020-01-01", "to": "2020-01-07"}
+
+    prediction, actual = forecast.predict(user_input)
+    cached_prediction, cached_actual = forecast.predict({**user_input, "from": "2020-01-07", "to": "2020-01-01"})
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    pd.testing.assert_frame_equal(cached_prediction, prediction.reset_index(drop=True))
+    pd.testing.assert_frame_equal(cached_actual, actual.reset_index(drop=True))
+
+
+def test_recent_ranges_are_cached_for_the_day(tmp_path):
+    cache = ForecastResultCache(str(tmp_path))
+    forecast = WeatherForecast(engine="harmonic", result_cache=cache)
+    yesterday = datetime.date.today() - datetime.timedelta(days=1)
+    user_input = {"lat": 50.44, "lon": 30.52, "type": 'Daily',
+                  "from": (yesterday - datetime.timedelta(days=6)).isoformat(), "to": yesterday.isoformat()}
+
+    assert not ForecastResultCache.is_final(yesterday)
+    forecast.predict(user_input)
+    forecast.predict(user_input)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # the archive may change them, so the key differs from the one of the same range once final
+    key = forecast._result_key(50.5, 30.5, user_input["from"], user_input["to"], 'Daily', 6, True)
+    assert cache.get(key) is None
+
+
+def test_changed_models_are_not_served_from_cache(tmp_path, monkeypatch):
+    forecast = WeatherForecast(engine="harmonic", result_cache=ForecastResultCache(str(tmp_path)))
+    key = forecast._result_key(50.5, 30.5, "2020-01-01", "2020-01-07", 'Daily', 6, True)
+    assert forecast._result_key(50.5, 30.5, "2020-01-01", "2020-01-07", 'Daily', 6, True) == key
+
+    monkeypatch.setattr(HarmonicWeatherPredictionModel, "version", HarmonicWeatherPredictionModel.version + 1)
+    model_key = forecast._result_key(50.5, 30.5, "2020-01-01", "2020-01-07", 'Daily', 6, True)
+    monkeypatch.setattr(forecast_module, "CLASSIFIER_VERSION", forecast_module.CLASSIFIER_VERSION + 1)
+    classifier_key = forecast._result_key(50.5, 30.5, "2020-01-01", "2020-01-07", 'Daily', 6, True)
+    assert len({key, model_key, classifier_key}) == 3
+
+
+def test_engines_and_output_arguments_key_their_own_results(tmp_path):
+    def key(engine, model_kwargs=None):
+        forecast = WeatherForecast(engine=engine, result_cache=ForecastResultCache(str(tmp_path)),
+                                   model_kwargs=model_kwargs)
+        return forecast._result_key(50.5, 30.5, "2020-01-01", "2020-01-07", 'Daily', 6, True)
+
+    assert key("prophet") != key("harmonic")
+    # intervals add columns to the prediction, workers only change how it is computed
+    assert key("prophet", {"intervals": True}) != key("prophet")
+    assert key("prophet", {"workers": 1}) == key("prophet")
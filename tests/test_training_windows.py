@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from utils.analyses_utils import DataFrameType
+from weather_prediction.training_windows import TrainingWindows, choose_window, profile_windows
+from weather_prediction.weather_predictor import WeatherPredictor, calculate_daily_training_size
+
+
+def daily_history(days=500):
+    ds = pd.date_range("2019-01-01", periods=days, freq="D")
+    t = np.arange(days)
+    temperature = 10 + 0.02 * t + np.sin(t / 5)
+    return pd.DataFrame({"ds": ds, "temperature_2m_mean": temperature, "precipitation_sum": 5 - temperature / 5})
+
+
+def test_lookup_uses_shortest_covering_horizon(tmp_path):
+    windows = TrainingWindows()
+    windows.set("prophet", "daily", 7, 90, [])
+    windows.set("prophet", "daily", 30, 365, [])
+    windows.set("prophet", "daily", 7, 60, [])
+    windows.save(tmp_path / "windows.json")
+    windows = TrainingWindows.load(tmp_path / "windows.json")
+
+    assert windows.train_size("prophet", "daily", 1) == 60
+    assert windows.train_size("prophet", "daily", 7) == 60
+    assert windows.train_size("prophet", "daily", 8) == 365
+    assert windows.train_size("prophet", "daily", 31) is None
+    assert windows.train_size("prophet", "hourly", 24) is None
+    assert windows.train_size("harmonic", "daily", 7) is None
+    assert TrainingWindows.load(tmp_path / "missing.json").train_size("prophet", "daily", 7) is None
+
+
+def test_choose_cheapest_window_within_tolerance():
+    profiles = profile_windows(daily_history(), DataFrameType.DailyHistory, ["temperature_2m_mean"], 7,
+                               [20, 60, 200], engine="harmonic", windows=5, workers=1)
+
+    assert [profile["train_size"] for profile in profiles] == [20, 60, 200]
+    assert [profile["fetch_days"] for profile in profiles] == [20, 60, 200]
+    assert min(profile["score"] for profile in profiles) == 1
+    assert choose_window(profiles, tolerance=1000) == 20
+    best = min(profiles, key=lambda profile: profile["score"])["train_size"]
+    assert choose_window(profiles, tolerance=0) == best
+
+
+def test_predictor_falls_back_to_formula():
+    windows = TrainingWindows()
+    windows.set("prophet", "daily", 7, 60, [])
+    windows.set("prophet", "hourly", 48, 500, [])
+    predictor = WeatherPredictor(training_windows=windows)
+
+    assert predictor.training_size(DataFrameType.DailyHistory, 7) == 60
+    assert predictor.training_size(DataFrameType.DailyHistory, 30) == calculate_daily_training_size(30)
+    assert predictor.training_size(DataFrameType.HourlyHistory, 24) == 500
+    assert predictor.training_size(DataFrameType.HourlyHistory, 72) == 1000
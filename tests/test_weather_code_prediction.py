@@ -1,3 +1,6 @@
+from weather_prediction.weather_code.classifier_cache import ClassifierCache
+from weather_prediction.weather_code.history_io import json_to_history, read_history
+from weather_prediction.weather_code.online_weather_code_prediction import OnlineWeatherCodesPredictor
 from weather_prediction.weather_code.weather_code_prediction import WeatherCodesPredictor
 import pandas as pd
 from utils.path_utils import ParentPath
@@ -15,3 +18,92 @@ def test_weather_code():
     expected = WeatherCodesPredictor.replace_weather_codes(x_predict['weather_code'])
     accuracy = accuracy_score(expected, predicted)
     assert accuracy > 0.5
+
+
+def test_cached_classifier_gives_same_labels():
+    base_dir = ParentPath().config_path
+    df = pd.read_json(f"{base_dir}/" + "resource/test/kyiv_data.json")
+    x_history, x_predict = train_test_split(df, random_state=0)
+    regressors = ['temperature_2m_mean', 'wind_speed_10m_max', 'precipitation_sum', 'precipitation_hours']
+    cache = ClassifierCache(max_entries=2)
+
+    uncached = WeatherCodesPredictor.get_weather_codes_frame(x_history, x_predict, regressors, classifier_cache=None)
+    first = WeatherCodesPredictor.get_weather_codes_frame(x_history, x_predict, regressors, location=(50.4, 30.5),
+                                                          classifier_cache=cache)
+    second = WeatherCodesPredictor.get_weather_codes_frame(x_history, x_predict, regressors, location=(50.4, 30.5),
+                                                           classifier_cache=cache)
+    assert list(first) == list(uncached) == list(second)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # other locations and windows get their own classifiers, the least recently used one is evicted
+    WeatherCodesPredictor.get_weather_codes_frame(x_history, x_predict, regressors, location=(0.0, 0.0),
+                                                  classifier_cache=cache)
+    WeatherCodesPredictor.get_weather_codes_frame(x_history.iloc[1:], x_predict, regressors, location=(0.0, 0.0),
+                                                  classifier_cache=cache)
+    assert len(cache) == 2
+    WeatherCodesPredictor.get_weather_codes_frame(x_history, x_predict, regressors, location=(50.4, 30.5),
+                                                  classifier_cache=cache)
+    assert cache.misses == 4
+
+
+def test_online_classifier_learns_only_new_rows():
+    base_dir = ParentPath().config_path
+    df = pd.read_json(f"{base_dir}/" + "resource/test/kyiv_data.json")
+    history, x_predict = df.iloc[:2200], df.iloc[2200:]
+    regressors = ['temperature_2m_mean', 'wind_speed_10m_max', 'precipitation_sum', 'precipitation_hours']
+    expected = WeatherCodesPredictor.replace_weather_codes(x_predict['weather_code'])
+
+    full = OnlineWeatherCodesPredictor().get_weather_codes_frame(history, x_predict, regressors)
+    batch = WeatherCodesPredictor.get_weather_codes_frame(history, x_predict, regressors, classifier_cache=None)
+    assert accuracy_score(expected, full) > accuracy_score(expected, batch) - 0.05
+
+    # a sliding window over the same history ends with the same model, having learned every row once
+    online = OnlineWeatherCodesPredictor()
+    for end in range(1000, 2201, 100):
+        sliding = online.get_weather_codes_frame(history.iloc[end - 1000:end], x_predict, regressors)
+    assert online.rows_seen(regressors) == 2200
+    assert list(sliding) == list(full)
+
+
+def test_online_classifier_learns_windows_between_learned_ones():
+    base_dir = ParentPath().config_path
+    df = pd.read_json(f"{base_dir}/" + "resource/test/kyiv_data.json")
+    history, x_predict = df.iloc[:2500], df.iloc[2500:]
+    regressors = ['temperature_2m_mean', 'wind_speed_10m_max', 'precipitation_sum', 'precipitation_hours']
+
+    online = OnlineWeatherCodesPredictor()
+    for start in [2000, 0, 1000]:
+        labels = online.get_weather_codes_frame(history.iloc[start:start + 500], x_predict, regressors)
+    assert online.rows_seen(regressors) == 1500
+
+    # the same model as learning all three windows at once
+    windows = pd.concat([history.iloc[start:start + 500] for start in [0, 1000, 2000]])
+    at_once = OnlineWeatherCodesPredictor()
+    assert list(labels) == list(at_once.get_weather_codes_frame(windows, x_predict, regressors))
+    # the gaps between the windows are not learned yet
+    at_once.get_weather_codes_frame(history.iloc[500:1000], x_predict, regressors)
+    assert at_once.rows_seen(regressors) == 2000
+
+    # windows overlapping the learned ones learn only their new rows
+    online.get_weather_codes_frame(history.iloc[400:1100], x_predict, regressors)
+    assert online.rows_seen(regressors) == 2000
+
+
+def test_binary_history(tmp_path):
+    base_dir = ParentPath().config_path
+    json_path = f"{base_dir}/" + "resource/test/kyiv_data.json"
+    x_predict = pd.read_json(json_path).tail(300)
+    regressors = ['temperature_2m_mean', 'wind_speed_10m_max', 'precipitation_sum', 'precipitation_hours']
+    json_to_history(json_path, tmp_path / "kyiv_data.arrow")
+    json_to_history(json_path, tmp_path / "kyiv_data.parquet")
+
+    history = read_history(tmp_path / "kyiv_data.arrow")
+    assert history["weather_code"].dtype == "uint8"
+    pd.testing.assert_frame_equal(read_history(tmp_path / "kyiv_data.parquet"), history)
+    pd.testing.assert_frame_equal(read_history((tmp_path / "kyiv_data.parquet").read_bytes()), history)
+
+    expected = WeatherCodesPredictor.get_weather_codes_frame(history, x_predict, regressors, classifier_cache=None)
+    for source in [tmp_path / "kyiv_data.arrow", (tmp_path / "kyiv_data.arrow").read_bytes(),
+                   tmp_path / "kyiv_data.parquet"]:
+        predicted = WeatherCodesPredictor.get_weather_codes_binary(source, x_predict, regressors)
+        assert list(predicted) == list(expected)